@@ -12,7 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Provides the database connector."""
+"""Provides the database connector, backed by a shared connection pool.
+
+MySQLdb connections are not thread-safe, so each database operation checks
+out a connection for its own use, and returns it to the pool when done.
+All the DAOs connecting to the same database share the same pool.
+"""
+
+import contextlib
+import threading
+import time
 
 import MySQLdb
 from MySQLdb import OperationalError
@@ -23,33 +32,277 @@ from google.cloud.security.common.util import log_util
 
 LOGGER = log_util.get_logger(__name__)
 
+# Maximum number of open connections per database, unless set by the
+# db_max_connections global configuration.
+DEFAULT_MAX_CONNECTIONS = 10
+
+# Idle connections are pinged before reuse when idle for longer than this
+# many seconds, as the server may have closed them.
+HEALTH_CHECK_IDLE_TIME = 30.0
+
+# MySQL client error codes of a lost connection: CR_SERVER_GONE_ERROR and
+# CR_SERVER_LOST. The connections failing with them are not reused.
+CONNECTION_ERROR_CODES = frozenset([2006, 2013])
+
+# Process-wide connection pools, keyed by database.
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class ConnectionPool(object):
+    """Thread-safe pool of MySQL connections to a single database."""
+
+    def __init__(self, connect_kwargs, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 connect=MySQLdb.connect, clock=time.time):
+        """Initialize.
+
+        Args:
+            connect_kwargs (dict): Arguments to MySQLdb.connect().
+            max_connections (int): Maximum number of open connections.
+            connect (function): Opens a new connection.
+            clock (function): Returns the current time, in seconds.
+        """
+        self.connect_kwargs = connect_kwargs
+        self.max_connections = max(1, max_connections)
+        self._connect = connect
+        self._clock = clock
+        self._idle = []
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def _open(self):
+        """Open a new connection.
+
+        Returns:
+            Connection: The new connection.
+
+        Raises:
+            MySQLError: If the connection can't be opened.
+        """
+        try:
+            return self.connect()
+        except MySQLError:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def connect(self):
+        """Open a connection that is not managed by the pool.
+
+        Used for long running operations, which would otherwise hold one of
+        the pooled connections for their whole duration. The caller closes
+        the connection.
+
+        Returns:
+            Connection: The new connection.
+
+        Raises:
+            MySQLError: If the connection can't be opened.
+        """
+        try:
+            return self._connect(**self.connect_kwargs)
+        except OperationalError as e:
+            LOGGER.error('Unable to create mysql connector:\n%s', e)
+            raise MySQLError('DB Connector', e)
+
+    @staticmethod
+    def _is_healthy(conn):
+        """Check that a connection is still open.
+
+        Args:
+            conn (Connection): The connection to check.
+
+        Returns:
+            bool: True if the server answered a ping.
+        """
+        try:
+            conn.ping()
+            return True
+        except OperationalError:
+            return False
+
+    def checkout(self):
+        """Get a connection, blocking while all the connections are in use.
+
+        Returns:
+            Connection: A connection only used by the caller, until it is
+                checked in again.
+
+        Raises:
+            MySQLError: If a new connection can't be opened.
+        """
+        with self._condition:
+            while not self._idle and self._size >= self.max_connections:
+                self._condition.wait()
+            if self._idle:
+                conn, idle_since = self._idle.pop()
+            else:
+                conn, idle_since = None, None
+                self._size += 1
+
+        if conn is not None:
+            if (self._clock() - idle_since < HEALTH_CHECK_IDLE_TIME or
+                    self._is_healthy(conn)):
+                return conn
+            LOGGER.info('Reconnecting stale mysql connection.')
+            _close(conn)
+        return self._open()
+
+    def checkin(self, conn):
+        """Return a connection to the pool, keeping it open.
+
+        Args:
+            conn (Connection): The connection to return.
+        """
+        with self._condition:
+            self._idle.append((conn, self._clock()))
+            self._condition.notify()
+
+    def discard(self, conn):
+        """Close a connection that failed, instead of returning it.
+
+        Args:
+            conn (Connection): The connection to discard.
+        """
+        _close(conn)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def close_idle(self):
+        """Close all the idle connections."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            _close(conn)
+
+
+def _close(conn):
+    """Close a connection, ignoring errors.
+
+    Args:
+        conn (Connection): The connection to close.
+    """
+    try:
+        conn.close()
+    except MySQLdb.Error:
+        pass
+
+
+def _is_connection_error(error):
+    """Whether an error means that the connection was lost.
+
+    Args:
+        error (Exception): The error of a database operation.
+
+    Returns:
+        bool: True if the connection can't be reused.
+    """
+    return (isinstance(error, OperationalError) and bool(error.args) and
+            error.args[0] in CONNECTION_ERROR_CODES)
+
+
+def get_pool(global_configs):
+    """Get the connection pool of a database, creating it if needed.
+
+    Args:
+        global_configs (dict): Global configurations.
+
+    Returns:
+        ConnectionPool: The pool shared by all the DAOs of the database.
+    """
+    key = (global_configs['db_host'], global_configs['db_user'],
+           global_configs['db_name'])
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                {'host': global_configs['db_host'],
+                 'user': global_configs['db_user'],
+                 'db': global_configs['db_name'],
+                 'local_infile': 1},
+                global_configs.get('db_max_connections',
+                                   DEFAULT_MAX_CONNECTIONS))
+            _POOLS[key] = pool
+        return pool
+
+
 class DbConnector(object):
     """Database connector."""
 
+    # A dedicated connection, used by every operation instead of the pool
+    # when set.
+    conn = None
+
     def __init__(self, global_configs=None):
         """Initialize the db connector.
 
+        No connection is opened until the first database operation.
+
         Args:
             global_configs (dict): Global configurations.
+        """
+        self.pool = get_pool(global_configs)
+
+    @contextlib.contextmanager
+    def checkout_connection(self):
+        """Check out a connection for a single database operation.
+
+        The connection is returned to the pool when the operation is done,
+        or closed if the connection was lost, e.g. because the server went
+        away, so that the next operation reconnects.
+
+        Yields:
+            Connection: The connection to run the operation with.
 
         Raises:
-            MySQLError: An error with MySQL has occurred.
+            MySQLError: If a new connection can't be opened.
+            Exception: Any error of the operation, once the connection is
+                returned to the pool or closed.
         """
+        if self.conn is not None:
+            yield self.conn
+            return
+
+        conn = self.pool.checkout()
         try:
-            self.conn = MySQLdb.connect(
-                host=global_configs['db_host'],
-                user=global_configs['db_user'],
-                db=global_configs['db_name'],
-                local_infile=1)
-        except OperationalError as e:
-            LOGGER.error('Unable to create mysql connector:\n%s', e)
-            raise MySQLError('DB Connector', e)
+            yield conn
+        except Exception as e:
+            if _is_connection_error(e):
+                self.pool.discard(conn)
+                raise
+            # Never return a connection in the middle of a transaction.
+            try:
+                conn.rollback()
+            except MySQLdb.Error:
+                self.pool.discard(conn)
+                raise
+            self.pool.checkin(conn)
+            raise
+        self.pool.checkin(conn)
+
+    @contextlib.contextmanager
+    def dedicated_connection(self):
+        """Open a connection of its own, for a long streaming read.
+
+        An unbuffered result holds its connection until it is fully read,
+        so streaming reads don't use the pool, which would be starved by
+        slow consumers. The connection is closed when done.
+
+        Yields:
+            Connection: The connection to run the operation with.
+
+        Raises:
+            MySQLError: If the connection can't be opened.
+        """
+        if self.conn is not None:
+            yield self.conn
+            return
 
-    def __del__(self):
-        """Closes the database connection."""
+        conn = self.pool.connect()
         try:
-            self.conn.close()
-        except AttributeError:
-            # This happens when conn is not created in the first place,
-            # thus does not need to be cleaned up.
-            pass
+            yield conn
+        finally:
+            _close(conn)
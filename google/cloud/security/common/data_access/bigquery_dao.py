@@ -61,15 +61,45 @@ class BigqueryDao(project_dao.ProjectDao):
             LOGGER.error(errors.MySQLError(resource_name, e))
 
         for row in rows:
-            bigquery_acl = bq_acls.BigqueryAccessControls(
-                dataset_id=row['dataset_id'],
-                special_group=row['access_special_group'],
-                user_email=row['access_user_by_email'],
-                domain=row['access_domain'],
-                role=row['role'],
-                group_email=row['access_group_by_email'],
-                project_id=row['project_id'])
-            bigquery_acls[cnt] = bigquery_acl
+            bigquery_acls[cnt] = self._map_row_to_bigquery_acl(row)
             cnt += 1
 
         return bigquery_acls
+
+    def iter_bigquery_acls(self, resource_name, timestamp):
+        """Stream the Big Query acls from a Big Query acls snapshot table.
+
+        Args:
+            resource_name (str): String of the resource name.
+            timestamp (str): String of timestamp, formatted as
+            YYYYMMDDTHHMMSSZ.
+
+        Yields:
+            BigqueryAccessControls: The Big Query acls.
+
+        Raises:
+            MySQLError: An error with MySQL has occurred.
+        """
+        bigquery_acls_sql = select_data.BIGQUERY_ACLS.format(timestamp)
+        for row in self.iter_sql_with_fetch(
+                resource_name, bigquery_acls_sql, None):
+            yield self._map_row_to_bigquery_acl(row)
+
+    @staticmethod
+    def _map_row_to_bigquery_acl(row):
+        """Instantiate a BigqueryAccessControls from a database row.
+
+        Args:
+            row (dict): The database row to map.
+
+        Returns:
+            BigqueryAccessControls: The Big Query acl, created from the row.
+        """
+        return bq_acls.BigqueryAccessControls(
+            dataset_id=row['dataset_id'],
+            special_group=row['access_special_group'],
+            user_email=row['access_user_by_email'],
+            domain=row['access_domain'],
+            role=row['role'],
+            group_email=row['access_group_by_email'],
+            project_id=row['project_id'])
@@ -81,20 +81,50 @@ class BucketDao(project_dao.ProjectDao):
                                                bucket_acls_sql,
                                                None)
             for row in rows:
-                bucket_acl = bkt_acls.\
-                BucketAccessControls(bucket=row['bucket'],
-                                     entity=row['entity'],
-                                     email=row['email'],
-                                     domain=row['domain'],
-                                     role=row['role'],
-                                     project_number=row['project_number'])
-                bucket_acls[cnt] = bucket_acl
+                bucket_acls[cnt] = self._map_row_to_bucket_acl(row)
                 cnt += 1
         except (DataError, IntegrityError, InternalError, NotSupportedError,
                 OperationalError, ProgrammingError) as e:
             LOGGER.error(errors.MySQLError(resource_name, e))
         return bucket_acls
 
+    def iter_buckets_acls(self, resource_name, timestamp):
+        """Stream the bucket acls from a bucket acls snapshot table.
+
+        Args:
+            resource_name (str): String of the resource name.
+            timestamp (str): String of timestamp, formatted as
+                YYYYMMDDTHHMMSSZ.
+
+        Yields:
+            BucketAccessControls: The bucket acls.
+
+        Raises:
+            MySQLError: An error with MySQL has occurred.
+        """
+        bucket_acls_sql = select_data.BUCKET_ACLS.format(timestamp)
+        for row in self.iter_sql_with_fetch(
+                resource_name, bucket_acls_sql, None):
+            yield self._map_row_to_bucket_acl(row)
+
+    @staticmethod
+    def _map_row_to_bucket_acl(row):
+        """Instantiate a BucketAccessControls from a database row.
+
+        Args:
+            row (dict): The database row to map.
+
+        Returns:
+            BucketAccessControls: The bucket acl, created from the row.
+        """
+        return bkt_acls.BucketAccessControls(
+            bucket=row['bucket'],
+            entity=row['entity'],
+            email=row['email'],
+            domain=row['domain'],
+            role=row['role'],
+            project_number=row['project_number'])
+
     def get_raw_buckets(self, timestamp):
         """Select the bucket and its raw json.
 
@@ -63,26 +63,59 @@ class CloudsqlDao(project_dao.ProjectDao):
                                                           timestamp)
 
             for row in rows:
-                project_number = row['project_number']
-                instance_name = row['name']
-                ssl_enabled = row['settings_ip_configuration_require_ssl']
-                authorized_networks = self.\
-                _get_networks_for_instance(acl_map,
-                                           project_number,
-                                           instance_name)
-
-                cloudsql_acl = csql_acls.\
-                CloudSqlAccessControl(instance_name=instance_name,
-                                      authorized_networks=authorized_networks,
-                                      ssl_enabled=ssl_enabled,
-                                      project_number=project_number)
-                cloudsql_acls[cnt] = cloudsql_acl
+                cloudsql_acls[cnt] = self._map_row_to_cloudsql_acl(
+                    row, acl_map)
                 cnt += 1
         except (DataError, IntegrityError, InternalError, NotSupportedError,
                 OperationalError, ProgrammingError) as e:
             LOGGER.error(errors.MySQLError(resource_name, e))
         return cloudsql_acls
 
+    def iter_cloudsql_acls(self, resource_name, timestamp):
+        """Stream the cloudsql acls for project from a snapshot table.
+
+        The instances are streamed, while their authorized networks, which
+        are looked up by instance, are read beforehand.
+
+        Args:
+            resource_name (str): String of the resource name.
+            timestamp (str): String of timestamp, formatted as
+                YYYYMMDDTHHMMSSZ.
+
+        Yields:
+            CloudSqlAccessControl: The cloudsql acls.
+
+        Raises:
+            MySQLError: An error with MySQL has occurred.
+        """
+        acl_map = self._get_cloudsql_instance_acl_map(resource_name,
+                                                      timestamp)
+        cloudsql_instances_sql = (
+            select_data.CLOUDSQL_INSTANCES.format(timestamp))
+        for row in self.iter_sql_with_fetch(
+                resource_name, cloudsql_instances_sql, None):
+            yield self._map_row_to_cloudsql_acl(row, acl_map)
+
+    def _map_row_to_cloudsql_acl(self, row, acl_map):
+        """Instantiate a CloudSqlAccessControl from a database row.
+
+        Args:
+            row (dict): The cloudsql instance database row to map.
+            acl_map (dict): The authorized networks of the instances.
+
+        Returns:
+            CloudSqlAccessControl: The cloudsql acl, created from the row.
+        """
+        project_number = row['project_number']
+        instance_name = row['name']
+        authorized_networks = self._get_networks_for_instance(
+            acl_map, project_number, instance_name)
+        return csql_acls.CloudSqlAccessControl(
+            instance_name=instance_name,
+            authorized_networks=authorized_networks,
+            ssl_enabled=row['settings_ip_configuration_require_ssl'],
+            project_number=project_number)
+
     def _get_cloudsql_instance_acl_map(self, resource_name, timestamp):
         """Create CloudSQL instance acl map.
 
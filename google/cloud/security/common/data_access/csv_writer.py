@@ -14,12 +14,19 @@
 
 """Writes the csv files for upload to Cloud SQL."""
 from contextlib import contextmanager
+import errno
 import os
+import shutil
+import sys
 import tempfile
+import threading
 
 import unicodecsv as csv
 
 from google.cloud.security.common.data_access.errors import CSVFileError
+from google.cloud.security.common.util import log_util
+
+LOGGER = log_util.get_logger(__name__)
 
 
 APPENGINE_FIELDNAMES = [
@@ -486,14 +493,7 @@ def write_csv(resource_name, data, write_header=False):
     """
     csv_file = tempfile.NamedTemporaryFile(delete=False)
     try:
-        writer = csv.DictWriter(csv_file, doublequote=False, escapechar='\\',
-                                quoting=csv.QUOTE_NONE,
-                                fieldnames=CSV_FIELDNAME_MAP[resource_name])
-        if write_header:
-            writer.writeheader()
-
-        for i in data:
-            writer.writerow(i)
+        _write_rows(csv_file, resource_name, data, write_header)
 
         # This must be closed before returned for loading.
         csv_file.close()
@@ -503,3 +503,163 @@ def write_csv(resource_name, data, write_header=False):
         os.remove(csv_file.name)
     except (IOError, OSError, csv.Error) as e:
         raise CSVFileError(resource_name, e)
+
+
+def _write_rows(csv_file, resource_name, data, write_header=False):
+    """Write rows to an open csv file.
+
+    Args:
+        csv_file (file): The file to write to.
+        resource_name (str): The resource name.
+        data (iterable): An iterable of data to be written to csv.
+        write_header (bool): If True, write the header in the csv file.
+    """
+    writer = csv.DictWriter(csv_file, doublequote=False, escapechar='\\',
+                            quoting=csv.QUOTE_NONE,
+                            fieldnames=CSV_FIELDNAME_MAP[resource_name])
+    if write_header:
+        writer.writeheader()
+
+    for i in data:
+        writer.writerow(i)
+
+
+class CsvPipe(object):
+    """A named pipe the csv rows are written to while it is being read.
+
+    The rows are written by a background thread, which blocks until the
+    pipe is opened for reading, e.g. by LOAD DATA LOCAL INFILE, so that
+    serializing the rows overlaps with loading them.
+    """
+
+    def __init__(self, resource_name, data, name):
+        """Initialize, and start writing the rows.
+
+        Args:
+            resource_name (str): The resource name.
+            data (iterable): An iterable of data to be written to csv.
+            name (str): The path of the named pipe, which must exist.
+        """
+        self.resource_name = resource_name
+        self.name = name
+        self._exc_info = None
+        self._writer = threading.Thread(target=self._write, args=(data,),
+                                        name='CsvPipe-%s' % resource_name)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def _write(self, data):
+        """Write the rows into the pipe.
+
+        Any error, including the errors of the data iterable, ends the
+        writing, and is kept to be raised by wait().
+
+        Args:
+            data (iterable): An iterable of data to be written to csv.
+        """
+        try:
+            with open(self.name, 'wb') as pipe:
+                _write_rows(pipe, self.resource_name, data)
+        except Exception:  # pylint: disable=broad-except
+            self._exc_info = sys.exc_info()
+
+    def wait(self):
+        """Wait for all the rows to be written.
+
+        Must be called once the reader has read the pipe until the end, and
+        before the loaded rows are committed, as the reader can't tell a
+        complete file from one whose writing failed.
+
+        Raises:
+            CSVFileError: If there was an error writing the rows.
+            Exception: The error of the data iterable, if any, with its
+                original traceback.
+        """
+        self._writer.join()
+        if self._exc_info is None:
+            return
+        error_type, error, traceback = self._exc_info
+        self._exc_info = None
+        if isinstance(error, (IOError, OSError, csv.Error)):
+            raise CSVFileError(self.resource_name, error)
+        raise error_type, error, traceback
+
+    def close(self):
+        """Let the writer finish, if the pipe was not read until the end.
+
+        Raises:
+            OSError: If the pipe can't be opened or read.
+        """
+        if not self._writer.is_alive():
+            return
+        # Opening the pipe unblocks the writer waiting for a reader, and the
+        # rest of the rows are discarded until the writer is done.
+        read_fd = os.open(self.name, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            while self._writer.is_alive():
+                try:
+                    os.read(read_fd, 64 * 1024)
+                except OSError as e:
+                    if e.errno != errno.EAGAIN:
+                        raise
+                self._writer.join(0.01)
+        finally:
+            os.close(read_fd)
+
+
+class CsvFile(object):
+    """A csv file written before it is read, see write_csv()."""
+
+    def __init__(self, name):
+        """Initialize.
+
+        Args:
+            name (str): The path of the csv file.
+        """
+        self.name = name
+
+    def wait(self):
+        """Do nothing, the rows were all written before the file is read."""
+        pass
+
+
+@contextmanager
+def stream_csv(resource_name, data):
+    """Stream the rows through a named pipe, for loading into Cloud SQL.
+
+    Nothing is written to disk, and the rows are serialized while the pipe
+    is read. Falls back to a temporary csv file where named pipes are not
+    supported.
+
+    Args:
+        resource_name (str): The resource name.
+        data (iterable): An iterable of data to be written to csv.
+
+    Yields:
+        object: The CsvPipe or CsvFile to read the rows from. Its wait()
+            method must be called once the rows are read.
+
+    Raises:
+        CSVFileError: If there was an error writing the CSV file.
+    """
+    pipe_dir = tempfile.mkdtemp()
+    pipe_name = os.path.join(pipe_dir, resource_name + '.csv')
+    try:
+        os.mkfifo(pipe_name)
+    except (AttributeError, OSError) as e:
+        # AttributeError: the platform has no named pipes.
+        LOGGER.debug('Unable to create named pipe, using a csv file: %s', e)
+        shutil.rmtree(pipe_dir, ignore_errors=True)
+        pipe_dir = None
+
+    if pipe_dir is None:
+        with write_csv(resource_name, data) as csv_file:
+            yield CsvFile(csv_file.name)
+        return
+
+    csv_pipe = CsvPipe(resource_name, data, pipe_name)
+    try:
+        yield csv_pipe
+    finally:
+        csv_pipe.close()
+        shutil.rmtree(pipe_dir, ignore_errors=True)
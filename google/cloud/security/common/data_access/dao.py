@@ -14,6 +14,12 @@
 
 """Provides the data access object (DAO)."""
 
+import collections
+import os
+import re
+import threading
+import time
+
 from MySQLdb import DataError
 from MySQLdb import IntegrityError
 from MySQLdb import InternalError
@@ -25,9 +31,16 @@ from MySQLdb import cursors
 from google.cloud.security.common.data_access import _db_connector
 from google.cloud.security.common.data_access import csv_writer
 from google.cloud.security.common.data_access import load_data_sql_provider
+from google.cloud.security.common.data_access import query_cache
+from google.cloud.security.common.data_access import query_stats
+from google.cloud.security.common.data_access import raw_json_blobs
 from google.cloud.security.common.data_access.errors import MySQLError
 from google.cloud.security.common.data_access.errors import NoResultsError
 from google.cloud.security.common.data_access.sql_queries import create_tables
+from google.cloud.security.common.data_access.sql_queries import load_data
+# pylint: disable=line-too-long
+from google.cloud.security.common.data_access.sql_queries import raw_json_blobs_sql
+# pylint: enable=line-too-long
 from google.cloud.security.common.data_access.sql_queries import select_data
 from google.cloud.security.common.util import log_util
 
@@ -111,12 +124,257 @@ CREATE_TABLE_MAP = {
     'violations': create_tables.CREATE_VIOLATIONS_TABLE,
 }
 
+# Secondary indexes of the snapshot tables, as (index name, columns), added
+# once the table is loaded so that the loads don't maintain them row by row.
+SNAPSHOT_INDEX_MAP = {
+    'backend_services': [('idx_project_id', ['project_id'])],
+    'buckets': [('idx_project_number', ['project_number']),
+                ('idx_bucket_name', ['bucket_name'])],
+    'buckets_acl': [('idx_bucket', ['bucket'])],
+    'raw_buckets': [('idx_project_number', ['project_number'])],
+    'cloudsql_instances': [('idx_project_number', ['project_number'])],
+    'cloudsql_ipconfiguration_authorizednetworks': [
+        ('idx_project_number_instance_name',
+         ['project_number', 'instance_name'])],
+    'firewall_rules': [('idx_project_id', ['project_id']),
+                       ('idx_network', ['firewall_rule_network'])],
+    'folder_iam_policies': [('idx_folder_id', ['folder_id'])],
+    'raw_folder_iam_policies': [('idx_folder_id', ['folder_id'])],
+    'forwarding_rules': [('idx_project_id', ['project_id']),
+                         ('idx_network', ['network'])],
+    'groups': [('idx_group_id', ['group_id']),
+               ('idx_group_email', ['group_email'])],
+    'group_members': [('idx_group_id', ['group_id']),
+                      ('idx_member_email', ['member_email'])],
+    'instances': [('idx_project_id', ['project_id'])],
+    'instance_groups': [('idx_project_id', ['project_id']),
+                        ('idx_network', ['network'])],
+    'org_iam_policies': [('idx_org_id', ['org_id'])],
+    'raw_org_iam_policies': [('idx_org_id', ['org_id'])],
+    'project_iam_policies': [('idx_project_number', ['project_number'])],
+    'raw_project_iam_policies': [('idx_project_number', ['project_number'])],
+    'service_accounts': [('idx_project_id', ['project_id'])],
+}
+
 SNAPSHOT_STATUS_FILTER_CLAUSE = ' where status in ({})'
 
+# Number of rows fetched at a time from the server by the streaming reads.
+STREAM_CHUNK_SIZE = 1000
+
+# Maximum number of keys in the IN clause of a single copy statement.
+COPY_ROWS_CHUNK_SIZE = 1000
+
+# Maximum number of ids in the IN clause of a single batch lookup.
+BATCH_LOOKUP_CHUNK_SIZE = 1000
+
+# Maximum number of blobs stored or resolved by a single statement.
+RAW_JSON_CHUNK_SIZE = 500
+
+# Maximum number of query results cached per process, unless set by the
+# db_query_cache_size global configuration. Only the results of the
+# completed snapshots are cached, as their tables don't change anymore.
+DEFAULT_QUERY_CACHE_SIZE = 10000
+
+# The timing statistics of the statements executed by the process.
+QUERY_STATS = query_stats.QueryStats()
+
+# The statuses of the snapshot cycles that are complete.
+COMPLETE_SNAPSHOT_STATUSES = frozenset(
+    ['SUCCESS', 'PARTIAL_SUCCESS', 'FAILURE', 'TIMEOUT'])
+
+# Seconds before checking again whether an incomplete snapshot completed.
+SNAPSHOT_STATUS_RECHECK_SECONDS = 60
+
+# Whether each snapshot is complete, and when that was checked, by snapshot
+# timestamp.
+_SNAPSHOT_COMPLETION = {}
+_SNAPSHOT_COMPLETION_LOCK = threading.Lock()
+
+# Snapshot storage layouts, set by the snapshot_layout global configuration.
+# With the partitioned layout, the rows of all the snapshots of a resource
+# are stored in a single table, partitioned by snapshot, and each snapshot
+# table is a view selecting the partition of its snapshot.
+TABLES_LAYOUT = 'tables'
+PARTITIONED_LAYOUT = 'partitioned'
+
+# Resources always stored in a table per snapshot, as they are written
+# outside of the inventory, by statements that don't set the snapshot.
+UNPARTITIONED_RESOURCES = frozenset(['violations'])
+
+# The primary and unique keys, which must include the partitioning column.
+_UNIQUE_KEY_REGEX = re.compile(r'((?:PRIMARY|UNIQUE) KEY(?: `\w+`)? \()'
+                               r'([^)]*)\)')
+
+
+def get_query_cache_stats():
+    """Get the stats of the query cache of the process.
+
+    Returns:
+        dict: The number of hits, misses and cached results, and the hit
+            rate, or None if the cache was never used.
+    """
+    return query_cache.get_shared_cache_stats()
+
+
+def report_query_stats(run_name, output_dir=None):
+    """Log the summary of the statement timings of the process.
+
+    Args:
+        run_name (str): The name of the run, e.g. inventory.
+        output_dir (str): The directory to also write the statistics to, as
+            json, if any.
+    """
+    LOGGER.info('Query stats of the %s run:\n%s', run_name,
+                QUERY_STATS.format_table())
+    if not output_dir:
+        return
+    stats_path = os.path.join(output_dir, '{0}_query_stats_{1}.json'.format(
+        run_name, time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())))
+    try:
+        QUERY_STATS.write(stats_path)
+    except (IOError, OSError) as e:
+        LOGGER.error('Unable to write the query stats to %s: %s',
+                     stats_path, e)
+        return
+    LOGGER.info('Query stats written to %s', stats_path)
+
+
+def get_partitioned_table_name(resource_name):
+    """Get the name of the table partitioned by snapshot of a resource.
+
+    Args:
+        resource_name (str): String of the resource name.
+
+    Returns:
+        str: String of the partitioned table name.
+    """
+    return resource_name + '_snapshots'
+
+
+def get_partition_name(timestamp):
+    """Get the name of the partition of a snapshot.
+
+    Args:
+        timestamp (str): String of timestamp, formatted as YYYYMMDDTHHMMSSZ.
+
+    Returns:
+        str: String of the partition name.
+    """
+    return 'p' + timestamp
+
+
+def _create_partitioned_table_sql(resource_name, timestamp):
+    """Create the statement creating the partitioned table of a resource.
+
+    The statement is derived from the snapshot table of the resource: the
+    snapshot_id column is added to the table and to its unique keys, and the
+    secondary indexes are created with the table, as they are then only
+    built once.
+
+    Args:
+        resource_name (str): String of the resource name.
+        timestamp (str): String of timestamp of the first partition,
+            formatted as YYYYMMDDTHHMMSSZ.
+
+    Returns:
+        str: String of the create table statement.
+    """
+    create_table_sql = CREATE_TABLE_MAP[resource_name].format(
+        get_partitioned_table_name(resource_name)).strip().rstrip(';')
+    create_table_sql = create_table_sql.replace(
+        '(', '(\n        {0},'.format(create_tables.SNAPSHOT_ID_COLUMN), 1)
+    create_table_sql = _UNIQUE_KEY_REGEX.sub(
+        r'\1\2, `snapshot_id`)', create_table_sql)
+    definitions, table_options = create_table_sql.rsplit(')', 1)
+    keys = [create_tables.SNAPSHOT_KEY.format(index_name, ','.join(columns))
+            for index_name, columns in SNAPSHOT_INDEX_MAP.get(
+                resource_name, [])]
+    return '{0}\n    ){1}{2}'.format(
+        ',\n        '.join([definitions.rstrip()] + keys), table_options,
+        create_tables.PARTITION_BY_SNAPSHOT.format(
+            get_partition_name(timestamp), timestamp))
+
 
 class Dao(_db_connector.DbConnector):
     """Data access object (DAO)."""
 
+    # Whether the snapshots use the partitioned layout.
+    partitioned = False
+
+    # Whether the raw json columns are stored as content-addressed blobs.
+    dedup_raw_json = False
+
+    # The cache of the results of the completed snapshots, if enabled.
+    query_cache = None
+
+    # Whether the plans of the slow reads are logged.
+    explain_slow_queries = False
+
+    def __init__(self, global_configs=None):
+        """Initialize.
+
+        Args:
+            global_configs (dict): Global configurations.
+        """
+        super(Dao, self).__init__(global_configs)
+        global_configs = global_configs or {}
+        self.partitioned = global_configs.get(
+            'snapshot_layout', TABLES_LAYOUT) == PARTITIONED_LAYOUT
+        self.dedup_raw_json = bool(global_configs.get('dedup_raw_json'))
+        # The shared cache is sized by the first DAO using it.
+        cache_size = global_configs.get('db_query_cache_size',
+                                        DEFAULT_QUERY_CACHE_SIZE)
+        if global_configs and cache_size:
+            self.query_cache = query_cache.get_shared_cache(cache_size)
+        if 'db_slow_query_seconds' in global_configs:
+            QUERY_STATS.slow_query_seconds = float(
+                global_configs['db_slow_query_seconds'])
+        self.explain_slow_queries = bool(
+            global_configs.get('db_explain_slow_queries'))
+
+    @staticmethod
+    def _record_query(resource_name, sql, started, row_count):
+        """Record the execution of a statement in the query stats.
+
+        Args:
+            resource_name (str): String of the resource name.
+            sql (str): String of the sql statement.
+            started (float): The time the execution started.
+            row_count (int): The number of rows returned or affected.
+
+        Returns:
+            bool: True if the execution was slow, in which case it is logged.
+        """
+        seconds = time.time() - started
+        slow = QUERY_STATS.record(sql, seconds, row_count)
+        if slow:
+            LOGGER.warn('Slow query on %s, %.3fs and %s rows: %s',
+                        resource_name, seconds, row_count, sql.strip())
+        return slow
+
+    @staticmethod
+    def _explain_query(cursor, sql, values):
+        """Record and log the plan of a slow read.
+
+        Errors are logged, as the plan is only informative.
+
+        Args:
+            cursor (Cursor): The cursor the read was executed by.
+            sql (str): String of the sql statement.
+            values (tuple): Tuple of string for sql placeholder values.
+        """
+        if not sql.strip().upper().startswith('SELECT'):
+            return
+        try:
+            cursor.execute(select_data.EXPLAIN.format(sql.strip()), values)
+            plan = cursor.fetchall()
+        except (DataError, IntegrityError, InternalError, NotSupportedError,
+                OperationalError, ProgrammingError) as e:
+            LOGGER.warn('Unable to explain the slow query: %s', e)
+            return
+        QUERY_STATS.record_explain(sql, plan)
+        LOGGER.warn('Plan of the slow query: %s', plan)
+
     @staticmethod
     def map_row_to_object(object_class, row):
         """Instantiate an object from database row.
@@ -143,12 +401,67 @@ class Dao(_db_connector.DbConnector):
         Returns:
             str: String of the created snapshot table.
         """
+        if self._is_partitioned(resource_name):
+            return self._create_snapshot_partition(resource_name, timestamp)
         snapshot_table_name = self._create_snapshot_table_name(
             resource_name, timestamp)
         create_table_sql = CREATE_TABLE_MAP[resource_name]
         create_snapshot_sql = create_table_sql.format(snapshot_table_name)
-        cursor = self.conn.cursor()
-        cursor.execute(create_snapshot_sql)
+        with self.checkout_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(create_snapshot_sql)
+        return snapshot_table_name
+
+    def _is_partitioned(self, resource_name):
+        """Check whether the snapshots of a resource are partitioned.
+
+        Args:
+            resource_name (str): String of the resource name.
+
+        Returns:
+            bool: True if the resource uses the partitioned layout.
+        """
+        return (self.partitioned and
+                resource_name not in UNPARTITIONED_RESOURCES)
+
+    def _create_snapshot_partition(self, resource_name, timestamp):
+        """Add the partition and the view of a snapshot.
+
+        The partitioned table of the resource is created with the first
+        snapshot. The view is created under the snapshot table name, so that
+        the snapshot is read as if it had its own table, and reading it only
+        scans its partition.
+
+        Args:
+            resource_name (str): String of the resource name.
+            timestamp (str): String of timestamp, formatted as
+                YYYYMMDDTHHMMSSZ.
+
+        Returns:
+            str: String of the created snapshot view.
+        """
+        partitioned_table_name = get_partitioned_table_name(resource_name)
+        snapshot_table_name = self._create_snapshot_table_name(
+            resource_name, timestamp)
+        with self.checkout_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    _create_partitioned_table_sql(resource_name, timestamp))
+            except OperationalError as e:
+                # 1050: The table already exists.
+                if e[0] != 1050:
+                    raise
+                cursor.execute(create_tables.ADD_SNAPSHOT_PARTITION.format(
+                    partitioned_table_name, get_partition_name(timestamp),
+                    timestamp))
+            cursor.execute(create_tables.SELECT_SNAPSHOT_COLUMNS,
+                           (partitioned_table_name,))
+            columns = ','.join(['`{0}`'.format(row[0])
+                                for row in cursor.fetchall()])
+            cursor.execute(create_tables.CREATE_SNAPSHOT_VIEW.format(
+                snapshot_table_name, columns, partitioned_table_name,
+                timestamp))
         return snapshot_table_name
 
     @staticmethod
@@ -190,6 +503,9 @@ class Dao(_db_connector.DbConnector):
     def load_data(self, resource_name, timestamp, data):
         """Load data into a snapshot table.
 
+        The rows are streamed to the server while they are serialized,
+        through a named pipe where supported, instead of a csv file.
+
         Args:
             resource_name (str): String of the resource name.
             timestamp (str): String of timestamp, formatted as
@@ -198,17 +514,38 @@ class Dao(_db_connector.DbConnector):
 
         Raises:
             MySQLError: When an error has occured while executing the query.
+            CSVFileError: When an error has occured while writing the rows,
+                in which case nothing is loaded.
         """
-        with csv_writer.write_csv(resource_name, data) as csv_file:
+        if (self.dedup_raw_json and
+                resource_name in raw_json_blobs.RAW_JSON_COLUMN_MAP):
+            # The blobs of each chunk of rows are stored before the rows
+            # referencing them are streamed.
+            data = self._store_raw_json(resource_name, data)
+        with csv_writer.stream_csv(resource_name, data) as csv_file:
             try:
-                snapshot_table_name = self._create_snapshot_table_name(
-                    resource_name, timestamp)
-                load_data_sql = load_data_sql_provider.provide_load_data_sql(
-                    resource_name, csv_file.name, snapshot_table_name)
+                if self._is_partitioned(resource_name):
+                    load_data_sql = (
+                        load_data_sql_provider.provide_load_data_sql(
+                            resource_name, csv_file.name,
+                            get_partitioned_table_name(resource_name),
+                            snapshot_id=timestamp))
+                else:
+                    load_data_sql = (
+                        load_data_sql_provider.provide_load_data_sql(
+                            resource_name, csv_file.name,
+                            self._create_snapshot_table_name(
+                                resource_name, timestamp)))
                 LOGGER.debug('SQL: %s', load_data_sql)
-                cursor = self.conn.cursor()
-                cursor.execute(load_data_sql)
-                self.conn.commit()
+                with self.checkout_connection() as conn:
+                    started = time.time()
+                    cursor = conn.cursor()
+                    row_count = cursor.execute(load_data_sql)
+                    # The rows are rolled back if they were not all written.
+                    csv_file.wait()
+                    conn.commit()
+                    self._record_query(resource_name, load_data_sql, started,
+                                       row_count)
                 # TODO: Return the snapshot table name so that it can be tracked
                 # in the main snapshot table.
             except (DataError, IntegrityError, InternalError,
@@ -216,6 +553,106 @@ class Dao(_db_connector.DbConnector):
                     ProgrammingError) as e:
                 raise MySQLError(resource_name, e)
 
+    def copy_snapshot_rows(self, resource_name, from_timestamp, to_timestamp,
+                           key_column, keys):
+        """Copy rows from one snapshot table to another, server-side.
+
+        Args:
+            resource_name (str): String of the resource name.
+            from_timestamp (str): Timestamp of the snapshot to copy from,
+                formatted as YYYYMMDDTHHMMSSZ.
+            to_timestamp (str): Timestamp of the snapshot to copy to,
+                formatted as YYYYMMDDTHHMMSSZ.
+            key_column (str): The column to select the rows to copy by.
+            keys (list): The values of key_column of the rows to copy.
+
+        Returns:
+            int: The number of rows copied.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        copied = 0
+        try:
+            with self.checkout_connection() as conn:
+                cursor = conn.cursor()
+                for i in xrange(0, len(keys), COPY_ROWS_CHUNK_SIZE):
+                    chunk = keys[i:i + COPY_ROWS_CHUNK_SIZE]
+                    copy_sql = self._get_copy_snapshot_rows_sql(
+                        resource_name, from_timestamp, to_timestamp,
+                        key_column, len(chunk))
+                    copied += cursor.execute(copy_sql, chunk)
+                conn.commit()
+        except (DataError, IntegrityError, InternalError, NotSupportedError,
+                OperationalError, ProgrammingError) as e:
+            raise MySQLError(resource_name, e)
+        return copied
+
+    def _get_copy_snapshot_rows_sql(self, resource_name, from_timestamp,
+                                    to_timestamp, key_column, key_count):
+        """Get the statement copying a chunk of rows between snapshots.
+
+        Args:
+            resource_name (str): String of the resource name.
+            from_timestamp (str): Timestamp of the snapshot to copy from,
+                formatted as YYYYMMDDTHHMMSSZ.
+            to_timestamp (str): Timestamp of the snapshot to copy to,
+                formatted as YYYYMMDDTHHMMSSZ.
+            key_column (str): The column to select the rows to copy by.
+            key_count (int): The number of keys in the chunk.
+
+        Returns:
+            str: The copy statement, with a placeholder for each key.
+        """
+        columns = ','.join(load_data_sql_provider.FIELDNAME_MAP[resource_name])
+        from_table = self._create_snapshot_table_name(
+            resource_name, from_timestamp)
+        placeholders = ','.join(['%s'] * key_count)
+        if self._is_partitioned(resource_name):
+            return load_data.COPY_SNAPSHOT_ROWS_TO_PARTITION.format(
+                get_partitioned_table_name(resource_name), columns,
+                to_timestamp, from_table, key_column, placeholders)
+        return load_data.COPY_SNAPSHOT_ROWS.format(
+            self._create_snapshot_table_name(resource_name, to_timestamp),
+            columns, from_table, key_column, placeholders)
+
+    def add_snapshot_indexes(self, resource_name, timestamp):
+        """Add the secondary indexes of a loaded snapshot table.
+
+        All the indexes of the table are added by a single statement, so
+        that the table is only rebuilt once. The partitioned tables are
+        created with their indexes, so nothing is added to them.
+
+        Args:
+            resource_name (str): String of the resource name.
+            timestamp (str): String of timestamp, formatted as
+                YYYYMMDDTHHMMSSZ.
+
+        Returns:
+            int: The number of indexes added.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        indexes = SNAPSHOT_INDEX_MAP.get(resource_name)
+        if not indexes or self._is_partitioned(resource_name):
+            return 0
+        add_index_clauses = [
+            create_tables.ADD_INDEX.format(index_name, ','.join(columns))
+            for index_name, columns in indexes]
+        add_indexes_sql = create_tables.ADD_INDEXES.format(
+            self._create_snapshot_table_name(resource_name, timestamp),
+            ', '.join(add_index_clauses))
+        LOGGER.debug('SQL: %s', add_indexes_sql)
+        try:
+            with self.checkout_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(add_indexes_sql)
+        except (DataError, IntegrityError, InternalError, NotSupportedError,
+                OperationalError, ProgrammingError) as e:
+            raise MySQLError(resource_name, e)
+        return len(indexes)
+
     def select_record_count(self, resource_name, timestamp):
         """Select the record count from a snapshot table.
 
@@ -234,9 +671,10 @@ class Dao(_db_connector.DbConnector):
         try:
             record_count_sql = select_data.RECORD_COUNT.format(
                 resource_name, timestamp)
-            cursor = self.conn.cursor()
-            cursor.execute(record_count_sql)
-            return cursor.fetchone()[0]
+            with self.checkout_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(record_count_sql)
+                return cursor.fetchone()[0]
         except (DataError, IntegrityError, InternalError, NotSupportedError,
                 OperationalError, ProgrammingError) as e:
             raise MySQLError(resource_name, e)
@@ -257,10 +695,11 @@ class Dao(_db_connector.DbConnector):
         """
         try:
             group_ids_sql = select_data.GROUP_IDS.format(timestamp)
-            cursor = self.conn.cursor(cursorclass=cursors.DictCursor)
-            cursor.execute(group_ids_sql)
-            rows = cursor.fetchall()
-            return [row['group_id'] for row in rows]
+            with self.checkout_connection() as conn:
+                cursor = conn.cursor(cursorclass=cursors.DictCursor)
+                cursor.execute(group_ids_sql)
+                rows = cursor.fetchall()
+                return [row['group_id'] for row in rows]
         except (DataError, IntegrityError, InternalError, NotSupportedError,
                 OperationalError, ProgrammingError) as e:
             raise MySQLError(resource_name, e)
@@ -280,13 +719,296 @@ class Dao(_db_connector.DbConnector):
             MySQLError: When an error has occured while executing the query.
         """
         try:
-            cursor = self.conn.cursor(cursorclass=cursors.DictCursor)
-            cursor.execute(sql, values)
-            return cursor.fetchall()
+            with self.checkout_connection() as conn:
+                started = time.time()
+                cursor = conn.cursor(cursorclass=cursors.DictCursor)
+                cursor.execute(sql, values)
+                rows = cursor.fetchall()
+                if (self._record_query(resource_name, sql, started,
+                                       len(rows)) and
+                        self.explain_slow_queries):
+                    self._explain_query(cursor, sql, values)
+            if self.dedup_raw_json:
+                self._resolve_raw_json(rows)
+            return rows
+        except (DataError, IntegrityError, InternalError, NotSupportedError,
+                OperationalError, ProgrammingError) as e:
+            raise MySQLError(resource_name, e)
+
+    def execute_sql_with_fetch_by_ids(self, resource_name, sql, timestamp,
+                                      ids):
+        """Executes a batch lookup statement with fetch, by chunks of ids.
+
+        The ids are deduplicated, and looked up BATCH_LOOKUP_CHUNK_SIZE at a
+        time, so that a long list of ids takes a few round trips instead of
+        one per id.
+
+        Args:
+            resource_name (str): String of the resource name.
+            sql (str): String of the sql statement, with a {0} placeholder
+                for the timestamp and a {1} placeholder for the IN list of
+                the ids.
+            timestamp (str): String of timestamp of the snapshot queried,
+                formatted as YYYYMMDDTHHMMSSZ.
+            ids (iterable): The ids to look up.
+
+        Returns:
+            list: A list of dict representing rows of sql query result.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        ids = list(collections.OrderedDict.fromkeys(ids))
+        rows = []
+        for i in xrange(0, len(ids), BATCH_LOOKUP_CHUNK_SIZE):
+            chunk = tuple(ids[i:i + BATCH_LOOKUP_CHUNK_SIZE])
+            rows.extend(self.execute_sql_with_fetch(
+                resource_name,
+                sql.format(timestamp, ','.join(['%s'] * len(chunk))),
+                chunk))
+        return rows
+
+    def is_snapshot_complete(self, timestamp):
+        """Check whether a snapshot is recorded as complete.
+
+        Complete snapshots are remembered for the life of the process, and
+        incomplete ones are checked again after a while.
+
+        Args:
+            timestamp (str): String of timestamp, formatted as
+                YYYYMMDDTHHMMSSZ.
+
+        Returns:
+            bool: True if the snapshot cycle is complete.
+        """
+        with _SNAPSHOT_COMPLETION_LOCK:
+            completion = _SNAPSHOT_COMPLETION.get(timestamp)
+        if completion is not None:
+            complete, checked_at = completion
+            if (complete or
+                    time.time() - checked_at < SNAPSHOT_STATUS_RECHECK_SECONDS):
+                return complete
+
+        try:
+            rows = self.execute_sql_with_fetch(
+                'snapshot_cycles', select_data.SNAPSHOT_CYCLE_STATUS,
+                (timestamp,))
+        except MySQLError as e:
+            LOGGER.warn('Unable to get the status of snapshot %s: %s',
+                        timestamp, e)
+            return False
+        complete = bool(rows) and (
+            rows[0]['status'] in COMPLETE_SNAPSHOT_STATUSES)
+        with _SNAPSHOT_COMPLETION_LOCK:
+            _SNAPSHOT_COMPLETION[timestamp] = (complete, time.time())
+        return complete
+
+    def execute_cached_sql_with_fetch(self, resource_name, sql, values,
+                                      timestamp):
+        """Executes a sql statement on a snapshot with fetch, cached.
+
+        The results are cached when the snapshot is complete, by statement,
+        snapshot and values. Each caller gets its own copy of the rows.
+
+        Args:
+            resource_name (str): String of the resource name.
+            sql (str): String of the sql statement.
+            values (tuple): Tuple of string for sql placeholder values.
+            timestamp (str): String of timestamp of the snapshot queried,
+                formatted as YYYYMMDDTHHMMSSZ.
+
+        Returns:
+            list: A list of dict representing rows of sql query result.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        if self.query_cache is None or not self.is_snapshot_complete(
+                timestamp):
+            return self.execute_sql_with_fetch(resource_name, sql, values)
+
+        key = (sql, timestamp, tuple(values or ()))
+        cached, rows = self.query_cache.get(key)
+        if not cached:
+            rows = tuple(self.execute_sql_with_fetch(resource_name, sql,
+                                                     values))
+            self.query_cache.put(key, rows)
+        return [dict(row) for row in rows]
+
+    def iter_sql_with_fetch(self, resource_name, sql, values,
+                            chunk_size=STREAM_CHUNK_SIZE):
+        """Executes a provided sql statement, streaming the result rows.
+
+        The rows are read from the server chunk_size at a time, with an
+        unbuffered cursor on a dedicated connection, so that only one chunk
+        is held in memory at a time. The connection is busy until the rows
+        are all read or the iterator is closed.
+
+        Args:
+            resource_name (str): String of the resource name.
+            sql (str): String of the sql statement.
+            values (tuple): Tuple of string for sql placeholder values.
+            chunk_size (int): Number of rows to fetch at a time.
+
+        Yields:
+            dict: A row of the sql query result.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        try:
+            with self.dedicated_connection() as conn:
+                cursor = conn.cursor(cursorclass=cursors.SSDictCursor)
+                try:
+                    cursor.execute(sql, values)
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        if self.dedup_raw_json:
+                            self._resolve_raw_json(rows)
+                        for row in rows:
+                            yield row
+                finally:
+                    # Reads and discards the remaining rows, if any.
+                    cursor.close()
         except (DataError, IntegrityError, InternalError, NotSupportedError,
                 OperationalError, ProgrammingError) as e:
             raise MySQLError(resource_name, e)
 
+    def create_raw_json_blobs_table(self):
+        """Create the raw json blobs table, if it doesn't exist.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        self.execute_sql_with_commit(raw_json_blobs_sql.RESOURCE_NAME,
+                                     raw_json_blobs_sql.CREATE_TABLE, None)
+
+    def _store_raw_json(self, resource_name, data):
+        """Store the raw json values of rows as blobs.
+
+        The blobs are stored by a connection of their own, as the rows are
+        read while the load holds its pooled connection.
+
+        Args:
+            resource_name (str): String of the resource name.
+            data (iterable): An iterable of the rows to be loaded.
+
+        Yields:
+            dict: The rows, with their raw json values replaced by references
+                to the stored blobs.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        columns = raw_json_blobs.RAW_JSON_COLUMN_MAP[resource_name]
+        blobs = {}
+        rows = []
+        with self.dedicated_connection() as conn:
+            for row in data:
+                row = dict(row)
+                for column in columns:
+                    blob = raw_json_blobs.create_blob(row.get(column))
+                    if blob:
+                        blobs[blob[0]] = blob[1]
+                        row[column] = raw_json_blobs.create_reference(blob[0])
+                rows.append(row)
+                # Rows sharing their blobs, or without any, are flushed too,
+                # so that they are not all held until the end.
+                if (len(blobs) >= RAW_JSON_CHUNK_SIZE or
+                        len(rows) >= STREAM_CHUNK_SIZE):
+                    if blobs:
+                        self._insert_raw_json_blobs(conn, blobs)
+                        blobs = {}
+                    for stored_row in rows:
+                        yield stored_row
+                    rows = []
+            if blobs:
+                self._insert_raw_json_blobs(conn, blobs)
+        for stored_row in rows:
+            yield stored_row
+
+    @staticmethod
+    def _insert_raw_json_blobs(conn, blobs):
+        """Insert the blobs that are not stored yet.
+
+        The stored blobs are looked up first, so that the payloads already
+        stored by the previous snapshots are not sent again.
+
+        Args:
+            conn (Connection): The connection to insert the blobs with.
+            blobs (dict): The canonical json of the blobs, by sha1.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        blob_hashes = blobs.keys()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                raw_json_blobs_sql.SELECT_BLOB_HASHES.format(
+                    ','.join(['%s'] * len(blob_hashes))),
+                blob_hashes)
+            stored = set(row[0] for row in cursor.fetchall())
+            new_blobs = [(blob_hash, blobs[blob_hash])
+                         for blob_hash in blob_hashes
+                         if blob_hash not in stored]
+            if not new_blobs:
+                return
+            cursor.execute(
+                raw_json_blobs_sql.INSERT_BLOBS.format(','.join(
+                    [raw_json_blobs_sql.INSERT_BLOB_VALUES] *
+                    len(new_blobs))),
+                [value for new_blob in new_blobs for value in new_blob])
+            conn.commit()
+        except (DataError, IntegrityError, InternalError, NotSupportedError,
+                OperationalError, ProgrammingError) as e:
+            raise MySQLError(raw_json_blobs_sql.RESOURCE_NAME, e)
+        LOGGER.debug('Stored %s new raw json blobs, %s already stored.',
+                     len(new_blobs), len(stored))
+
+    def _resolve_raw_json(self, rows):
+        """Replace the blob references of rows by the blobs, in place.
+
+        Args:
+            rows (list): The rows read, as dicts.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query.
+        """
+        references = {}
+        for row in rows:
+            for column, value in row.iteritems():
+                blob_hash = raw_json_blobs.get_reference(value)
+                if blob_hash:
+                    references.setdefault(blob_hash, []).append((row, column))
+        if not references:
+            return
+
+        blob_hashes = references.keys()
+        blobs = {}
+        try:
+            with self.checkout_connection() as conn:
+                cursor = conn.cursor()
+                for i in xrange(0, len(blob_hashes), RAW_JSON_CHUNK_SIZE):
+                    chunk = blob_hashes[i:i + RAW_JSON_CHUNK_SIZE]
+                    cursor.execute(
+                        raw_json_blobs_sql.SELECT_BLOBS.format(
+                            ','.join(['%s'] * len(chunk))),
+                        chunk)
+                    blobs.update(cursor.fetchall())
+        except (DataError, IntegrityError, InternalError, NotSupportedError,
+                OperationalError, ProgrammingError) as e:
+            raise MySQLError(raw_json_blobs_sql.RESOURCE_NAME, e)
+
+        for blob_hash, columns in references.iteritems():
+            if blob_hash not in blobs:
+                LOGGER.warn('Raw json blob not found: %s', blob_hash)
+                continue
+            for row, column in columns:
+                row[column] = blobs[blob_hash]
+
     def execute_sql_with_commit(self, resource_name, sql, values):
         """Executes a provided sql statement with commit.
 
@@ -299,9 +1021,42 @@ class Dao(_db_connector.DbConnector):
             MySQLError: When an error has occured while executing the query.
         """
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql, values)
-            self.conn.commit()
+            with self.checkout_connection() as conn:
+                started = time.time()
+                cursor = conn.cursor()
+                row_count = cursor.execute(sql, values)
+                conn.commit()
+                self._record_query(resource_name, sql, started, row_count)
+        except (DataError, IntegrityError, InternalError, NotSupportedError,
+                OperationalError, ProgrammingError) as e:
+            raise MySQLError(resource_name, e)
+
+    def execute_sql_with_commit_many(self, resource_name, sql, values_list):
+        """Executes a provided sql statement for many rows, in one commit.
+
+        INSERT statements are sent as multi-row inserts.
+
+        Args:
+            resource_name (str): String of the resource name.
+            sql (str): String of the sql statement.
+            values_list (list): List of tuples of string for sql placeholder
+                values, one tuple per row.
+
+        Returns:
+            int: The number of affected rows.
+
+        Raises:
+            MySQLError: When an error has occured while executing the query,
+                in which case none of the rows were committed.
+        """
+        try:
+            with self.checkout_connection() as conn:
+                started = time.time()
+                cursor = conn.cursor()
+                row_count = cursor.executemany(sql, values_list)
+                conn.commit()
+                self._record_query(resource_name, sql, started, row_count)
+                return row_count
         except (DataError, IntegrityError, InternalError, NotSupportedError,
                 OperationalError, ProgrammingError) as e:
             raise MySQLError(resource_name, e)
@@ -326,13 +1081,15 @@ class Dao(_db_connector.DbConnector):
         status_params = ','.join(['%s']*len(statuses))
         filter_clause = SNAPSHOT_STATUS_FILTER_CLAUSE.format(status_params)
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                select_data.LATEST_SNAPSHOT_TIMESTAMP + filter_clause, statuses)
-            row = cursor.fetchone()
-            if row:
-                return row[0]
-            raise NoResultsError('No snapshot cycle found.')
+            with self.checkout_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    select_data.LATEST_SNAPSHOT_TIMESTAMP + filter_clause,
+                    statuses)
+                row = cursor.fetchone()
+                if row:
+                    return row[0]
+                raise NoResultsError('No snapshot cycle found.')
         except (DataError, IntegrityError, InternalError, NotSupportedError,
                 OperationalError, ProgrammingError, NoResultsError) as e:
             raise MySQLError('snapshot_cycles', e)
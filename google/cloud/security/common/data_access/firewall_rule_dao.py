@@ -43,3 +43,20 @@ class FirewallRuleDao(dao.Dao):
             resource.ResourceType.FIREWALL_RULE, query, ())
         return [self.map_row_to_object(firewall_rule.FirewallRule, row)
                 for row in rows]
+
+    def iter_firewall_rules(self, timestamp):
+        """Stream the firewall rules of a particular snapshot.
+
+        Args:
+            timestamp (int): The snapshot timestamp.
+
+        Yields:
+            FirewallRule: The firewall rules.
+
+        Raises:
+            MySQLError if a MySQL error occurs.
+        """
+        query = select_data.FIREWALL_RULES.format(timestamp)
+        for row in self.iter_sql_with_fetch(
+                resource.ResourceType.FIREWALL_RULE, query, ()):
+            yield self.map_row_to_object(firewall_rule.FirewallRule, row)
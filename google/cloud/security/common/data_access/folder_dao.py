@@ -81,8 +81,8 @@ class FolderDao(dao.Dao):
             Folder: A Folder from the database snapshot.
         """
         query = select_data.FOLDER_BY_ID.format(timestamp)
-        rows = self.execute_sql_with_fetch(
-            resource.ResourceType.FOLDER, query, (folder_id,))
+        rows = self.execute_cached_sql_with_fetch(
+            resource.ResourceType.FOLDER, query, (folder_id,), timestamp)
         if rows:
             return self.map_row_to_object(rows[0])
         return None
@@ -14,6 +14,13 @@
 
 """ Forseti Database Objects. """
 
+import collections
+import json
+import os
+import Queue
+import sys
+import threading
+
 from sqlalchemy import create_engine
 from sqlalchemy import Column
 from sqlalchemy import String
@@ -21,21 +28,38 @@ from sqlalchemy import Text
 from sqlalchemy import BigInteger
 from sqlalchemy import Date
 from sqlalchemy import desc
+from sqlalchemy import text
 
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql.elements import literal_column
 
+from google.cloud.security.common.data_access import raw_json_blobs
+# pylint: disable=line-too-long
+from google.cloud.security.common.data_access.sql_queries import raw_json_blobs_sql
+# pylint: enable=line-too-long
+from google.cloud.security.common.util import log_util
+
 
 # TODO: The next editor must remove this disable and correct issues.
 # pylint: disable=missing-type-doc,missing-return-type-doc,missing-return-doc
 # pylint: disable=missing-param-doc,missing-yield-doc,missing-yield-type-doc
 
 
+LOGGER = log_util.get_logger(__name__)
+
 BASE = declarative_base()
-TABLE_CACHE = {}
 PER_YIELD = 1024
 
+# The models of the most recently used snapshots, by snapshot timestamp.
+TABLE_CACHE = collections.OrderedDict()
+TABLE_CACHE_LOCK = threading.Lock()
+MAX_CACHED_SNAPSHOTS = 2
+
+# Number of tables read concurrently by the importer.
+DEFAULT_MAX_WORKERS = 4
+
 # pylint: disable=too-many-locals
 class SnapshotState(object):
     """Possible states for Forseti snapshots."""
@@ -67,14 +91,50 @@ class Snapshot(BASE):
 def create_table_names(timestamp, schema_version):
     """Forseti tables are namespaced via snapshot timestamp.
        This function generates the appropriate classes to
-       abstract the access to a single snapshot."""
-
+       abstract the access to a single snapshot.
+
+       The classes of the MAX_CACHED_SNAPSHOTS most recently used
+       snapshots are cached, and the tables of the evicted ones are
+       removed from the metadata."""
+
+    with TABLE_CACHE_LOCK:
+        if timestamp in TABLE_CACHE:
+            result = TABLE_CACHE.pop(timestamp)
+        else:
+            result = _create_table_names(timestamp, schema_version)
+        TABLE_CACHE[timestamp] = result
+        while len(TABLE_CACHE) > MAX_CACHED_SNAPSHOTS:
+            _, evicted = TABLE_CACHE.popitem(last=False)
+            _remove_tables(evicted)
+        return result
+
+
+def _remove_tables(table_names):
+    """Remove the tables of a snapshot from the metadata.
+
+    Args:
+        table_names (tuple): The classes of the snapshot, as returned by
+            create_table_names().
+    """
+    organization, folders, tables, policies, group_membership = table_names
+    models = ([organization, folders] + [table for _, table in tables] +
+              list(policies) + list(group_membership))
+    for model in models:
+        BASE.metadata.remove(model.__table__)
+
+
+def _create_table_names(timestamp, schema_version):
+    """Create the classes of a snapshot, see create_table_names().
+
+    The classes of each snapshot have the same names, so they are declared
+    on a base of their own, sharing the metadata of BASE, instead of
+    replacing the classes of the other cached snapshots in the class
+    registry of BASE."""
+
+    snapshot_base = declarative_base(metadata=BASE.metadata)
     schema_number = float(schema_version)
 
-    if timestamp in TABLE_CACHE:
-        return TABLE_CACHE[timestamp]
-
-    class Project(BASE):
+    class Project(snapshot_base):
         """Represtents a GCP project row under the organization."""
 
         __tablename__ = 'projects_%s' % timestamp
@@ -95,7 +155,7 @@ def create_table_names(timestamp, schema_version):
             return """<Project(id='{}', project_name='{}')>""".format(
                 self.id, self.project_name)
 
-    class ProjectPolicy(BASE):
+    class ProjectPolicy(snapshot_base):
         """Represents a GCP project policy row under the organization."""
 
         __tablename__ = 'raw_project_iam_policies_%s' % timestamp
@@ -120,7 +180,7 @@ def create_table_names(timestamp, schema_version):
 
             return self.iam_policy
 
-    class OrganizationPolicy(BASE):
+    class OrganizationPolicy(snapshot_base):
         """Represents a GCP organization policy row."""
 
         __tablename__ = 'raw_org_iam_policies_%s' % timestamp
@@ -145,7 +205,7 @@ def create_table_names(timestamp, schema_version):
 
             return self.iam_policy
 
-    class Bucket(BASE):
+    class Bucket(snapshot_base):
         """Represents a GCS bucket item."""
 
         __tablename__ = 'buckets_%s' % timestamp
@@ -169,7 +229,7 @@ def create_table_names(timestamp, schema_version):
             return """<Bucket(id='{}', name='{}', location='{}')>""".format(
                 self.bucket_id, self.bucket_name, self.bucket_location)
 
-    class Organization(BASE):
+    class Organization(snapshot_base):
         """Represents a GCP organization."""
 
         __tablename__ = 'organizations_%s' % timestamp
@@ -190,7 +250,7 @@ def create_table_names(timestamp, schema_version):
                 self.name,
                 self.display_name)
 
-    class GroupMembers(BASE):
+    class GroupMembers(snapshot_base):
         """Represents Gsuite group membership."""
 
         __tablename__ = 'group_members_%s' % timestamp
@@ -214,7 +274,7 @@ def create_table_names(timestamp, schema_version):
                 self.member_email,
                 self.member_status)
 
-    class Groups(BASE):
+    class Groups(snapshot_base):
         """Represents a Gsuite group."""
 
         __tablename__ = 'groups_%s' % timestamp
@@ -236,7 +296,7 @@ def create_table_names(timestamp, schema_version):
                 self.group_kind,
                 self.direct_member_count)
 
-    class Folders(BASE):
+    class Folders(snapshot_base):
         """Represents a folder."""
 
         __tablename__ = 'folders_%s' % timestamp
@@ -258,7 +318,7 @@ def create_table_names(timestamp, schema_version):
                 self.display_name)
 
     if schema_number >= 2.0:
-        class FolderPolicy(BASE):
+        class FolderPolicy(snapshot_base):
             """Represents a GCP folder policy row under the organization."""
 
             __tablename__ = 'raw_folder_iam_policies_%s' % timestamp
@@ -284,7 +344,7 @@ def create_table_names(timestamp, schema_version):
 
                 return self.iam_policy
 
-    class CloudSqlInstances(BASE):
+    class CloudSqlInstances(snapshot_base):
         """Represents a Cloud SQL instance."""
 
         __tablename__ = 'cloudsql_instances_%s' % timestamp
@@ -301,7 +361,7 @@ def create_table_names(timestamp, schema_version):
                 self.id,
                 self.name)
 
-    class Instances(BASE):
+    class Instances(snapshot_base):
         """Represents a Cloud GCE instance."""
 
         __tablename__ = 'instances_%s' % timestamp
@@ -320,7 +380,7 @@ def create_table_names(timestamp, schema_version):
                 self.id,
                 self.name)
 
-    class InstanceGroups(BASE):
+    class InstanceGroups(snapshot_base):
         """Represents a Cloud GCE instance group."""
 
         __tablename__ = 'instance_groups_%s' % timestamp
@@ -338,7 +398,7 @@ def create_table_names(timestamp, schema_version):
                 self.id,
                 self.name)
 
-    class BigqueryDatasets(BASE):
+    class BigqueryDatasets(snapshot_base):
         """Represents a Cloud Bigquery dataset."""
 
         __tablename__ = 'bigquery_datasets_%s' % timestamp
@@ -356,7 +416,7 @@ def create_table_names(timestamp, schema_version):
                 self.id,
                 self.dataset_id)
 
-    class BackendServices(BASE):
+    class BackendServices(snapshot_base):
         """Represents a Cloud Backend Service."""
 
         __tablename__ = 'backend_services_%s' % timestamp
@@ -389,21 +449,174 @@ def create_table_names(timestamp, schema_version):
                ('backendservices', BackendServices)],
               supported_policies,
               [GroupMembers, Groups])
-    TABLE_CACHE[timestamp] = result
     return result
 
 
+class _TableReader(object):
+    """Reads the rows of a table in a thread of its own.
+
+    The rows are read in primary key order, with a session of their own, and
+    buffered in a bounded queue until they are consumed.
+    """
+
+    _DONE = object()
+
+    def __init__(self, session_factory, table, offset=0):
+        """Initialize.
+
+        Args:
+            session_factory (sessionmaker): Creates the session to read with.
+            table (object): The table to read.
+            offset (int): Number of rows to skip.
+        """
+        self.table = table
+        self.offset = offset
+        self._session_factory = session_factory
+        self._queue = Queue.Queue(PER_YIELD)
+        self._stopped = threading.Event()
+        self._exc_info = None
+        self._thread = threading.Thread(
+            target=self._read, name='TableReader-%s' % table.__tablename__)
+        self._thread.daemon = True
+
+    def start(self):
+        """Start reading the rows, if not started yet."""
+        if self._thread.ident is None:
+            self._thread.start()
+
+    def stop(self):
+        """Stop reading the rows, if not done yet."""
+        self._stopped.set()
+
+    def _put(self, item):
+        """Queue an item, unless stopped while waiting for room.
+
+        Args:
+            item (object): The item to queue.
+
+        Returns:
+            bool: False if the reader was stopped.
+        """
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def _read(self):
+        """Read the rows into the queue."""
+        session = self._session_factory()
+        # pylint: disable=broad-except
+        try:
+            primary_key = self.table.__table__.primary_key.columns
+            query = (
+                session.query(self.table)
+                .order_by(*primary_key)
+                .offset(self.offset))
+            for row in query.yield_per(PER_YIELD):
+                if not self._put(row):
+                    return
+        except Exception:
+            self._exc_info = sys.exc_info()
+        finally:
+            session.close()
+        # pylint: enable=broad-except
+        self._put(self._DONE)
+
+    def __iter__(self):
+        """Iterate the rows, as they are read.
+
+        Yields:
+            object: The rows of the table.
+
+        Raises:
+            Exception: The error that interrupted the read, with its original
+                traceback.
+        """
+        self.start()
+        while True:
+            row = self._queue.get()
+            if row is self._DONE:
+                break
+            yield row
+        if self._exc_info is not None:
+            error_type, error, traceback = self._exc_info
+            raise error_type, error, traceback
+
+
+class _Checkpoint(object):
+    """Position of an import, saved to resume it once interrupted."""
+
+    def __init__(self, path):
+        """Initialize, loading the saved position if any.
+
+        Args:
+            path (str): The file the position is saved to, or None to not
+                save it.
+        """
+        self.path = path
+        self.snapshot = None
+        self.section = None
+        self.offset = 0
+        if path and os.path.exists(path):
+            with open(path) as checkpoint_file:
+                position = json.load(checkpoint_file)
+            self.snapshot = position['snapshot']
+            self.section = position['section']
+            self.offset = position['offset']
+
+    def save(self, snapshot, section, offset):
+        """Save a position.
+
+        Args:
+            snapshot (str): The timestamp of the imported snapshot.
+            section (str): The section being imported.
+            offset (int): Number of items of the section already imported.
+        """
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as checkpoint_file:
+            json.dump({'snapshot': snapshot, 'section': section,
+                       'offset': offset}, checkpoint_file)
+        os.rename(tmp_path, self.path)
+
+    def clear(self):
+        """Remove the saved position, once the import is complete."""
+        self.snapshot = None
+        self.section = None
+        self.offset = 0
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
 class Importer(object):
     """Forseti data importer to iterate the inventory and policies."""
 
     SUPPORTED_SCHEMAS = ['1.0', '2.0']
 
-    def __init__(self, db_connect_string):
+    def __init__(self, db_connect_string, max_workers=DEFAULT_MAX_WORKERS,
+                 checkpoint_path=None):
+        """Initialize.
+
+        Args:
+            db_connect_string (str): The database url.
+            max_workers (int): Number of tables read concurrently.
+            checkpoint_path (str): The file the position of the import is
+                saved to, to resume it once interrupted, or None.
+        """
         engine = create_engine(db_connect_string, pool_recycle=3600)
         BASE.metadata.create_all(engine)
-        session = sessionmaker(bind=engine)
-        self.session = session()
+        self.session_factory = sessionmaker(bind=engine)
+        self.session = self.session_factory()
         self.engine = engine
+        self.max_workers = max(1, max_workers)
+        self.checkpoint_path = checkpoint_path
+        self.has_raw_json_blobs = engine.has_table(
+            raw_json_blobs_sql.RESOURCE_NAME)
+        self._blob_cache = {}
 
     def _table_exists_or_raise(self, table, context_msg=None):
         """Raises exception if table does not exists.
@@ -421,6 +634,38 @@ class Importer(object):
                 msg = '{}, hint: {}'.format(msg, context_msg)
             raise Exception(msg)
 
+    def _resolve_raw_json(self, row):
+        """Replace the blob references of a row by the blobs.
+
+        The values are set as loaded from the database, so that the row is
+        not updated by the session.
+
+        Args:
+            row (object): The row to resolve.
+
+        Returns:
+            object: The row.
+        """
+        if not self.has_raw_json_blobs:
+            return row
+        for column in raw_json_blobs.RAW_JSON_COLUMNS:
+            blob_hash = raw_json_blobs.get_reference(
+                getattr(row, column, None))
+            if not blob_hash:
+                continue
+            if blob_hash not in self._blob_cache:
+                blob = self.session.execute(
+                    text(raw_json_blobs_sql.SELECT_BLOBS.format(':blob_hash')),
+                    {'blob_hash': blob_hash}).fetchone()
+                if blob is None:
+                    LOGGER.warn('Raw json blob not found: %s', blob_hash)
+                    continue
+                if len(self._blob_cache) >= PER_YIELD:
+                    self._blob_cache.clear()
+                self._blob_cache[blob_hash] = blob[1]
+            set_committed_value(row, column, self._blob_cache[blob_hash])
+        return row
+
     def _get_latest_snapshot(self):
         """Find the latest snapshot from the database.
             Returns:
@@ -434,21 +679,29 @@ class Importer(object):
             .order_by(Snapshot.start_time.desc())
             .first())
 
-    def __iter__(self):
-        """Main interface to get the data, returns assets and then policies."""
+    def _get_snapshot(self, cycle_timestamp):
+        """Find a snapshot from the database.
+            Args:
+                cycle_timestamp (str): The timestamp of the snapshot.
+            Returns:
+                object: Forseti snapshot description table, or None.
+        """
 
-        snapshot = self._get_latest_snapshot()
+        return (
+            self.session.query(Snapshot)
+            .filter(Snapshot.cycle_timestamp == cycle_timestamp)
+            .first())
 
-        organization, folders, tables, policies, group_membership = \
-            create_table_names(snapshot.cycle_timestamp,
-                               snapshot.schema_version)
+    def _iter_organization(self, organization):
+        """Yields the organization."""
 
-        # Organizations
         self._table_exists_or_raise(organization)
         forseti_org = self.session.query(organization).one()
-        yield "organizations", forseti_org
+        yield "organizations", self._resolve_raw_json(forseti_org)
+
+    def _iter_folders(self, folders):
+        """Yields the folders, parents first."""
 
-        # Folders
         self._table_exists_or_raise(folders)
         folder_set = (
             self.session.query(folders)
@@ -457,7 +710,7 @@ class Importer(object):
 
         while folder_set:
             for folder in folder_set:
-                yield 'folders', folder
+                yield 'folders', self._resolve_raw_json(folder)
 
             folder_set = (
                 self.session.query(folders)
@@ -467,11 +720,9 @@ class Importer(object):
                 .all()
                 )
 
-        for res_type, table in tables:
-            for item in self.session.query(table).yield_per(PER_YIELD):
-                yield res_type, item
+    def _iter_principals(self, group_membership):
+        """Yields the groups, as principals."""
 
-        # Groups and membership
         membership, groups = group_membership
         hint = 'Did you enable Forseti group collection?'
         self._table_exists_or_raise(membership, hint)
@@ -483,6 +734,13 @@ class Importer(object):
         for kind, email in principals.yield_per(PER_YIELD):
             yield kind.lower(), email
 
+    def _iter_membership(self, group_membership):
+        """Yields the groups of each member."""
+
+        membership, groups = group_membership
+        hint = 'Did you enable Forseti group collection?'
+        self._table_exists_or_raise(membership, hint)
+        self._table_exists_or_raise(groups, hint)
         query = (
             self.session.query(membership, groups)
             .filter(membership.group_id == groups.group_id)
@@ -494,14 +752,147 @@ class Importer(object):
         for member, group in query.yield_per(PER_YIELD):
             if cur_member and cur_member.member_email != member.member_email:
                 if cur_member:
-                    yield 'membership', (cur_member, member_groups)
+                    yield 'membership', (self._resolve_raw_json(cur_member),
+                                         member_groups)
                     cur_member = None
                     member_groups = []
 
             cur_member = member
-            member_groups.append(group)
+            member_groups.append(self._resolve_raw_json(group))
+
+    def _iter_table(self, kind, reader):
+        """Yields the rows of a resource or policy table."""
+
+        if kind == 'policy':
+            self._table_exists_or_raise(reader.table)
+        for row in reader:
+            yield kind, self._resolve_raw_json(row)
+
+    def _get_checkpoint_snapshot(self, checkpoint):
+        """Get the snapshot to import.
+
+        Args:
+            checkpoint (_Checkpoint): The saved position of the import,
+                cleared if its snapshot no longer exists.
+
+        Returns:
+            object: The snapshot of the checkpoint if any, the latest
+                snapshot otherwise.
+        """
+        snapshot = None
+        if checkpoint.snapshot:
+            snapshot = self._get_snapshot(checkpoint.snapshot)
+        if snapshot is None:
+            checkpoint.clear()
+            snapshot = self._get_latest_snapshot()
+        return snapshot
+
+    def _create_readers(self, sections, first_section, offset):
+        """Create the readers of the table sections left to import.
+
+        Args:
+            sections (list): The (name, kind, table) of the sections.
+            first_section (int): The index of the first section to import.
+            offset (int): Number of rows of the first section to skip.
+
+        Returns:
+            tuple: The readers, in import order, and the readers by section
+                name.
+        """
+        readers = []
+        section_readers = {}
+        for index, (name, _, table) in enumerate(sections):
+            if table is not None and index >= first_section:
+                section_readers[name] = _TableReader(
+                    self.session_factory, table,
+                    offset if index == first_section else 0)
+                readers.append(section_readers[name])
+        return readers, section_readers
+
+    def _start_readers(self, readers, first):
+        """Start the next max_workers table readers.
+
+        The readers are consumed in order, so the reader being consumed is
+        always among the started ones.
+
+        Args:
+            readers (list): The readers of the tables, in import order.
+            first (int): The index of the reader being consumed.
+        """
+        for reader in readers[first:first + self.max_workers]:
+            reader.start()
+
+    def __iter__(self):
+        """Main interface to get the data, returns assets and then policies.
+
+        The resource and policy tables are read concurrently, by up to
+        max_workers threads, and returned in the same order as when read
+        one after the other.
+
+        When a checkpoint path is set, the position is saved as the data is
+        consumed. An interrupted import then resumes from the section it
+        was interrupted in: from the interrupted row for the resource and
+        policy tables, and from the start of the section otherwise.
+        """
+
+        checkpoint = _Checkpoint(self.checkpoint_path)
+        snapshot = self._get_checkpoint_snapshot(checkpoint)
+
+        organization, folders, tables, policies, group_membership = \
+            create_table_names(snapshot.cycle_timestamp,
+                               snapshot.schema_version)
 
-        for policy_table in policies:
-            self._table_exists_or_raise(policy_table)
-            for policy in self.session.query(policy_table).all():
-                yield 'policy', policy
+        # The sections of the import, as (name, kind, table), where table
+        # is None for the sections not read from a single table.
+        sections = [('organizations', None, None), ('folders', None, None)]
+        sections.extend(
+            (res_type, res_type, table) for res_type, table in tables)
+        sections.extend(
+            [('principals', None, None), ('membership', None, None)])
+        sections.extend(
+            ('policies:%s' % policy.__name__, 'policy', policy)
+            for policy in policies)
+        section_names = [name for name, _, _ in sections]
+
+        first_section = 0
+        if checkpoint.section in section_names:
+            first_section = section_names.index(checkpoint.section)
+            if sections[first_section][2] is None:
+                checkpoint.offset = 0
+
+        readers, section_readers = self._create_readers(
+            sections, first_section, checkpoint.offset)
+
+        serial_sections = {
+            'organizations': lambda: self._iter_organization(organization),
+            'folders': lambda: self._iter_folders(folders),
+            'principals': lambda: self._iter_principals(group_membership),
+            'membership': lambda: self._iter_membership(group_membership),
+        }
+
+        try:
+            self._start_readers(readers, 0)
+            for index in xrange(first_section, len(sections)):
+                name, kind, table = sections[index]
+                if table is None:
+                    offset = 0
+                    items = serial_sections[name]()
+                else:
+                    reader = section_readers[name]
+                    offset = reader.offset
+                    self._start_readers(readers, readers.index(reader))
+                    items = self._iter_table(kind, reader)
+
+                for item in items:
+                    yield item
+                    offset += 1
+                    if not offset % PER_YIELD:
+                        checkpoint.save(snapshot.cycle_timestamp, name, offset)
+
+                if index + 1 < len(sections):
+                    checkpoint.save(snapshot.cycle_timestamp,
+                                    section_names[index + 1], 0)
+            checkpoint.clear()
+        finally:
+            for reader in readers:
+                reader.stop()
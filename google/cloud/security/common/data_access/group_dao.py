@@ -14,8 +14,6 @@
 
 """Provides the data access object (DAO) for Groups."""
 
-from Queue import Queue
-
 from google.cloud.security.common.data_access import dao
 from google.cloud.security.common.data_access.sql_queries import select_data
 from google.cloud.security.common.util import log_util
@@ -74,7 +72,36 @@ class GroupDao(dao.Dao):
                'member_type': 'USER'}, ...)
         """
         sql = select_data.GROUP_MEMBERS.format(timestamp)
-        return self.execute_sql_with_fetch(resource_name, sql, (group_id,))
+        return self.execute_cached_sql_with_fetch(
+            resource_name, sql, (group_id,), timestamp)
+
+    def get_group_members_for_groups(self, resource_name, group_ids,
+                                     timestamp):
+        """Get the members of several groups.
+
+        Args:
+            resource_name (str): The resource name.
+            group_ids (iterable): The group ids.
+            timestamp (str): The timestamp of the snapshot.
+
+        Returns:
+             dict: The list of members in dict format of each group id,
+                 empty for the groups without members.
+
+             {'00lnxb': [{'group_id': '00lnxb',
+                          'member_email': 'foo@company.com',
+                          'member_id': '11111',
+                          'member_role': 'OWNER',
+                          'member_type': 'USER'}, ...], ...}
+        """
+        group_ids = list(group_ids)
+        members = dict((group_id, []) for group_id in group_ids)
+        rows = self.execute_sql_with_fetch_by_ids(
+            resource_name, select_data.GROUP_MEMBERS_FOR_GROUPS, timestamp,
+            group_ids)
+        for row in rows:
+            members.setdefault(row['group_id'], []).append(row)
+        return members
 
     def get_recursive_members_of_group(self, group_email, timestamp):
         """Get all the recursive members of a group.
@@ -93,17 +120,18 @@ class GroupDao(dao.Dao):
                'member_type': 'USER'}, ...]
         """
         all_members = []
-        queue = Queue()
-
-        group_id = self.get_group_id('group', group_email, timestamp)
-        queue.put(group_id)
-
-        while not queue.empty():
-            group_id = queue.get()
-            members = self.get_group_members('group_members', group_id,
-                                             timestamp)
-            for member in members:
-                all_members.append(member)
-                if member.get('member_type') == 'GROUP':
-                    queue.put(member.get('member_id'))
+
+        # The groups are visited a level at a time, so that the members of
+        # all the groups of a level are fetched together.
+        group_ids = [self.get_group_id('group', group_email, timestamp)]
+        while group_ids:
+            members_by_group = self.get_group_members_for_groups(
+                'group_members', group_ids, timestamp)
+            nested_group_ids = []
+            for group_id in group_ids:
+                for member in members_by_group[group_id]:
+                    all_members.append(member)
+                    if member.get('member_type') == 'GROUP':
+                        nested_group_ids.append(member.get('member_id'))
+            group_ids = nested_group_ids
         return all_members
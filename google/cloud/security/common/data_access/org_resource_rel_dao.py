@@ -14,21 +14,155 @@
 
 """DAO for organization resource entity relationships."""
 
+import threading
+
+from google.cloud.security.common.data_access import errors as db_errors
 from google.cloud.security.common.data_access import folder_dao
 from google.cloud.security.common.data_access import organization_dao
 from google.cloud.security.common.data_access import project_dao
 from google.cloud.security.common.gcp_type import resource
+from google.cloud.security.common.util import log_util
+
+LOGGER = log_util.get_logger(__name__)
+
+
+def _get_key(org_resource):
+    """Get the key of a resource in the hierarchy index.
+
+    Ids are compared as strings, as the parent ids are stored as strings
+    while the organization ids are numbers.
+
+    Args:
+        org_resource (Resource): The resource.
+
+    Returns:
+        tuple: The (type, id) of the resource.
+    """
+    return (org_resource.type, str(org_resource.id))
+
+
+class ResourceHierarchyIndex(object):
+    """In-memory index of the resource hierarchy of a snapshot.
+
+    The organizations, folders and projects of the snapshot are loaded with
+    one query per table, and the ancestors of each resource are memoized, so
+    that finding the ancestors of a resource needs no query.
+    """
+
+    def __init__(self, resource_db_lookup, snapshot_timestamp):
+        """Initialize.
+
+        Args:
+            resource_db_lookup (dict): The dao of each resource type.
+            snapshot_timestamp (str): The timestamp of the snapshot to index.
+        """
+        self.snapshot_timestamp = snapshot_timestamp
+        self._resources = {}
+        self._ancestors = {}
+        self._load(resource_db_lookup)
+
+    def _load(self, resource_db_lookup):
+        """Load the resources of the snapshot, by type and id.
+
+        A table that can't be read, e.g. the folders table of an inventory
+        without folders, is left out of the index.
+
+        Args:
+            resource_db_lookup (dict): The dao of each resource type.
+        """
+        loaders = [
+            (resource.ResourceType.ORGANIZATION,
+             lambda dao: dao.get_organizations(
+                 'organizations', self.snapshot_timestamp)),
+            (resource.ResourceType.FOLDER,
+             lambda dao: dao.get_folders('folders', self.snapshot_timestamp)),
+            (resource.ResourceType.PROJECT,
+             lambda dao: dao.get_projects(self.snapshot_timestamp)),
+        ]
+        for resource_type, load in loaders:
+            try:
+                resources = load(resource_db_lookup[resource_type]['dao'])
+            except db_errors.MySQLError as e:
+                LOGGER.warn('Unable to index the %s resources of snapshot '
+                            '%s: %s', resource_type, self.snapshot_timestamp, e)
+                continue
+            for loaded_resource in resources:
+                self._resources[_get_key(loaded_resource)] = loaded_resource
+        LOGGER.info('Indexed %s resources of snapshot %s',
+                    len(self._resources), self.snapshot_timestamp)
+
+    def get_ancestors(self, org_resource):
+        """Get the ancestors of a resource.
+
+        Args:
+            org_resource (Resource): A Resource.
+
+        Returns:
+            list: The Resource ancestors, starting with the closest
+                ancestor, or None if the resource or one of its ancestors
+                is not in the snapshot.
+        """
+        key = _get_key(org_resource)
+        if key not in self._ancestors:
+            self._ancestors[key] = self._find_ancestors(key)
+        ancestors = self._ancestors[key]
+        if ancestors is None:
+            return None
+        return list(ancestors)
+
+    def _find_ancestors(self, key):
+        """Find the ancestors of a resource, reusing the memoized ones.
+
+        Args:
+            key (tuple): The (type, id) of the resource.
+
+        Returns:
+            tuple: The Resource ancestors, starting with the closest
+                ancestor, or None if the resource or one of its ancestors
+                is not in the snapshot.
+        """
+        chain = []
+        visited = set()
+        while True:
+            if key in self._ancestors:
+                ancestors = self._ancestors[key]
+                if chain and ancestors is not None:
+                    ancestors = (self._resources[key],) + ancestors
+                break
+            loaded_resource = self._resources.get(key)
+            if loaded_resource is None or key in visited:
+                ancestors = None
+                break
+            visited.add(key)
+            chain.append(key)
+            parent = loaded_resource.parent
+            if not (parent and parent.type and parent.id):
+                ancestors = ()
+                break
+            key = _get_key(parent)
+
+        # Memoize the ancestors of every resource walked through.
+        for walked_key in reversed(chain):
+            self._ancestors[walked_key] = ancestors
+            if ancestors is not None:
+                ancestors = (self._resources[walked_key],) + ancestors
+        return self._ancestors[chain[0]] if chain else ancestors
 
 
 class OrgResourceRelDao(object):
     """DAO for organization resource entity relationships."""
 
-    def __init__(self, global_configs):
+    def __init__(self, global_configs, use_index=False):
         """Initialize.
 
         Args:
             global_configs (dict): Global configurations.
+            use_index (bool): Find the ancestors with an in-memory index of
+                the snapshot hierarchy, instead of querying each ancestor.
         """
+        self.use_index = use_index
+        self._index = None
+        self._index_lock = threading.Lock()
         # Map the org resource type to the appropriate dao class
         self._resource_db_lookup = {
             resource.ResourceType.ORGANIZATION: {
@@ -57,6 +191,11 @@ class OrgResourceRelDao(object):
                 closest (lowest-level) ancestor.
         """
         # TODO: handle case where snapshot is None
+        if self.use_index and snapshot_timestamp:
+            ancestors = self._get_index(snapshot_timestamp).get_ancestors(
+                org_resource)
+            if ancestors is not None:
+                return ancestors
 
         ancestors = []
         curr_resource = org_resource
@@ -82,6 +221,22 @@ class OrgResourceRelDao(object):
 
         return ancestors
 
+    def _get_index(self, snapshot_timestamp):
+        """Get the hierarchy index of a snapshot, building it on first use.
+
+        Args:
+            snapshot_timestamp (str): The timestamp of the snapshot.
+
+        Returns:
+            ResourceHierarchyIndex: The index of the snapshot.
+        """
+        with self._index_lock:
+            if (self._index is None or
+                    self._index.snapshot_timestamp != snapshot_timestamp):
+                self._index = ResourceHierarchyIndex(
+                    self._resource_db_lookup, snapshot_timestamp)
+            return self._index
+
     def _load_resource(self, unloaded_resource, snapshot_timestamp):
         """Load the resource from the database.
 
@@ -63,7 +63,8 @@ class OrganizationDao(dao.Dao):
             MySQLError: If there was an error getting the organization.
         """
         query = select_data.ORGANIZATION_BY_ID.format(timestamp)
-        rows = self.execute_sql_with_fetch('organization', query, (org_id,))
+        rows = self.execute_cached_sql_with_fetch(
+            'organization', query, (org_id,), timestamp)
         if rows:
             return organization.Organization(
                 organization_id=rows[0]['org_id'],
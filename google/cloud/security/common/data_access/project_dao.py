@@ -73,6 +73,28 @@ class ProjectDao(dao.Dao):
             resource_name, project_numbers_sql, ())
         return [row['project_number'] for row in rows]
 
+    def get_project_iam_policy_etags(self, resource_name, timestamp):
+        """Select the etags of the project iam policies of a snapshot.
+
+        Args:
+            resource_name (str): The resource name.
+            timestamp (str): The timestamp, formatted as YYYYMMDDTHHMMSSZ.
+
+        Returns:
+             dict: The etag of each project iam policy, by project number.
+
+        Raises:
+            MySQLError: An error with MySQL has occurred.
+        """
+        if self.dedup_raw_json:
+            etags_sql = select_data.PROJECT_IAM_POLICY_ETAGS_FROM_BLOBS.format(
+                timestamp)
+        else:
+            etags_sql = select_data.PROJECT_IAM_POLICY_ETAGS.format(timestamp)
+        rows = self.execute_sql_with_fetch(resource_name, etags_sql, ())
+        return dict((row['project_number'], row['etag']) for row in rows
+                    if row['etag'])
+
     def get_project(self, project_id, timestamp):
         """Get a project from a particular snapshot.
 
@@ -84,12 +106,29 @@ class ProjectDao(dao.Dao):
             Project: A Project, if found.
         """
         project_query = select_data.PROJECT_BY_ID.format(timestamp)
-        rows = self.execute_sql_with_fetch(
-            resource.ResourceType.PROJECT, project_query, (project_id,))
+        rows = self.execute_cached_sql_with_fetch(
+            resource.ResourceType.PROJECT, project_query, (project_id,),
+            timestamp)
         if rows:
             return self.map_row_to_object(rows[0])
         return None
 
+    def get_projects_by_ids(self, project_ids, timestamp):
+        """Get several projects from a particular snapshot.
+
+        Args:
+            project_ids (iterable): The ids of the projects.
+            timestamp (str): The snapshot timestamp.
+
+        Returns:
+            dict: The Project of each project id found.
+        """
+        rows = self.execute_sql_with_fetch_by_ids(
+            resource.ResourceType.PROJECT, select_data.PROJECTS_BY_IDS,
+            timestamp, project_ids)
+        return dict((row['project_id'], self.map_row_to_object(row))
+                    for row in rows)
+
     def get_project_by_number(self, project_number, timestamp):
         """Get a project from a particular snapshot.
 
@@ -101,8 +140,9 @@ class ProjectDao(dao.Dao):
             Project: A Project, if found.
         """
         project_query = select_data.PROJECT_BY_NUMBER.format(timestamp)
-        rows = self.execute_sql_with_fetch(
-            resource.ResourceType.PROJECT, project_query, (project_number,))
+        rows = self.execute_cached_sql_with_fetch(
+            resource.ResourceType.PROJECT, project_query, (project_number,),
+            timestamp)
         if rows:
             return self.map_row_to_object(rows[0])
         return None
@@ -148,6 +188,32 @@ class ProjectDao(dao.Dao):
                 LOGGER.warn('Error parsing json:\n %s', row['iam_policy'])
         return project_policies
 
+    def iter_project_policies(self, resource_name, timestamp):
+        """Stream the project policies.
+
+        Like get_project_policies(), but the rows are streamed from the
+        database instead of being all read before returning.
+
+        Args:
+            resource_name (str): The resource type.
+            timestamp (str): The timestamp of the snapshot.
+
+        Yields:
+            tuple: A project (gcp_type.project.Project) and its iam policy
+                (dict).
+
+        Raises:
+            MySQLError: An error with MySQL has occurred.
+        """
+        query = select_data.PROJECT_IAM_POLICIES_RAW.format(
+            timestamp, timestamp)
+        for row in self.iter_sql_with_fetch(resource_name, query, ()):
+            try:
+                yield (self.map_row_to_object(row),
+                       json.loads(row['iam_policy']))
+            except ValueError:
+                LOGGER.warn('Error parsing json:\n %s', row['iam_policy'])
+
     def get_project_raw_data(self, resource_name, timestamp, **kwargs):
         """Select the project raw data from a projects snapshot table.
 
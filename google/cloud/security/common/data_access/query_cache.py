@@ -0,0 +1,131 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounded cache of query results."""
+
+import collections
+import threading
+
+
+class QueryCache(object):
+    """Thread-safe least recently used cache of query results."""
+
+    def __init__(self, max_size):
+        """Initialize.
+
+        Args:
+            max_size (int): Maximum number of results cached, 0 to cache
+                nothing.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a cached result.
+
+        Args:
+            key (tuple): The key of the result.
+
+        Returns:
+            tuple: (True, result) if the result is cached, (False, None)
+                otherwise.
+        """
+        with self._lock:
+            if key not in self._results:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            result = self._results.pop(key)
+            self._results[key] = result
+            return True, result
+
+    def put(self, key, result):
+        """Cache a result, evicting the least recently used ones if full.
+
+        Args:
+            key (tuple): The key of the result.
+            result (object): The result.
+        """
+        with self._lock:
+            self._results.pop(key, None)
+            if self.max_size <= 0:
+                return
+            self._results[key] = result
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        """Remove all the cached results, and reset the stats."""
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        """Get the cache stats.
+
+        Returns:
+            dict: The number of hits, misses and cached results, and the hit
+                rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._results),
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+            }
+
+
+# The cache shared by all the DAOs of the process, see get_shared_cache().
+_SHARED_CACHE = None
+_SHARED_CACHE_LOCK = threading.Lock()
+
+
+def get_shared_cache(max_size):
+    """Get the cache shared by the process, creating it if needed.
+
+    The cache is sized once, when created.
+
+    Args:
+        max_size (int): Maximum number of results cached, if the cache is
+            created.
+
+    Returns:
+        QueryCache: The shared cache.
+    """
+    # pylint: disable=global-statement
+    global _SHARED_CACHE
+    with _SHARED_CACHE_LOCK:
+        if _SHARED_CACHE is None:
+            _SHARED_CACHE = QueryCache(max_size)
+        return _SHARED_CACHE
+
+
+def get_shared_cache_stats():
+    """Get the stats of the cache shared by the process.
+
+    Returns:
+        dict: The stats of the shared cache, see QueryCache.get_stats(), or
+            None if the cache was never used.
+    """
+    with _SHARED_CACHE_LOCK:
+        shared_cache = _SHARED_CACHE
+    if shared_cache is None:
+        return None
+    return shared_cache.get_stats()
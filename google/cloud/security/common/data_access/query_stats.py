@@ -0,0 +1,179 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Timing statistics of the database statements, by statement template.
+
+The statements are grouped by template: the statement with its snapshot
+timestamps, string literals and repeated placeholders normalized, so that
+the same query on different snapshots, or with IN lists of different
+lengths, is counted once.
+"""
+
+import bisect
+import json
+import re
+import threading
+
+# Statements taking at least this many seconds are slow, unless set by the
+# db_slow_query_seconds global configuration.
+DEFAULT_SLOW_QUERY_SECONDS = 1.0
+
+# Upper bounds, in seconds, of the buckets of the duration histograms. The
+# last bucket counts the statements slower than the last bound.
+HISTOGRAM_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+# Number of templates in the summary table, by total duration.
+SUMMARY_TABLE_SIZE = 20
+
+# Maximum length of the templates in the summary table.
+SUMMARY_TEMPLATE_WIDTH = 100
+
+_TIMESTAMP_REGEX = re.compile(r'\d{8}T\d{6}Z')
+_STRING_LITERAL_REGEX = re.compile(r"'(?:[^'\\]|\\.)*'")
+_PLACEHOLDERS_REGEX = re.compile(r'%s(?:\s*,\s*%s)+')
+_VALUES_LIST_REGEX = re.compile(r'(\([^()]*\))(?:\s*,\s*\1)+')
+_WHITESPACE_REGEX = re.compile(r'\s+')
+
+
+def get_template(sql):
+    """Get the template of a statement.
+
+    Args:
+        sql (str): String of the sql statement.
+
+    Returns:
+        str: The statement, with its snapshot timestamps, string literals,
+            placeholder lists and whitespace normalized.
+    """
+    template = _TIMESTAMP_REGEX.sub('{timestamp}', sql)
+    template = _STRING_LITERAL_REGEX.sub('?', template)
+    template = _PLACEHOLDERS_REGEX.sub('%s,...', template)
+    template = _VALUES_LIST_REGEX.sub(r'\1,...', template)
+    return _WHITESPACE_REGEX.sub(' ', template).strip()
+
+
+class QueryStats(object):
+    """Thread-safe timing statistics of the database statements."""
+
+    def __init__(self, slow_query_seconds=DEFAULT_SLOW_QUERY_SECONDS):
+        """Initialize.
+
+        Args:
+            slow_query_seconds (float): Duration from which a statement is
+                slow.
+        """
+        self.slow_query_seconds = slow_query_seconds
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql, seconds, row_count):
+        """Record an execution of a statement.
+
+        Args:
+            sql (str): String of the sql statement.
+            seconds (float): The duration of the execution.
+            row_count (int): The number of rows returned or affected.
+
+        Returns:
+            bool: True if the execution was slow.
+        """
+        template = get_template(sql)
+        slow = seconds >= self.slow_query_seconds
+        with self._lock:
+            stats = self._templates.get(template)
+            if stats is None:
+                stats = {
+                    'template': template,
+                    'calls': 0,
+                    'rows': 0,
+                    'total_seconds': 0.0,
+                    'max_seconds': 0.0,
+                    'slow_calls': 0,
+                    'histogram': [0] * (len(HISTOGRAM_BOUNDS) + 1),
+                    'explain': None,
+                }
+                self._templates[template] = stats
+            stats['calls'] += 1
+            stats['rows'] += int(row_count or 0)
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['histogram'][
+                bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+            if slow:
+                stats['slow_calls'] += 1
+        return slow
+
+    def record_explain(self, sql, plan):
+        """Record the plan of a statement.
+
+        Args:
+            sql (str): String of the sql statement.
+            plan (list): The rows of the EXPLAIN of the statement.
+        """
+        template = get_template(sql)
+        with self._lock:
+            if template in self._templates:
+                self._templates[template]['explain'] = list(plan)
+
+    def clear(self):
+        """Remove all the statistics."""
+        with self._lock:
+            self._templates.clear()
+
+    def get_stats(self):
+        """Get the statistics of each template.
+
+        Returns:
+            list: The statistics of each template as dicts, by decreasing
+                total duration.
+        """
+        with self._lock:
+            templates = [dict(stats, histogram=list(stats['histogram']))
+                         for stats in self._templates.itervalues()]
+        for stats in templates:
+            stats['mean_seconds'] = stats['total_seconds'] / stats['calls']
+        return sorted(templates, key=lambda stats: stats['total_seconds'],
+                      reverse=True)
+
+    def format_table(self, size=SUMMARY_TABLE_SIZE):
+        """Format the statistics of the slowest templates as a table.
+
+        Args:
+            size (int): The number of templates in the table.
+
+        Returns:
+            str: The table, one template per line.
+        """
+        lines = ['%8s %10s %10s %10s %10s %6s  %s' % (
+            'calls', 'rows', 'total_s', 'mean_ms', 'max_ms', 'slow',
+            'template')]
+        for stats in self.get_stats()[:size]:
+            lines.append('%8d %10d %10.3f %10.1f %10.1f %6d  %s' % (
+                stats['calls'], stats['rows'], stats['total_seconds'],
+                stats['mean_seconds'] * 1000, stats['max_seconds'] * 1000,
+                stats['slow_calls'],
+                stats['template'][:SUMMARY_TEMPLATE_WIDTH]))
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """Write the statistics to a json file.
+
+        Args:
+            path (str): The path of the file.
+        """
+        with open(path, 'w') as stats_file:
+            json.dump({'histogram_bounds': HISTOGRAM_BOUNDS,
+                       'slow_query_seconds': self.slow_query_seconds,
+                       'templates': self.get_stats()},
+                      stats_file, indent=2, default=str)
@@ -0,0 +1,120 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content-addressed storage of the raw json columns of the snapshots.
+
+When enabled, the raw API payloads are stored once in the raw_json_blobs
+table, keyed by the sha1 of their canonical json, and the snapshot rows
+store a small json reference to the blob instead of the payload:
+    {"raw_json_blob": "<sha1>"}
+
+The payloads of a mostly static organization are then only written once,
+instead of once per snapshot.
+"""
+
+import hashlib
+import json
+import re
+
+REFERENCE_KEY = 'raw_json_blob'
+
+# Cheap check done on every value read, before matching the reference.
+_REFERENCE_PREFIX = '{"%s"' % REFERENCE_KEY
+# MySQL returns the json columns with a space after the colon.
+_REFERENCE_REGEX = re.compile(
+    r'^\{"%s": ?"([0-9a-f]{40})"\}$' % REFERENCE_KEY)
+
+# The raw json columns stored as blobs, by resource.
+RAW_JSON_COLUMN_MAP = {
+    'appengine': ['raw_application'],
+    'backend_services': ['raw_backend_service'],
+    'bigquery_datasets': ['raw_access_map'],
+    'buckets': ['raw_bucket'],
+    'buckets_acl': ['raw_bucket_acl'],
+    'cloudsql_instances': ['raw_cloudsql_instance'],
+    'firewall_rules': ['raw_firewall_rule'],
+    'folders': ['raw_folder'],
+    'forwarding_rules': ['raw_forwarding_rule'],
+    'group_members': ['raw_member'],
+    'groups': ['raw_group'],
+    'instance_group_managers': ['raw_instance_group_manager'],
+    'instance_groups': ['raw_instance_group'],
+    'instance_templates': ['raw_instance_template'],
+    'instances': ['raw_instance'],
+    'organizations': ['raw_org'],
+    'projects': ['raw_project'],
+    'raw_buckets': ['buckets'],
+    'raw_folder_iam_policies': ['iam_policy'],
+    'raw_org_iam_policies': ['iam_policy'],
+    'raw_project_iam_policies': ['iam_policy'],
+    'service_accounts': ['raw_service_account'],
+}
+
+RAW_JSON_COLUMNS = frozenset(
+    column for columns in RAW_JSON_COLUMN_MAP.itervalues()
+    for column in columns)
+
+
+def create_blob(value):
+    """Create the blob of a raw json value.
+
+    Args:
+        value (object): The json string, or the object to serialize.
+
+    Returns:
+        tuple: The (sha1, canonical json) of the value, or None if the value
+            is empty or is not json.
+    """
+    if value in (None, ''):
+        return None
+    if isinstance(value, basestring):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    try:
+        canonical_json = json.dumps(value, sort_keys=True,
+                                    separators=(',', ':'))
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(canonical_json).hexdigest(), canonical_json
+
+
+def create_reference(blob_hash):
+    """Create the reference to a blob, stored instead of its value.
+
+    Args:
+        blob_hash (str): The sha1 of the blob.
+
+    Returns:
+        str: The json reference to the blob.
+    """
+    return json.dumps({REFERENCE_KEY: blob_hash})
+
+
+def get_reference(value):
+    """Get the blob referenced by a column value.
+
+    Args:
+        value (object): The column value.
+
+    Returns:
+        str: The sha1 of the referenced blob, or None if the value is not a
+            reference.
+    """
+    if not (isinstance(value, basestring) and
+            value.startswith(_REFERENCE_PREFIX)):
+        return None
+    match = _REFERENCE_REGEX.match(value)
+    return match.group(1) if match else None
@@ -547,3 +547,37 @@ CREATE_VIOLATIONS_TABLE = """
         PRIMARY KEY (`id`)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 """
+
+ADD_INDEXES = """
+    ALTER TABLE `{0}` {1};
+"""
+
+ADD_INDEX = 'ADD INDEX `{0}` ({1})'
+
+# Partitioned snapshot layout: one table per resource, with a partition per
+# snapshot, and a view per snapshot under the snapshot table name.
+SNAPSHOT_ID_COLUMN = '`snapshot_id` char(16) NOT NULL'
+
+SNAPSHOT_KEY = 'KEY `{0}` ({1})'
+
+PARTITION_BY_SNAPSHOT = """
+    PARTITION BY LIST COLUMNS(`snapshot_id`) (
+        PARTITION `{0}` VALUES IN ('{1}'));
+"""
+
+ADD_SNAPSHOT_PARTITION = """
+    ALTER TABLE `{0}` ADD PARTITION (
+        PARTITION `{1}` VALUES IN ('{2}'));
+"""
+
+SELECT_SNAPSHOT_COLUMNS = """
+    SELECT COLUMN_NAME FROM information_schema.columns
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    AND COLUMN_NAME != 'snapshot_id'
+    ORDER BY ORDINAL_POSITION;
+"""
+
+CREATE_SNAPSHOT_VIEW = """
+    CREATE ALGORITHM=MERGE VIEW `{0}` AS
+    SELECT {1} FROM `{2}` WHERE `snapshot_id` = '{3}';
+"""
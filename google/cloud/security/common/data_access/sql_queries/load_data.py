@@ -20,6 +20,23 @@ LOAD_DATA = """
     ({2});
 """
 
+LOAD_DATA_TO_PARTITION = """
+    LOAD DATA LOCAL INFILE '{0}'
+    INTO TABLE {1} FIELDS TERMINATED BY ','
+    ({2})
+    SET snapshot_id = '{3}';
+"""
+
+COPY_SNAPSHOT_ROWS = """
+    INSERT INTO {0} ({1})
+    SELECT {1} FROM {2} WHERE {3} IN ({4});
+"""
+
+COPY_SNAPSHOT_ROWS_TO_PARTITION = """
+    INSERT INTO {0} (snapshot_id, {1})
+    SELECT '{2}', {1} FROM {3} WHERE {4} IN ({5});
+"""
+
 INSERT_VIOLATION = """
     INSERT INTO {0}
     (resource_type, resource_id, rule_name, rule_index,
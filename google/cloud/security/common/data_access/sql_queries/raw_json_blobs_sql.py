@@ -0,0 +1,39 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""SQL queries for the raw json blobs table."""
+
+RESOURCE_NAME = 'raw_json_blobs'
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS `raw_json_blobs` (
+        `blob_hash` char(40) NOT NULL,
+        `raw_json` json NOT NULL,
+        PRIMARY KEY (`blob_hash`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+"""
+
+SELECT_BLOB_HASHES = """
+    SELECT blob_hash FROM raw_json_blobs WHERE blob_hash IN ({0});
+"""
+
+SELECT_BLOBS = """
+    SELECT blob_hash, raw_json FROM raw_json_blobs WHERE blob_hash IN ({0});
+"""
+
+INSERT_BLOBS = """
+    INSERT IGNORE INTO raw_json_blobs (blob_hash, raw_json) VALUES {0};
+"""
+
+INSERT_BLOB_VALUES = '(%s, %s)'
@@ -22,11 +22,30 @@ LATEST_SNAPSHOT_TIMESTAMP = """
     SELECT max(cycle_timestamp) FROM snapshot_cycles
 """
 
+SNAPSHOT_CYCLE_STATUS = """
+    SELECT status FROM snapshot_cycles WHERE cycle_timestamp = %s;
+"""
+
 PROJECT_NUMBERS = """
     SELECT project_number FROM projects_{0};
 """
 
 
+PROJECT_IAM_POLICY_ETAGS = """
+    SELECT project_number,
+    JSON_UNQUOTE(JSON_EXTRACT(iam_policy, '$.etag')) AS etag
+    FROM raw_project_iam_policies_{0};
+"""
+
+PROJECT_IAM_POLICY_ETAGS_FROM_BLOBS = """
+    SELECT p.project_number,
+    JSON_UNQUOTE(JSON_EXTRACT(COALESCE(b.raw_json, p.iam_policy), '$.etag'))
+    AS etag
+    FROM raw_project_iam_policies_{0} p
+    LEFT JOIN raw_json_blobs b
+    ON b.blob_hash = JSON_UNQUOTE(JSON_EXTRACT(p.iam_policy, '$.raw_json_blob'));
+"""
+
 PROJECT_RAW_ALL = """
     SELECT raw_project FROM projects_{0};
 """
@@ -62,6 +81,13 @@ PROJECT_BY_ID = """
     WHERE project_id = %s
 """
 
+PROJECTS_BY_IDS = """
+    SELECT project_number, project_id, project_name,
+    lifecycle_state, parent_type, parent_id
+    FROM projects_{0}
+    WHERE project_id IN ({1});
+"""
+
 PROJECT_BY_NUMBER = """
     SELECT project_number, project_id, project_name,
     lifecycle_state, parent_type, parent_id
@@ -149,6 +175,12 @@ GROUP_MEMBERS = """
     WHERE group_id = %s;
 """
 
+GROUP_MEMBERS_FOR_GROUPS = """
+    SELECT group_id, member_role, member_type, member_id, member_email
+    FROM group_members_{0}
+    WHERE group_id IN ({1});
+"""
+
 BUCKETS = """
     SELECT project_number, bucket_id, bucket_name, bucket_kind, bucket_storage_class,
     bucket_location, bucket_create_time, bucket_update_time, bucket_selflink,
@@ -259,3 +291,5 @@ SERVICE_ACCOUNTS = """
     SELECT project_id, name, email, oauth2_client_id, account_keys, raw_service_account
     FROM service_accounts_{0}
 """
+
+EXPLAIN = 'EXPLAIN {0}'
@@ -49,3 +49,36 @@ UPDATE_CYCLE = """
     SET status=%s, complete_time=%s
     WHERE cycle_timestamp=%s;
 """
+
+SELECT_CYCLES = """
+    SELECT cycle_timestamp, status
+    FROM snapshot_cycles
+    ORDER BY cycle_timestamp DESC;
+"""
+
+SELECT_CYCLE_TABLES = """
+    SELECT TABLE_NAME, TABLE_TYPE, ROW_FORMAT
+    FROM information_schema.tables
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME LIKE %s;
+"""
+
+SELECT_TABLE_ROWS = """
+    SELECT * FROM `{0}`;
+"""
+
+COMPRESS_TABLE = """
+    ALTER TABLE `{0}` ROW_FORMAT=COMPRESSED;
+"""
+
+DROP_TABLE = """
+    DROP TABLE IF EXISTS `{0}`;
+"""
+
+DROP_VIEW = """
+    DROP VIEW IF EXISTS `{0}`;
+"""
+
+DROP_PARTITION = """
+    ALTER TABLE `{0}` DROP PARTITION `{1}`;
+"""
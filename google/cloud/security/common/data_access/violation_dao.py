@@ -31,6 +31,9 @@ from google.cloud.security.common.util import log_util
 
 LOGGER = log_util.get_logger(__name__)
 
+# Number of violations inserted per multi-row insert and commit.
+INSERT_CHUNK_SIZE = 1000
+
 
 class ViolationDao(dao.Dao):
     """Data access object (DAO) for rule violations."""
@@ -82,8 +85,10 @@ class ViolationDao(dao.Dao):
         except MySQLdb.Error, e:
             raise db_errors.MySQLError(resource_name, e)
 
+        insert_sql = load_data.INSERT_VIOLATION.format(snapshot_table)
         inserted_rows = 0
         violation_errors = []
+        chunk = []
         for violation in violations:
             violation = self.Violation(
                 resource_type=violation['resource_type'],
@@ -92,21 +97,60 @@ class ViolationDao(dao.Dao):
                 rule_index=violation['rule_index'],
                 violation_type=violation['violation_type'],
                 violation_data=violation['violation_data'])
-            for formatted_violation in _format_violation(violation,
-                                                         resource_name):
-                try:
-                    self.execute_sql_with_commit(
-                        resource_name,
-                        load_data.INSERT_VIOLATION.format(snapshot_table),
-                        formatted_violation)
-                    inserted_rows += 1
-                except MySQLdb.Error, e:
-                    LOGGER.error('Unable to insert violation %s due to %s',
-                                 formatted_violation, e)
-                    violation_errors.append(formatted_violation)
+            chunk.extend(_format_violation(violation, resource_name))
+            if len(chunk) >= INSERT_CHUNK_SIZE:
+                inserted_count, chunk_errors = self._insert_chunk(
+                    resource_name, insert_sql, chunk)
+                inserted_rows += inserted_count
+                violation_errors.extend(chunk_errors)
+                chunk = []
+
+        if chunk:
+            inserted_count, chunk_errors = self._insert_chunk(
+                resource_name, insert_sql, chunk)
+            inserted_rows += inserted_count
+            violation_errors.extend(chunk_errors)
 
         return (inserted_rows, violation_errors)
 
+    def _insert_chunk(self, resource_name, insert_sql, formatted_violations):
+        """Insert a chunk of violations in a single transaction.
+
+        If the chunk can't be inserted, e.g. because one of the violations
+        is invalid, the violations are inserted one by one instead, so that
+        only the invalid violations are left out.
+
+        Args:
+            resource_name (str): String that defines a resource.
+            insert_sql (str): The insert statement.
+            formatted_violations (list): The formatted violations to insert.
+
+        Returns:
+            tuple: A tuple of (int, list) containing the count of inserted
+                rows and a list of violations that encountered an error during
+                insert.
+        """
+        try:
+            self.execute_sql_with_commit_many(
+                resource_name, insert_sql, formatted_violations)
+            return len(formatted_violations), []
+        except (MySQLdb.Error, db_errors.MySQLError) as e:
+            LOGGER.warn('Unable to insert %s violations at once, inserting '
+                        'them one by one: %s', len(formatted_violations), e)
+
+        inserted_rows = 0
+        violation_errors = []
+        for formatted_violation in formatted_violations:
+            try:
+                self.execute_sql_with_commit(
+                    resource_name, insert_sql, formatted_violation)
+                inserted_rows += 1
+            except (MySQLdb.Error, db_errors.MySQLError) as e:
+                LOGGER.error('Unable to insert violation %s due to %s',
+                             formatted_violation, e)
+                violation_errors.append(formatted_violation)
+        return inserted_rows, violation_errors
+
     def get_all_violations(self, timestamp, violation_type=None):
         """Get all the violations.
 
@@ -117,20 +161,46 @@ class ViolationDao(dao.Dao):
         Returns:
             list: A list of dict of the violations data.
         """
-        if not violation_type:
-            resource_name = 'all_violations'
-            query = select_data.SELECT_ALL_VIOLATIONS
-            params = ()
-        else:
-            resource_name = violation_type
-            query = select_data.SELECT_VIOLATIONS_BY_TYPE
-            params = (violation_type,)
-
-        violations_sql = query.format(timestamp)
+        resource_name, violations_sql, params = self._get_violations_query(
+            timestamp, violation_type)
         rows = self.execute_sql_with_fetch(
             resource_name, violations_sql, params)
         return rows
 
+    def iter_all_violations(self, timestamp, violation_type=None):
+        """Stream all the violations.
+
+        Args:
+            timestamp (str): The timestamp of the snapshot.
+            violation_type (str): The violation type.
+
+        Returns:
+            iterator: The violations data, as dicts.
+        """
+        resource_name, violations_sql, params = self._get_violations_query(
+            timestamp, violation_type)
+        return self.iter_sql_with_fetch(
+            resource_name, violations_sql, params)
+
+    @staticmethod
+    def _get_violations_query(timestamp, violation_type):
+        """Get the query selecting the violations.
+
+        Args:
+            timestamp (str): The timestamp of the snapshot.
+            violation_type (str): The violation type, or None for all the
+                violations.
+
+        Returns:
+            tuple: The resource name, sql and values of the query.
+        """
+        if not violation_type:
+            return ('all_violations',
+                    select_data.SELECT_ALL_VIOLATIONS.format(timestamp), ())
+        return (violation_type,
+                select_data.SELECT_VIOLATIONS_BY_TYPE.format(timestamp),
+                (violation_type,))
+
 
 def _format_violation(violation, resource_name):
     """Violation formating stub that uses a map to call the formating
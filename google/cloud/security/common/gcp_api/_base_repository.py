@@ -15,24 +15,26 @@
 """Base GCP client which uses the discovery API."""
 import logging
 import threading
+import time
 import googleapiclient
 from googleapiclient import discovery
+from googleapiclient import errors
 import httplib2
 from oauth2client import client
-from ratelimiter import RateLimiter
 from retrying import retry
 
 from google.cloud import security as forseti_security
+from google.cloud.security.common.gcp_api import _discovery_cache
+from google.cloud.security.common.gcp_api import _http_pool
+from google.cloud.security.common.gcp_api import _quota_manager
 from google.cloud.security.common.gcp_api import _supported_apis
+from google.cloud.security.common.gcp_api import _token_cache
 from google.cloud.security.common.gcp_api import errors as api_errors
 from google.cloud.security.common.util import log_util
 from google.cloud.security.common.util import retryable_exceptions
 
 CLOUD_SCOPES = frozenset(['https://www.googleapis.com/auth/cloud-platform'])
 
-# Per request max wait timeout.
-HTTP_REQUEST_TIMEOUT = 30.0
-
 # Per thread storage.
 LOCAL_THREAD = threading.local()
 
@@ -41,15 +43,29 @@ LOGGER = log_util.get_logger(__name__)
 # Default value num_retries within HttpRequest execute method
 NUM_HTTP_RETRIES = 5
 
+# Maximum number of requests to send in a single batch request.
+MAX_BATCH_SIZE = 100
+
+# Http status codes of requests that are retried.
+RETRYABLE_HTTP_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+# Maximum wait, in seconds, before retrying failed requests.
+MAX_RETRY_WAIT = 10
+
 # Support older versions of apiclient without cache support
 SUPPORT_DISCOVERY_CACHE = (googleapiclient.__version__ >= '1.4.2')
 
+# Errors fetching a discovery document, which fall back to a cached document.
+DISCOVERY_FETCH_ERRORS = (
+    (errors.HttpError, httplib2.HttpLib2Error) +
+    retryable_exceptions.RETRYABLE_EXCEPTIONS)
+
 
 @retry(retry_on_exception=retryable_exceptions.is_retryable_exception,
        wait_exponential_multiplier=1000, wait_exponential_max=10000,
        stop_max_attempt_number=5)
 def _create_service_api(credentials, service_name, version, developer_key=None,
-                        cache_discovery=False):
+                        cache_discovery=True):
     """Builds and returns a cloud API service object.
 
     Args:
@@ -60,7 +76,9 @@ def _create_service_api(credentials, service_name, version, developer_key=None,
         developer_key (str): The api key to use to determine the project
             associated with the API call, most API services do not require
             this to be set.
-        cache_discovery (bool): Whether or not to cache the discovery doc.
+        cache_discovery (bool): Whether or not to cache the discovery doc on
+            disk. When set, a cached doc is used if the discovery service
+            can't be reached.
 
     Returns:
         object: A Resource object with methods for interacting with the service.
@@ -76,9 +94,41 @@ def _create_service_api(credentials, service_name, version, developer_key=None,
         'version': version,
         'developerKey': developer_key,
         'credentials': credentials}
-    if SUPPORT_DISCOVERY_CACHE:
-        discovery_kwargs['cache_discovery'] = cache_discovery
-    return discovery.build(**discovery_kwargs)
+    if not SUPPORT_DISCOVERY_CACHE:
+        return discovery.build(**discovery_kwargs)
+
+    discovery_kwargs['cache_discovery'] = cache_discovery
+    if not cache_discovery:
+        return discovery.build(**discovery_kwargs)
+
+    try:
+        return discovery.build(cache=_discovery_cache.DISCOVERY_CACHE,
+                               **discovery_kwargs)
+    except DISCOVERY_FETCH_ERRORS as e:
+        # Build from the last known document, without any network fetch.
+        LOGGER.warn('Unable to fetch the discovery document of %s %s, '
+                    'using the cached document: %s', service_name, version, e)
+        try:
+            return discovery.build(
+                cache=_discovery_cache.DISCOVERY_CACHE.stale(),
+                **discovery_kwargs)
+        except DISCOVERY_FETCH_ERRORS:
+            raise e
+
+
+def _is_retryable_http_error(error):
+    """Whether a failed request should be retried.
+
+    Args:
+        error (Exception): The error raised by the request.
+
+    Returns:
+        bool: True if the error has a retryable http status. False otherwise.
+    """
+    if _quota_manager.is_rate_limit_error(error):
+        return True
+    resp = getattr(error, 'resp', None)
+    return resp is not None and resp.status in RETRYABLE_HTTP_STATUS_CODES
 
 
 def _set_ua_and_scopes(credentials):
@@ -90,7 +140,8 @@ def _set_ua_and_scopes(credentials):
 
     Returns:
         client.OAuth2Credentials: The credentials object with the user agent
-            attribute set or updated.
+            attribute set or updated, shared with all the clients using
+            equivalent credentials.
     """
     if isinstance(credentials, client.OAuth2Credentials):
         user_agent = credentials.user_agent
@@ -105,7 +156,7 @@ def _set_ua_and_scopes(credentials):
         if (isinstance(credentials, client.GoogleCredentials) and
                 credentials.create_scoped_required()):
             credentials = credentials.create_scoped(list(CLOUD_SCOPES))
-    return credentials
+    return _token_cache.TOKEN_CACHE.share(credentials)
 
 
 class BaseRepositoryClient(object):
@@ -144,8 +195,9 @@ class BaseRepositoryClient(object):
         self._repository_lock = threading.RLock()
 
         if use_rate_limiter:
-            self._rate_limiter = RateLimiter(max_calls=quota_max_calls,
-                                             period=quota_period)
+            # The quota is shared with every other client of the same API.
+            self._rate_limiter = _quota_manager.QUOTA_MANAGER.get_bucket(
+                api_name, quota_max_calls, quota_period)
         else:
             self._rate_limiter = None
 
@@ -177,7 +229,7 @@ class BaseRepositoryClient(object):
                 self.name,
                 version,
                 kwargs.get('developer_key'),
-                kwargs.get('cache_discovery', False))
+                kwargs.get('cache_discovery', True))
 
     def __repr__(self):
         """The object representation.
@@ -245,10 +297,12 @@ class GCPRepository(object):
                 number of results to return in one page.
             search_query_field (str): The field name used to filter search
                 results.
-            rate_limiter (object): A RateLimiter object to manage API quota.
+            rate_limiter (TokenBucket): The token bucket managing the quota of
+                the API.
             use_cached_http (bool): If set to true, calls to the API will use
                 a thread local shared http object. When false a new http object
-                is used for each request.
+                is used for each request. Either way, the connections are
+                reused from the shared connection pool.
         """
         self.gcp_service = gcp_service
         self._credentials = credentials
@@ -277,15 +331,15 @@ class GCPRepository(object):
 
     @property
     def http(self):
-        """A thread local instance of httplib2.Http.
+        """A thread local http object, backed by the shared connection pool.
 
         Returns:
-            httplib2.Http: An Http instance authorized by the credentials.
+            PooledHttp: An Http instance authorized by the credentials.
         """
         if self._use_cached_http and hasattr(self._local, 'http'):
             return self._local.http
 
-        http = httplib2.Http(timeout=HTTP_REQUEST_TIMEOUT)
+        http = _http_pool.PooledHttp(_http_pool.HTTP_POOL)
         self._credentials.authorize(http=http)
         if self._use_cached_http:
             self._local.http = http
@@ -432,6 +486,102 @@ class GCPRepository(object):
         request = self._build_request(verb, verb_arguments)
         return self._execute(request)
 
+    def execute_batch(self, verb, verb_arguments_list):
+        """Executes many queries (ex. get) via batched http requests.
+
+        Up to MAX_BATCH_SIZE queries are sent in each http request. Every
+        query still counts against the rate limiter. Queries that fail with a
+        retriable http status are retried on their own, in a later batch.
+
+        Args:
+            verb (str): Method to execute on the component (ex. get).
+            verb_arguments_list (list): The key-value pairs to be passed to
+                _build_request, for each query.
+
+        Returns:
+            list: Tuples of (response, error) for each query, in the same
+                order as verb_arguments_list. error is the HttpError of a
+                query that failed, or None.
+        """
+        results = [None] * len(verb_arguments_list)
+        pending = range(len(verb_arguments_list))
+        attempt = 0
+        while pending:
+            retry_indexes = []
+            for pos in xrange(0, len(pending), MAX_BATCH_SIZE):
+                indexes = pending[pos:pos + MAX_BATCH_SIZE]
+                batch_results = self._execute_batch(
+                    verb, [verb_arguments_list[i] for i in indexes])
+                for index, (response, error) in zip(indexes, batch_results):
+                    self._record_quota_usage(error)
+                    if (error is not None and attempt < self._num_retries and
+                            _is_retryable_http_error(error)):
+                        retry_indexes.append(index)
+                    else:
+                        results[index] = (response, error)
+
+            pending = retry_indexes
+            if pending:
+                attempt += 1
+                LOGGER.debug('Retrying %s batched requests, attempt #%s',
+                             len(pending), attempt)
+                time.sleep(min(2 ** (attempt - 1), MAX_RETRY_WAIT))
+        return results
+
+    def _record_quota_usage(self, error):
+        """Let the rate limiter adapt to the outcome of a request.
+
+        Args:
+            error (Exception): The error raised by the request, or None if
+                the request succeeded.
+        """
+        if not self._rate_limiter:
+            return
+        if error is None:
+            self._rate_limiter.on_success()
+        elif _quota_manager.is_rate_limit_error(error):
+            self._rate_limiter.on_rate_limited(
+                _quota_manager.get_retry_after(error))
+
+    @retry(retry_on_exception=retryable_exceptions.is_retryable_exception,
+           wait_exponential_multiplier=1000, wait_exponential_max=10000,
+           stop_max_attempt_number=5)
+    def _execute_batch(self, verb, verb_arguments_list):
+        """Run a single batch request with retries and rate limiting.
+
+        Args:
+            verb (str): Method to execute on the component (ex. get).
+            verb_arguments_list (list): The key-value pairs to be passed to
+                _build_request, for each query.
+
+        Returns:
+            list: Tuples of (response, error) for each query, in the same
+                order as verb_arguments_list.
+        """
+        responses = {}
+
+        def _callback(request_id, response, exception):
+            """Collect the response of a single request in the batch.
+
+            Args:
+                request_id (str): The id of the request in the batch.
+                response (dict): The response, or None on error.
+                exception (HttpError): The error, or None on success.
+            """
+            responses[request_id] = (response, exception)
+
+        batch = self.gcp_service.new_batch_http_request(callback=_callback)
+        for index, verb_arguments in enumerate(verb_arguments_list):
+            batch.add(self._build_request(verb, verb_arguments),
+                      request_id=str(index))
+
+        if self._rate_limiter:
+            # Each request in the batch counts against the API quota.
+            self._rate_limiter.acquire(len(verb_arguments_list))
+        batch.execute(http=self.http)
+        return [responses[str(index)]
+                for index in xrange(len(verb_arguments_list))]
+
     @retry(retry_on_exception=retryable_exceptions.is_retryable_exception,
            wait_exponential_multiplier=1000, wait_exponential_max=10000,
            stop_max_attempt_number=5)
@@ -443,14 +593,32 @@ class GCPRepository(object):
 
         Returns:
             dict: The response from the API.
+
+        Raises:
+            HttpError: When the request failed, and can't be retried.
         """
-        if self._rate_limiter:
-            # Since the ratelimiter library only exposes a context manager
-            # interface the code has to be duplicated to handle the case where
-            # no rate limiter is defined.
-            with self._rate_limiter:
-                return request.execute(http=self.http,
-                                       num_retries=self._num_retries)
-        return request.execute(http=self.http,
-                               num_retries=self._num_retries)
+        if not self._rate_limiter:
+            return request.execute(http=self.http,
+                                   num_retries=self._num_retries)
+
+        # Retry http errors here instead of within HttpRequest.execute, so
+        # that the quota manager sees every rate limit error.
+        attempt = 0
+        while True:
+            self._rate_limiter.acquire()
+            try:
+                response = request.execute(http=self.http)
+            except errors.HttpError as e:
+                self._record_quota_usage(e)
+                if (attempt >= self._num_retries or
+                        not _is_retryable_http_error(e)):
+                    raise
+                attempt += 1
+                LOGGER.debug('Retrying request, attempt #%s: %s', attempt, e)
+                if not _quota_manager.is_rate_limit_error(e):
+                    # Rate limited retries are already paced by the bucket.
+                    time.sleep(min(2 ** (attempt - 1), MAX_RETRY_WAIT))
+                continue
+            self._record_quota_usage(None)
+            return response
 # pylint: enable=too-many-instance-attributes, too-many-arguments
@@ -0,0 +1,237 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent on-disk cache of the API discovery documents.
+
+Implements the googleapiclient discovery cache interface, so that
+discovery.build() builds the API clients from a local document instead of
+fetching it over the network.
+
+Documents are looked up in order from:
+    * The cache directory, while younger than the cache TTL.
+    * The network, storing the fetched document in the cache directory.
+    * The cache directory or the bundled snapshot directory, regardless of
+      age, when the network is unavailable.
+
+A snapshot is bundled by copying the files of a warm cache directory into
+the discovery_documents directory of this package, and adding them to the
+package data.
+
+A cached document decides where the API calls, and their credentials, are
+sent. So the cache directory must be private: it is created readable by its
+owner only, and is not used if it is owned by another user, or writable by
+the group or others.
+"""
+
+import errno
+import os
+import re
+import stat
+import tempfile
+import time
+
+from googleapiclient.discovery_cache import base
+
+from google.cloud.security.common.util import log_util
+
+LOGGER = log_util.get_logger(__name__)
+
+# Bump when the layout of the cached files changes.
+CACHE_FORMAT_VERSION = 1
+
+# Environment variable to override the default cache directory.
+CACHE_DIR_ENV_VAR = 'FORSETI_DISCOVERY_CACHE_DIR'
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache',
+                                 'forseti', 'discovery')
+
+# Mode of the cache directories created.
+CACHE_DIR_MODE = 0700
+
+# Discovery documents bundled with the release, if any.
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'discovery_documents')
+
+# How long, in seconds, a cached document is used before fetching it again.
+CACHE_TTL = 24 * 60 * 60
+
+
+def _get_file_name(url):
+    """Get the name of the file a discovery document is cached in.
+
+    Args:
+        url (str): The url of the discovery document.
+
+    Returns:
+        str: The file name, e.g.
+            www.googleapis.com_discovery_v1_apis_compute_v1_rest.json
+    """
+    name = re.sub(r'^https?://', '', url)
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', name) + '.json'
+
+
+class DiscoveryCache(base.Cache):
+    """Discovery documents cached as versioned files on disk."""
+
+    def __init__(self, cache_dir=None, snapshot_dir=SNAPSHOT_DIR,
+                 ttl=CACHE_TTL, allow_stale=False):
+        """Initialize.
+
+        Args:
+            cache_dir (str): The directory to cache the documents in.
+                Defaults to $FORSETI_DISCOVERY_CACHE_DIR or a directory under
+                the home directory of the user.
+            snapshot_dir (str): A directory of bundled documents to fall
+                back to, when allow_stale is set.
+            ttl (int): Seconds a cached document is fresh for.
+            allow_stale (bool): Return cached or bundled documents regardless
+                of their age. Used when the network is unavailable.
+        """
+        super(DiscoveryCache, self).__init__()
+        cache_dir = (cache_dir or os.environ.get(CACHE_DIR_ENV_VAR) or
+                     DEFAULT_CACHE_DIR)
+        self.cache_dir = os.path.join(cache_dir, 'v%s' % CACHE_FORMAT_VERSION)
+        self.snapshot_dir = snapshot_dir
+        self.ttl = ttl
+        self.allow_stale = allow_stale
+
+    def stale(self):
+        """Get a copy of this cache, which also returns stale documents.
+
+        Returns:
+            DiscoveryCache: The cache, allowing stale documents.
+        """
+        return DiscoveryCache(os.path.dirname(self.cache_dir),
+                              self.snapshot_dir, self.ttl, allow_stale=True)
+
+    def _is_cache_dir_private(self):
+        """Check the cache directory, and its parent, are private.
+
+        Returns:
+            bool: True if the cache directory can be used.
+        """
+        for path in (os.path.dirname(self.cache_dir), self.cache_dir):
+            if not os.path.lexists(path):
+                return False
+            if not _is_private_dir(path):
+                LOGGER.warn('Not using the discovery cache directory %s, it '
+                            'must be owned by the user and not be writable '
+                            'by the group or others.', path)
+                return False
+        return True
+
+    def get(self, url):
+        """Get a discovery document.
+
+        Args:
+            url (str): The url of the discovery document.
+
+        Returns:
+            str: The discovery document, or None if not cached.
+        """
+        file_name = _get_file_name(url)
+        path = os.path.join(self.cache_dir, file_name)
+        content = None
+        try:
+            if self._is_cache_dir_private() and (
+                    self.allow_stale or
+                    time.time() - os.path.getmtime(path) < self.ttl):
+                content = _read_file(path)
+        except (IOError, OSError):
+            pass
+
+        if content is None and self.allow_stale and self.snapshot_dir:
+            content = _read_file(os.path.join(self.snapshot_dir, file_name))
+            if content is not None:
+                LOGGER.info('Using bundled discovery document for %s', url)
+        return content
+
+    def set(self, url, content):
+        """Store a discovery document.
+
+        The file is written atomically, so that concurrent processes never
+        read a partial document.
+
+        Args:
+            url (str): The url of the discovery document.
+            content (str): The discovery document.
+        """
+        try:
+            _makedirs(self.cache_dir)
+            if not self._is_cache_dir_private():
+                return
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir,
+                                                suffix='.tmp')
+            with os.fdopen(tmp_fd, 'w') as tmp_file:
+                if isinstance(content, unicode):
+                    content = content.encode('utf-8')
+                tmp_file.write(content)
+            os.rename(tmp_path, os.path.join(self.cache_dir,
+                                             _get_file_name(url)))
+        except (IOError, OSError) as e:
+            LOGGER.warn('Unable to cache discovery document for %s: %s',
+                        url, e)
+
+
+def _read_file(path):
+    """Read a file if it exists.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The content of the file, or None if it can't be read.
+    """
+    try:
+        with open(path) as f:
+            return f.read().decode('utf-8')
+    except (IOError, OSError):
+        return None
+
+
+def _is_private_dir(path):
+    """Check a directory is owned by the user, and only writable by them.
+
+    Args:
+        path (str): The directory to check.
+
+    Returns:
+        bool: True if the directory is private.
+    """
+    try:
+        path_stat = os.lstat(path)
+    except OSError:
+        return False
+    return (stat.S_ISDIR(path_stat.st_mode) and
+            path_stat.st_uid == os.getuid() and
+            not path_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _makedirs(path):
+    """Create a private directory and its parents, if they don't exist.
+
+    Args:
+        path (str): The directory to create.
+
+    Raises:
+        OSError: When the directory can't be created.
+    """
+    try:
+        os.makedirs(path, CACHE_DIR_MODE)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+DISCOVERY_CACHE = DiscoveryCache()
@@ -0,0 +1,273 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide pool of keep-alive http connections, keyed by host.
+
+httplib2.Http is not thread-safe, so each request checks out an Http object
+dedicated to the host of the request, and returns it to the pool once the
+response has been read. The open connection of the Http object is then
+reused by the next request to the same host, from any thread.
+"""
+
+import collections
+import threading
+import urlparse
+
+import httplib2
+
+# Maximum number of open connections, across all hosts.
+DEFAULT_MAX_CONNECTIONS = 100
+
+# Timeout, in seconds, of each request.
+DEFAULT_TIMEOUT = 30.0
+
+
+def _close(http):
+    """Close all the open connections of an Http object.
+
+    Args:
+        http (httplib2.Http): The Http object to close.
+    """
+    for connection in http.connections.values():
+        connection.close()
+    http.connections.clear()
+
+
+class _IdleHttps(object):
+    """The idle Http objects of a pool, by host and by last use.
+
+    Not thread-safe, used with the lock of the pool held.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self._by_host = collections.defaultdict(list)
+        # The host of each idle Http object, least recently used first.
+        self._hosts = collections.OrderedDict()
+
+    def push(self, host, http):
+        """Add an Http object that was just used.
+
+        Args:
+            host (str): The host the Http object was used for.
+            http (httplib2.Http): The idle Http object.
+        """
+        self._by_host[host].append(http)
+        self._hosts[http] = host
+
+    def pop(self, host):
+        """Remove the most recently used Http object of a host.
+
+        Args:
+            host (str): The host to get an Http object for.
+
+        Returns:
+            httplib2.Http: The Http object, or None if none is idle.
+        """
+        if not self._by_host[host]:
+            return None
+        http = self._by_host[host].pop()
+        del self._hosts[http]
+        return http
+
+    def pop_least_recently_used(self):
+        """Remove the Http object idle for the longest time, of any host.
+
+        Returns:
+            httplib2.Http: The Http object, or None if none is idle.
+        """
+        if not self._hosts:
+            return None
+        http, host = self._hosts.popitem(last=False)
+        self._by_host[host].remove(http)
+        return http
+
+    def count_by_host(self):
+        """Count the idle Http objects of each host.
+
+        Returns:
+            dict: The number of idle Http objects, by host.
+        """
+        return dict((host, len(idle))
+                    for host, idle in self._by_host.iteritems() if idle)
+
+
+class HttpConnectionPool(object):
+    """Thread-safe pool of Http objects, keyed by host."""
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 timeout=DEFAULT_TIMEOUT, http_factory=None):
+        """Initialize.
+
+        Args:
+            max_connections (int): Maximum number of Http objects, and so of
+                open connections, across all hosts.
+            timeout (float): Timeout, in seconds, of each request.
+            http_factory (function): Creates the Http objects, called with
+                the timeout. Defaults to httplib2.Http.
+        """
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.http_factory = http_factory
+        self._idle = _IdleHttps()
+        self._size = 0
+        self._condition = threading.Condition()
+        self._stats = collections.Counter()
+
+    def checkout(self, host):
+        """Get an Http object for a host, blocking if the pool is exhausted.
+
+        Args:
+            host (str): The host the request is made to.
+
+        Returns:
+            httplib2.Http: An Http object only used by the caller, until it is
+                checked in again.
+        """
+        with self._condition:
+            waited = False
+            while True:
+                http = self._idle.pop(host)
+                if http is not None:
+                    self._stats['reused'] += 1
+                    return http
+
+                if self._size >= self.max_connections:
+                    # Make room by closing an idle connection to another host.
+                    self._evict_idle()
+
+                if self._size < self.max_connections:
+                    self._size += 1
+                    self._stats['created'] += 1
+                    http_factory = self.http_factory or httplib2.Http
+                    return http_factory(timeout=self.timeout)
+
+                if not waited:
+                    self._stats['waited'] += 1
+                    waited = True
+                self._condition.wait()
+
+    def _evict_idle(self):
+        """Close the least recently used idle Http object of any host.
+
+        Must be called with the lock held.
+        """
+        http = self._idle.pop_least_recently_used()
+        if http is None:
+            return
+        _close(http)
+        self._size -= 1
+        self._stats['evicted'] += 1
+
+    def checkin(self, host, http):
+        """Return an Http object to the pool, keeping its connection open.
+
+        Args:
+            host (str): The host the Http object was checked out for.
+            http (httplib2.Http): The Http object to return.
+        """
+        with self._condition:
+            self._idle.push(host, http)
+            self._condition.notify()
+
+    def discard(self, http):
+        """Close an Http object that failed, instead of returning it.
+
+        Args:
+            http (httplib2.Http): The Http object to discard.
+        """
+        _close(http)
+        with self._condition:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._condition.notify()
+
+    def request(self, uri, *args, **kwargs):
+        """Make a request with a pooled Http object.
+
+        Args:
+            uri (str): The uri of the request.
+            *args (list): Additional arguments to httplib2.Http.request().
+            **kwargs (dict): Additional arguments to httplib2.Http.request().
+
+        Returns:
+            tuple: (response, content) as returned by httplib2.Http.request().
+        """
+        host = urlparse.urlsplit(uri).netloc
+        http = self.checkout(host)
+        succeeded = False
+        try:
+            response = http.request(uri, *args, **kwargs)
+            succeeded = True
+            return response
+        finally:
+            # The connection of a failed request may be in any state.
+            if succeeded:
+                self.checkin(host, http)
+            else:
+                self.discard(http)
+
+    def get_stats(self):
+        """Get the usage statistics of the pool.
+
+        Returns:
+            dict: The number of Http objects created, reused, evicted,
+                discarded and waited for, with the current number of open
+                and idle connections, and idle connections per host.
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            idle_by_host = self._idle.count_by_host()
+            stats['open'] = self._size
+            stats['idle'] = sum(idle_by_host.itervalues())
+            stats['idle_by_host'] = idle_by_host
+        return stats
+
+
+class PooledHttp(object):
+    """Drop-in replacement for httplib2.Http, backed by a connection pool.
+
+    Each instance can be authorized with its own credentials, while all the
+    instances share the connections of the pool.
+    """
+
+    def __init__(self, pool):
+        """Initialize.
+
+        Args:
+            pool (HttpConnectionPool): The pool to make requests with.
+        """
+        self.pool = pool
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=httplib2.DEFAULT_MAX_REDIRECTS,
+                connection_type=None):
+        """Make a request, see httplib2.Http.request().
+
+        Args:
+            uri (str): The uri of the request.
+            method (str): The http method.
+            body (str): The body of the request.
+            headers (dict): The headers of the request.
+            redirections (int): Maximum number of redirects to follow.
+            connection_type (class): The connection class to use.
+
+        Returns:
+            tuple: (response, content)
+        """
+        return self.pool.request(uri, method, body, headers, redirections,
+                                 connection_type)
+
+
+HTTP_POOL = HttpConnectionPool()
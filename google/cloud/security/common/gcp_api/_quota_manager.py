@@ -0,0 +1,309 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Adaptive API quota management, shared by all the clients of an API.
+
+Each API gets a single token bucket for the whole process, so that all the
+clients (and threads) calling the same API share its quota. The rate of the
+bucket adapts to the responses of the API: it is cut in half when the API
+returns a rate limit error (AIMD), and slowly ramps back up to the configured
+quota as calls succeed.
+"""
+
+import json
+import threading
+import time
+
+from google.cloud.security.common.util import log_util
+
+LOGGER = log_util.get_logger(__name__)
+
+# The rate is multiplied by this factor on every rate limit error.
+MULTIPLICATIVE_DECREASE = 0.5
+
+# Fraction of the configured quota, per second, the rate ramps up by while
+# calls succeed.
+ADDITIVE_INCREASE = 0.1
+
+# The rate never drops below this fraction of the configured quota.
+MIN_RATE_RATIO = 0.05
+
+# Rate limit errors within this many seconds of the last decrease are
+# considered part of the same burst, and do not decrease the rate again.
+DECREASE_COOLDOWN = 1.0
+
+# Maximum time, in seconds, to honor a Retry-After header for.
+MAX_RETRY_AFTER = 60.0
+
+RATE_LIMIT_REASONS = frozenset(['rateLimitExceeded', 'userRateLimitExceeded'])
+
+
+class _AdaptiveRate(object):
+    """The AIMD state of the rate of an API, guarded by its bucket's lock."""
+
+    def __init__(self, name, max_rate):
+        """Initialize.
+
+        Args:
+            name (str): The name of the API.
+            max_rate (float): The configured quota, in calls per second.
+        """
+        self.name = name
+        self.max_rate = max_rate
+        self.min_rate = max_rate * MIN_RATE_RATIO
+        self.rate = max_rate
+        self.rate_limited_count = 0
+        self.last_decrease = None
+        self.blocked_until = 0.0
+
+    def increase(self):
+        """Ramp the rate back up towards the configured quota."""
+        if self.rate < self.max_rate:
+            # Each call adds a fraction, so that the rate grows by
+            # ADDITIVE_INCREASE of the quota per second of traffic.
+            self.rate = min(
+                self.max_rate,
+                self.rate + ADDITIVE_INCREASE * self.max_rate / self.rate)
+
+    def decrease(self, now, retry_after=None):
+        """Back off after a rate limit error.
+
+        Args:
+            now (float): The current time.
+            retry_after (float): Seconds the API asked to wait before the next
+                call, if any.
+
+        Returns:
+            bool: True if the rate was decreased, False if the error is part
+                of the burst of the last decrease.
+        """
+        self.rate_limited_count += 1
+        if retry_after:
+            self.blocked_until = max(
+                self.blocked_until, now + min(retry_after, MAX_RETRY_AFTER))
+
+        if (self.last_decrease is not None and
+                now - self.last_decrease < DECREASE_COOLDOWN):
+            return False
+        self.last_decrease = now
+        self.rate = max(self.min_rate, self.rate * MULTIPLICATIVE_DECREASE)
+        LOGGER.warn('Rate limited by %s API, reducing rate to %.2f '
+                    'calls per second.', self.name, self.rate)
+        return True
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket with an adaptive rate."""
+
+    def __init__(self, name, max_calls, period, clock=time.time,
+                 sleep=time.sleep):
+        """Initialize.
+
+        Args:
+            name (str): The name of the API the bucket manages quota for.
+            max_calls (int): Allowed requests per <period> for the API.
+            period (float): The time period, in seconds, of the quota.
+            clock (function): Returns the current time, in seconds.
+            sleep (function): Blocks for a number of seconds.
+        """
+        # Quotas are enforced per period, so the whole quota of a period may
+        # be used in a single burst.
+        self.capacity = max(1.0, float(max_calls))
+
+        self._adaptive_rate = _AdaptiveRate(name, float(max_calls) / period)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._last_refill = clock()
+
+    @property
+    def name(self):
+        """The name of the API the bucket manages quota for.
+
+        Returns:
+            str: The name of the API.
+        """
+        return self._adaptive_rate.name
+
+    @property
+    def rate(self):
+        """The current rate, in calls per second.
+
+        Returns:
+            float: The current rate.
+        """
+        return self._adaptive_rate.rate
+
+    @property
+    def max_rate(self):
+        """The configured quota, in calls per second.
+
+        Returns:
+            float: The configured quota.
+        """
+        return self._adaptive_rate.max_rate
+
+    @property
+    def min_rate(self):
+        """The rate the bucket never drops below, in calls per second.
+
+        Returns:
+            float: The minimum rate.
+        """
+        return self._adaptive_rate.min_rate
+
+    @property
+    def rate_limited_count(self):
+        """The number of rate limit errors returned by the API.
+
+        Returns:
+            int: The number of rate limit errors.
+        """
+        return self._adaptive_rate.rate_limited_count
+
+    def __repr__(self):
+        """The object representation.
+
+        Returns:
+            str: The object representation.
+        """
+        return ('TokenBucket: name=%s, rate=%.2f/s, max_rate=%.2f/s, '
+                'rate_limited=%s' % (self.name, self.rate, self.max_rate,
+                                     self.rate_limited_count))
+
+    def _refill(self, now):
+        """Add the tokens accumulated since the last refill.
+
+        Must be called with the lock held.
+
+        Args:
+            now (float): The current time.
+        """
+        elapsed = max(0.0, now - self._last_refill)
+        self._tokens = min(self.capacity,
+                           self._tokens + elapsed * self._adaptive_rate.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens=1):
+        """Block until the tokens are available, and consume them.
+
+        Args:
+            tokens (int): The number of calls about to be made.
+        """
+        for _ in xrange(tokens):
+            while True:
+                with self._lock:
+                    now = self._clock()
+                    self._refill(now)
+                    if now < self._adaptive_rate.blocked_until:
+                        wait = self._adaptive_rate.blocked_until - now
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    else:
+                        wait = (1 - self._tokens) / self._adaptive_rate.rate
+                self._sleep(wait)
+
+    def on_success(self):
+        """Ramp the rate back up towards the configured quota."""
+        with self._lock:
+            self._adaptive_rate.increase()
+
+    def on_rate_limited(self, retry_after=None):
+        """Back off after the API returned a rate limit error.
+
+        Args:
+            retry_after (float): Seconds the API asked to wait before the next
+                call, if any.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if self._adaptive_rate.decrease(now, retry_after):
+                # Drop the burst allowance, to stop a storm of queued calls.
+                self._tokens = min(self._tokens, 0.0)
+
+
+class QuotaManager(object):
+    """Process-wide registry of the token bucket of each API."""
+
+    def __init__(self):
+        """Initialize."""
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, api_name, max_calls, period):
+        """Get the token bucket of an API, creating it if needed.
+
+        The first configuration of an API is used by all later callers.
+
+        Args:
+            api_name (str): The name of the API.
+            max_calls (int): Allowed requests per <period> for the API.
+            period (float): The time period, in seconds, of the quota.
+
+        Returns:
+            TokenBucket: The token bucket shared by all clients of the API.
+        """
+        with self._lock:
+            bucket = self._buckets.get(api_name)
+            if bucket is None:
+                bucket = TokenBucket(api_name, max_calls, period)
+                self._buckets[api_name] = bucket
+            return bucket
+
+
+QUOTA_MANAGER = QuotaManager()
+
+
+def is_rate_limit_error(error):
+    """Whether an API error was caused by exceeding a rate limit.
+
+    Args:
+        error (Exception): The error raised by the request.
+
+    Returns:
+        bool: True for a rate limit error. False otherwise.
+    """
+    resp = getattr(error, 'resp', None)
+    if resp is None:
+        return False
+    if resp.status == 429:
+        return True
+    if resp.status == 403:
+        try:
+            reason = json.loads(error.content)['error']['errors'][0]['reason']
+        except (TypeError, ValueError, KeyError, IndexError):
+            return False
+        return reason in RATE_LIMIT_REASONS
+    return False
+
+
+def get_retry_after(error):
+    """Get the number of seconds an API error asked to wait before retrying.
+
+    Args:
+        error (Exception): The error raised by the request.
+
+    Returns:
+        float: The seconds in the Retry-After header, or None if not set.
+    """
+    resp = getattr(error, 'resp', None)
+    if resp is None:
+        return None
+    try:
+        return float(resp.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
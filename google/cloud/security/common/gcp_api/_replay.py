@@ -0,0 +1,785 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Record and replay of the GCP API traffic, for offline benchmarking.
+
+A recording captures the responses of the APIs, their latency and the
+discovery documents while the inventory runs against a real organization.
+The recording is saved as a JSON fixture file, and replayed by a fake API
+server behind the http connection pool and the discovery cache, so that the
+whole client stack (discovery, authorization, pagination, batching, quota
+and retries) runs unchanged, without any network access.
+
+Authorization requests are never recorded. They are answered by the fake
+server with a dummy access token.
+
+Usage:
+    recording = _replay.start_recording()
+    ... run the inventory ...
+    recording.save('fixture.json')
+
+    _replay.start_replay(_replay.Recording.load('fixture.json'),
+                         latency_scale=0.5, error_rate=0.01)
+    ... run the inventory ...
+"""
+
+import base64
+from email.feedparser import FeedParser
+import httplib
+import json
+import random
+import threading
+import time
+import urllib
+import urlparse
+
+from googleapiclient.discovery_cache import base
+import httplib2
+
+from google.cloud.security.common.gcp_api import _discovery_cache
+from google.cloud.security.common.gcp_api import _http_pool
+from google.cloud.security.common.util import log_util
+
+LOGGER = log_util.get_logger(__name__)
+
+# Bump when the layout of the fixture files changes.
+FIXTURE_FORMAT_VERSION = 1
+
+# Hosts and urls of the authorization requests, which are never recorded.
+AUTH_HOSTS = frozenset(['oauth2.googleapis.com', 'metadata.google.internal',
+                        '169.254.169.254'])
+AUTH_URLS = frozenset(['https://accounts.google.com/o/oauth2/token',
+                       'https://www.googleapis.com/oauth2/v4/token'])
+
+# Response headers kept in the recording.
+RECORDED_HEADERS = frozenset(['content-type', 'retry-after', 'location'])
+
+# Query parameters which don't identify a request.
+IGNORED_QUERY_PARAMETERS = frozenset(['key', 'quotaUser'])
+
+FAKE_TOKEN_RESPONSE = json.dumps({'access_token': 'replay-access-token',
+                                  'token_type': 'Bearer',
+                                  'expires_in': 3600})
+
+INJECTED_ERROR_CONTENT = json.dumps({
+    'error': {'code': 429,
+              'message': 'Injected rate limit error.',
+              'errors': [{'reason': 'rateLimitExceeded'}]}})
+
+
+def _is_auth_request(uri):
+    """Whether a request is an authorization request.
+
+    Args:
+        uri (str): The uri of the request.
+
+    Returns:
+        bool: True for token and metadata server requests.
+    """
+    parsed = urlparse.urlsplit(uri)
+    return (parsed.hostname in AUTH_HOSTS or
+            '%s://%s%s' % (parsed.scheme, parsed.netloc, parsed.path)
+            in AUTH_URLS)
+
+
+def _get_request_key(method, uri, body):
+    """Get the key identifying equivalent requests.
+
+    Args:
+        method (str): The http method.
+        uri (str): The uri of the request.
+        body (str): The body of the request, if any.
+
+    Returns:
+        tuple: (method, uri, body), with the query parameters of the uri
+            sorted and the json body normalized.
+    """
+    parsed = urlparse.urlsplit(uri)
+    query = sorted((k, v) for k, v in urlparse.parse_qsl(parsed.query, True)
+                   if k not in IGNORED_QUERY_PARAMETERS)
+    uri = urlparse.urlunsplit((parsed.scheme, parsed.netloc, parsed.path,
+                               urllib.urlencode(query), ''))
+    body = body or ''
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True)
+    except ValueError:
+        pass
+    return (method.upper(), uri, body)
+
+
+def _encode_content(content):
+    """Encode a response body so that it can be stored as json.
+
+    Args:
+        content (str): The response body.
+
+    Returns:
+        dict: The encoded body.
+    """
+    try:
+        return {'content': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'content': base64.b64encode(content), 'encoding': 'base64'}
+
+
+def _decode_content(response):
+    """Decode a response body stored with _encode_content().
+
+    Args:
+        response (dict): The recorded response.
+
+    Returns:
+        str: The response body.
+    """
+    if response.get('encoding') == 'base64':
+        return base64.b64decode(response['content'])
+    return response['content'].encode('utf-8')
+
+
+def _parse_message(headers, payload):
+    """Parse a MIME message.
+
+    Args:
+        headers (str): Headers to prepend to the payload, if any.
+        payload (str): The message.
+
+    Returns:
+        Message: The parsed message.
+    """
+    parser = FeedParser()
+    parser.feed(headers + payload)
+    return parser.close()
+
+
+def _split_http_message(message):
+    """Split an application/http message, as found in batch requests.
+
+    Args:
+        message (str): The message.
+
+    Returns:
+        tuple: (start_line, headers, body)
+    """
+    start_line, message = message.split('\n', 1)
+    for separator in ('\r\n\r\n', '\n\n'):
+        if separator in message:
+            header_lines, body = message.split(separator, 1)
+            break
+    else:
+        header_lines, body = message, ''
+    return start_line.strip(), _parse_message(header_lines, '\n\n'), body
+
+
+def _parse_batch_request(content_type, body):
+    """Parse the requests of a batch request.
+
+    Args:
+        content_type (str): The content type of the batch request.
+        body (str): The body of the batch request.
+
+    Returns:
+        list: Tuples of (content_id, method, uri, body), one per request.
+    """
+    requests = []
+    message = _parse_message('content-type: %s\r\n\r\n' % content_type, body)
+    for part in message.get_payload():
+        start_line, headers, part_body = _split_http_message(
+            part.get_payload())
+        method, path = start_line.split(' ')[:2]
+        uri = 'https://%s%s' % (headers['Host'], path)
+        requests.append((part['Content-ID'], method, uri, part_body))
+    return requests
+
+
+def _parse_batch_response(content_type, content):
+    """Parse the responses of a batch response.
+
+    Args:
+        content_type (str): The content type of the batch response.
+        content (str): The body of the batch response.
+
+    Returns:
+        dict: (status, headers, content) of each response, keyed by the
+            Content-ID of its request.
+    """
+    responses = {}
+    message = _parse_message('content-type: %s\r\n\r\n' % content_type,
+                             content)
+    for part in message.get_payload():
+        status_line, headers, part_content = _split_http_message(
+            part.get_payload())
+        # The response of request <id> is identified by <response-id>.
+        content_id = '<%s' % part['Content-ID'][1:].replace('response-', '', 1)
+        responses[content_id] = (int(status_line.split(' ')[1]),
+                                 dict(headers.items()), part_content)
+    return responses
+
+
+def _format_batch_response(boundary, responses):
+    """Build the body of a batch response.
+
+    Args:
+        boundary (str): The MIME boundary to separate the responses with.
+        responses (list): Tuples of (content_id, status, headers, content).
+
+    Returns:
+        str: The body of the batch response.
+    """
+    parts = []
+    for content_id, status, headers, content in responses:
+        response_id = '<response-%s' % content_id[1:]
+        header_lines = ''.join('%s: %s\r\n' % (key, value)
+                               for key, value in sorted(headers.iteritems()))
+        parts.append(
+            '--%s\r\nContent-Type: application/http\r\n'
+            'Content-ID: %s\r\n\r\nHTTP/1.1 %s %s\r\n%s\r\n%s\r\n' % (
+                boundary, response_id, status,
+                httplib.responses.get(status, ''), header_lines,
+                content))
+    parts.append('--%s--\r\n' % boundary)
+    return ''.join(parts)
+
+
+def _is_batch_request(headers):
+    """Whether a request is a batch request.
+
+    Args:
+        headers (dict): The headers of the request.
+
+    Returns:
+        bool: True for a multipart/mixed request.
+    """
+    return 'multipart/mixed' in _get_header(headers, 'content-type')
+
+
+def _get_header(headers, name):
+    """Get a header, regardless of the case of its name.
+
+    Args:
+        headers (dict): The headers.
+        name (str): The lower case name of the header.
+
+    Returns:
+        str: The value of the header, or an empty string if not set.
+    """
+    for key, value in (headers or {}).iteritems():
+        if key.lower() == name:
+            return value
+    return ''
+
+
+class Recording(object):
+    """Thread-safe collection of recorded API responses."""
+
+    def __init__(self):
+        """Initialize."""
+        self.interactions = {}
+        self.discovery_documents = {}
+        self._lock = threading.Lock()
+
+    def add(self, method, uri, body, status, headers, content, latency):
+        """Record the response to a request.
+
+        Responses to the same request are recorded in order, so that errors
+        followed by successful retries are replayed the same way.
+
+        Args:
+            method (str): The http method.
+            uri (str): The uri of the request.
+            body (str): The body of the request, if any.
+            status (int): The http status of the response.
+            headers (dict): The headers of the response.
+            content (str): The body of the response.
+            latency (float): Seconds the response took.
+        """
+        response = _encode_content(content)
+        response['status'] = int(status)
+        response['headers'] = dict(
+            (key.lower(), value) for key, value in headers.iteritems()
+            if key.lower() in RECORDED_HEADERS)
+        response['latency'] = round(latency, 4)
+        key = _get_request_key(method, uri, body)
+        with self._lock:
+            self.interactions.setdefault(key, []).append(response)
+
+    def add_discovery_document(self, url, content):
+        """Record a discovery document.
+
+        Args:
+            url (str): The url of the discovery document.
+            content (str): The discovery document.
+        """
+        with self._lock:
+            self.discovery_documents[url] = content
+
+    def get_responses(self, method, uri, body):
+        """Get the recorded responses to a request.
+
+        Args:
+            method (str): The http method.
+            uri (str): The uri of the request.
+            body (str): The body of the request, if any.
+
+        Returns:
+            list: The recorded responses, in order. Empty if none.
+        """
+        return self.interactions.get(_get_request_key(method, uri, body), [])
+
+    def save(self, path):
+        """Save the recording as a fixture file.
+
+        Args:
+            path (str): The path of the fixture file.
+        """
+        with self._lock:
+            fixture = {
+                'version': FIXTURE_FORMAT_VERSION,
+                'discovery_documents': self.discovery_documents,
+                'interactions': [
+                    {'method': method, 'uri': uri, 'body': body,
+                     'responses': responses}
+                    for (method, uri, body), responses
+                    in sorted(self.interactions.iteritems())]}
+        with open(path, 'w') as fixture_file:
+            json.dump(fixture, fixture_file, indent=1, sort_keys=True)
+        LOGGER.info('Saved %s recorded requests to %s.',
+                    len(fixture['interactions']), path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a recording from a fixture file.
+
+        Args:
+            path (str): The path of the fixture file.
+
+        Returns:
+            Recording: The loaded recording.
+
+        Raises:
+            ValueError: If the fixture file has an unsupported format.
+        """
+        with open(path) as fixture_file:
+            fixture = json.load(fixture_file)
+        if fixture.get('version') != FIXTURE_FORMAT_VERSION:
+            raise ValueError('Unsupported fixture format version: %s' %
+                             fixture.get('version'))
+        recording = cls()
+        recording.discovery_documents = fixture['discovery_documents']
+        for interaction in fixture['interactions']:
+            key = (interaction['method'], interaction['uri'],
+                   interaction['body'])
+            recording.interactions[key] = interaction['responses']
+        return recording
+
+
+class RecordingHttp(object):
+    """Drop-in replacement for httplib2.Http, recording the responses."""
+
+    def __init__(self, http, recording):
+        """Initialize.
+
+        Args:
+            http (httplib2.Http): The Http object making the requests.
+            recording (Recording): The recording to add the responses to.
+        """
+        self.http = http
+        self.recording = recording
+        self.connections = http.connections
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=httplib2.DEFAULT_MAX_REDIRECTS,
+                connection_type=None):
+        """Make a request, see httplib2.Http.request().
+
+        Args:
+            uri (str): The uri of the request.
+            method (str): The http method.
+            body (str): The body of the request.
+            headers (dict): The headers of the request.
+            redirections (int): Maximum number of redirects to follow.
+            connection_type (class): The connection class to use.
+
+        Returns:
+            tuple: (response, content)
+        """
+        start = time.time()
+        response, content = self.http.request(uri, method, body, headers,
+                                              redirections, connection_type)
+        latency = time.time() - start
+        if _is_auth_request(uri):
+            return response, content
+
+        if (_is_batch_request(headers) and
+                'multipart/mixed' in response.get('content-type', '')):
+            self._record_batch(headers, body, response, content, latency)
+        else:
+            self.recording.add(method, uri, body, response.status, response,
+                               content, latency)
+        return response, content
+
+    def _record_batch(self, headers, body, response, content, latency):
+        """Record each request of a batch on its own.
+
+        The requests are recorded separately, so that they can be replayed
+        in any other batch.
+
+        Args:
+            headers (dict): The headers of the batch request.
+            body (str): The body of the batch request.
+            response (httplib2.Response): The response to the batch.
+            content (str): The content of the response to the batch.
+            latency (float): Seconds the batch took.
+        """
+        responses = _parse_batch_response(response['content-type'], content)
+        for content_id, method, uri, part_body in _parse_batch_request(
+                _get_header(headers, 'content-type'), body):
+            if content_id in responses:
+                status, part_headers, part_content = responses[content_id]
+                self.recording.add(method, uri, part_body, status,
+                                   part_headers, part_content, latency)
+
+
+class _ServingConditions(object):
+    """The latency and the errors of the responses of the fake server."""
+
+    def __init__(self, latency_scale, fixed_latency, error_rate, seed):
+        """Initialize.
+
+        Args:
+            latency_scale (float): Factor applied to the recorded latency of
+                each response.
+            fixed_latency (float): Seconds every response takes, instead of
+                its recorded latency.
+            error_rate (float): Fraction of the requests that fail.
+            seed (int): Seed of the error injection.
+        """
+        self.latency_scale = latency_scale
+        self.fixed_latency = fixed_latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def get_latency(self, response):
+        """Get the delay of a response.
+
+        Args:
+            response (dict): The recorded response.
+
+        Returns:
+            float: Seconds to wait before returning the response.
+        """
+        if self.fixed_latency is not None:
+            return self.fixed_latency
+        return response.get('latency', 0.0) * self.latency_scale
+
+    def inject_error(self):
+        """Draw whether a request fails. Not thread-safe.
+
+        Returns:
+            bool: True if the request must fail.
+        """
+        return self._random.random() < self.error_rate
+
+
+class FakeApiServer(object):
+    """Thread-safe fake GCP API server, replaying a recording."""
+
+    def __init__(self, recording, latency_scale=1.0, fixed_latency=None,
+                 error_rate=0.0, seed=None, sleep=time.sleep):
+        """Initialize.
+
+        Args:
+            recording (Recording): The responses to replay.
+            latency_scale (float): Factor applied to the recorded latency of
+                each response. 0 replays without any delay.
+            fixed_latency (float): Seconds every response takes, instead of
+                its recorded latency.
+            error_rate (float): Fraction of the requests, between 0 and 1,
+                that fail with an injected rate limit error.
+            seed (int): Seed of the error injection, for repeatable runs.
+            sleep (function): Blocks for a number of seconds.
+        """
+        self.recording = recording
+        self._conditions = _ServingConditions(
+            latency_scale, fixed_latency, error_rate, seed)
+        self._sleep = sleep
+        self._served = {}
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'misses': 0, 'injected_errors': 0}
+
+    def handle(self, method, uri, body):
+        """Get the response to a single request.
+
+        The recorded responses to a request are returned in order, the last
+        one being returned for any further request.
+
+        Args:
+            method (str): The http method.
+            uri (str): The uri of the request.
+            body (str): The body of the request, if any.
+
+        Returns:
+            tuple: (status, headers, content, latency)
+        """
+        if _is_auth_request(uri):
+            return 200, {'content-type': 'application/json'}, (
+                FAKE_TOKEN_RESPONSE), 0.0
+
+        key = _get_request_key(method, uri, body)
+        responses = self.recording.interactions.get(key)
+        with self._lock:
+            self._stats['requests'] += 1
+            if not responses:
+                self._stats['misses'] += 1
+            elif self._conditions.inject_error():
+                self._stats['injected_errors'] += 1
+                return (429, {'content-type': 'application/json'},
+                        INJECTED_ERROR_CONTENT,
+                        self._conditions.get_latency(responses[0]))
+            else:
+                index = self._served.get(key, 0)
+                self._served[key] = index + 1
+                response = responses[min(index, len(responses) - 1)]
+
+        if not responses:
+            LOGGER.warn('No recorded response to %s %s', method, uri)
+            return 404, {'content-type': 'application/json'}, json.dumps({
+                'error': {'code': 404,
+                          'message': 'No recorded response.'}}), 0.0
+        headers = dict(response['headers'])
+        headers.setdefault('content-type', 'application/json')
+        return (response['status'], headers, _decode_content(response),
+                self._conditions.get_latency(response))
+
+    def request(self, uri, method='GET', body=None, headers=None):
+        """Serve a request, like a remote server would.
+
+        Args:
+            uri (str): The uri of the request.
+            method (str): The http method.
+            body (str): The body of the request.
+            headers (dict): The headers of the request.
+
+        Returns:
+            tuple: (response, content), as returned by httplib2.Http.request().
+        """
+        if _is_batch_request(headers):
+            status, response_headers, content, latency = self._handle_batch(
+                _get_header(headers, 'content-type'), body)
+        else:
+            status, response_headers, content, latency = self.handle(
+                method, uri, body)
+        if latency:
+            self._sleep(latency)
+        response_headers['status'] = str(status)
+        return httplib2.Response(response_headers), content
+
+    def _handle_batch(self, content_type, body):
+        """Serve a batch request.
+
+        Args:
+            content_type (str): The content type of the batch request.
+            body (str): The body of the batch request.
+
+        Returns:
+            tuple: (status, headers, content, latency), the latency being
+                the longest latency of the requests in the batch.
+        """
+        responses = []
+        batch_latency = 0.0
+        for content_id, method, uri, part_body in _parse_batch_request(
+                content_type, body):
+            status, headers, content, latency = self.handle(
+                method, uri, part_body)
+            responses.append((content_id, status, headers, content))
+            batch_latency = max(batch_latency, latency)
+        boundary = 'batch_replay_%s' % len(responses)
+        return 200, {'content-type': 'multipart/mixed; boundary=%s' % (
+            boundary)}, _format_batch_response(boundary, responses), (
+                batch_latency)
+
+    def get_stats(self):
+        """Get the statistics of the replay.
+
+        Returns:
+            dict: The number of requests served, requests without a recorded
+                response and injected errors.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+class ReplayHttp(object):
+    """Drop-in replacement for httplib2.Http, served by a FakeApiServer."""
+
+    def __init__(self, server):
+        """Initialize.
+
+        Args:
+            server (FakeApiServer): The server to send the requests to.
+        """
+        self.server = server
+        self.connections = {}
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=httplib2.DEFAULT_MAX_REDIRECTS,
+                connection_type=None):
+        """Make a request, see httplib2.Http.request().
+
+        Args:
+            uri (str): The uri of the request.
+            method (str): The http method.
+            body (str): The body of the request.
+            headers (dict): The headers of the request.
+            redirections (int): Unused.
+            connection_type (class): Unused.
+
+        Returns:
+            tuple: (response, content)
+        """
+        del redirections, connection_type
+        return self.server.request(uri, method, body, headers)
+
+
+class RecordingDiscoveryCache(base.Cache):
+    """Discovery cache recording the documents it serves."""
+
+    def __init__(self, cache, recording):
+        """Initialize.
+
+        Args:
+            cache (DiscoveryCache): The cache to serve the documents from.
+            recording (Recording): The recording to add the documents to.
+        """
+        super(RecordingDiscoveryCache, self).__init__()
+        self.cache = cache
+        self.recording = recording
+
+    def stale(self):
+        """Get a copy of this cache, which also returns stale documents.
+
+        Returns:
+            RecordingDiscoveryCache: The cache, allowing stale documents.
+        """
+        return RecordingDiscoveryCache(self.cache.stale(), self.recording)
+
+    def get(self, url):
+        """Get a discovery document.
+
+        Args:
+            url (str): The url of the discovery document.
+
+        Returns:
+            str: The discovery document, or None if not cached.
+        """
+        content = self.cache.get(url)
+        if content is not None:
+            self.recording.add_discovery_document(url, content)
+        return content
+
+    def set(self, url, content):
+        """Store a discovery document.
+
+        Args:
+            url (str): The url of the discovery document.
+            content (str): The discovery document.
+        """
+        self.recording.add_discovery_document(url, content)
+        self.cache.set(url, content)
+
+
+class ReplayDiscoveryCache(base.Cache):
+    """Discovery cache serving the recorded documents."""
+
+    def __init__(self, recording):
+        """Initialize.
+
+        Args:
+            recording (Recording): The recording to serve the documents from.
+        """
+        super(ReplayDiscoveryCache, self).__init__()
+        self.recording = recording
+
+    def stale(self):
+        """Get a copy of this cache, which also returns stale documents.
+
+        Returns:
+            ReplayDiscoveryCache: This cache, recorded documents never expire.
+        """
+        return self
+
+    def get(self, url):
+        """Get a discovery document.
+
+        Args:
+            url (str): The url of the discovery document.
+
+        Returns:
+            str: The recorded discovery document, or None if not recorded.
+        """
+        return self.recording.discovery_documents.get(url)
+
+    def set(self, url, content):
+        """Ignore discovery documents fetched while replaying.
+
+        Args:
+            url (str): The url of the discovery document.
+            content (str): The discovery document.
+        """
+        pass
+
+
+def start_recording(pool=None):
+    """Record all the API responses, from now on.
+
+    Must be called before any API client is created.
+
+    Args:
+        pool (HttpConnectionPool): The pool making the requests. Defaults to
+            the shared pool.
+
+    Returns:
+        Recording: The recording the responses are added to.
+    """
+    pool = pool or _http_pool.HTTP_POOL
+    recording = Recording()
+    pool.http_factory = (
+        lambda timeout: RecordingHttp(httplib2.Http(timeout=timeout),
+                                      recording))
+    _discovery_cache.DISCOVERY_CACHE = RecordingDiscoveryCache(
+        _discovery_cache.DISCOVERY_CACHE, recording)
+    LOGGER.info('Recording the API responses.')
+    return recording
+
+
+def start_replay(recording, pool=None, **kwargs):
+    """Serve all the API requests from a recording, from now on.
+
+    Must be called before any API client is created.
+
+    Args:
+        recording (Recording): The responses to replay.
+        pool (HttpConnectionPool): The pool making the requests. Defaults to
+            the shared pool.
+        **kwargs (dict): Additional arguments to FakeApiServer().
+
+    Returns:
+        FakeApiServer: The server replaying the recording.
+    """
+    pool = pool or _http_pool.HTTP_POOL
+    server = FakeApiServer(recording, **kwargs)
+    pool.http_factory = lambda timeout: ReplayHttp(server)
+    _discovery_cache.DISCOVERY_CACHE = ReplayDiscoveryCache(recording)
+    LOGGER.info('Replaying %s recorded requests.',
+                len(recording.interactions))
+    return server
@@ -0,0 +1,195 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide cache of OAuth access tokens.
+
+Equivalent credentials (same account, scopes and delegated user) are shared
+by all the API clients, so that the access token is fetched once for the
+whole process instead of once per client and thread. Refreshes of a shared
+credential are serialized, and the token is refreshed in the background
+ahead of its expiry, so that workers never wait on the token endpoint or the
+metadata server.
+"""
+
+import datetime
+import threading
+import time
+
+from oauth2client import client
+
+from google.cloud.security.common.gcp_api import _http_pool
+from google.cloud.security.common.util import log_util
+
+LOGGER = log_util.get_logger(__name__)
+
+# Tokens are refreshed in the background when expiring within this time.
+REFRESH_AHEAD = datetime.timedelta(minutes=5)
+
+# How often, in seconds, the background refresher checks the tokens.
+CHECK_INTERVAL = 60.0
+
+# A token refreshed less than this many seconds ago is not refreshed again,
+# when many requests fail with the previous token at the same time.
+MIN_REFRESH_INTERVAL = 10.0
+
+
+def _get_key(credentials):
+    """Get the key identifying equivalent credentials.
+
+    Args:
+        credentials (OAuth2Credentials): The credentials.
+
+    Returns:
+        tuple: The key of the credentials.
+    """
+    scopes = getattr(credentials, 'scopes', None) or []
+    if isinstance(scopes, basestring):
+        scopes = scopes.split()
+    return (credentials.__class__.__name__,
+            getattr(credentials, '_service_account_email', None),
+            getattr(credentials, 'client_id', None),
+            getattr(credentials, 'refresh_token', None),
+            tuple(sorted(scopes)),
+            getattr(credentials, '_kwargs', {}).get('sub'))
+
+
+class _TokenEntry(object):
+    """Serializes the refreshes of a shared credentials object."""
+
+    def __init__(self, credentials):
+        """Initialize.
+
+        Takes over the _refresh method of the credentials, which is called
+        by oauth2client every time the token needs to be refreshed.
+
+        Args:
+            credentials (OAuth2Credentials): The shared credentials.
+        """
+        self.credentials = credentials
+        self.last_refresh = None
+        self._lock = threading.Lock()
+        # _refresh is the private refresh hook of OAuth2Credentials, checked
+        # against oauth2client 3.0.0; revisit when upgrading oauth2client.
+        # pylint: disable=protected-access
+        self._refresh_method = credentials._refresh
+        credentials._refresh = self.refresh
+        # pylint: enable=protected-access
+
+    def refresh(self, http_request):
+        """Refresh the access token, unless it was just refreshed.
+
+        Args:
+            http_request (function): A callable matching the signature of
+                httplib2.Http.request, used to make the refresh request.
+        """
+        with self._lock:
+            if (self.last_refresh is not None and
+                    time.time() - self.last_refresh < MIN_REFRESH_INTERVAL and
+                    not self.credentials.access_token_expired):
+                # Another thread refreshed the token while this one waited.
+                return
+            self._refresh_method(http_request)
+            self.last_refresh = time.time()
+
+    def is_expiring(self, now):
+        """Whether the token should be refreshed ahead of its expiry.
+
+        Only tokens that were already fetched through the cache are refreshed
+        ahead, so that unused credentials never make requests.
+
+        Args:
+            now (datetime): The current UTC time.
+
+        Returns:
+            bool: True if the token expires within REFRESH_AHEAD.
+        """
+        expiry = self.credentials.token_expiry
+        return (self.last_refresh is not None and expiry is not None and
+                expiry - REFRESH_AHEAD <= now)
+
+
+class TokenCache(object):
+    """Registry of the shared credentials, with a background refresher."""
+
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        """Initialize.
+
+        Args:
+            check_interval (float): How often, in seconds, the background
+                refresher checks the tokens.
+        """
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def share(self, credentials):
+        """Get the shared credentials equivalent to the given credentials.
+
+        Args:
+            credentials (object): The credentials to share.
+
+        Returns:
+            object: The first registered credentials with the same account,
+                scopes and delegated user, or credentials if they can't be
+                shared.
+        """
+        if not isinstance(credentials, client.OAuth2Credentials):
+            return credentials
+
+        key = _get_key(credentials)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _TokenEntry(credentials)
+                self._entries[key] = entry
+                self._start_refresher()
+            return entry.credentials
+
+    def _start_refresher(self):
+        """Start the background refresher thread, if not already started.
+
+        Must be called with the lock held.
+        """
+        if self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop,
+                                               name='TokenRefresher')
+            self._refresher.daemon = True
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        """Periodically refresh the expiring tokens, until the process ends."""
+        while True:
+            time.sleep(self.check_interval)
+            self.refresh_expiring()
+
+    # pylint: disable=broad-except
+    def refresh_expiring(self):
+        """Refresh the tokens expiring within REFRESH_AHEAD."""
+        now = datetime.datetime.utcnow()
+        with self._lock:
+            entries = self._entries.values()
+        for entry in entries:
+            if not entry.is_expiring(now):
+                continue
+            try:
+                entry.refresh(_http_pool.HTTP_POOL.request)
+            except Exception as e:
+                # The token is refreshed on demand if it expires.
+                LOGGER.warn('Unable to refresh access token ahead of '
+                            'expiry: %s', e)
+    # pylint: enable=broad-except
+
+
+TOKEN_CACHE = TokenCache()
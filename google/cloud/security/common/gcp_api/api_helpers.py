@@ -15,6 +15,8 @@
 """Helper functions for API clients."""
 from oauth2client import service_account
 
+from google.cloud.security.common.gcp_api import _http_pool
+from google.cloud.security.common.gcp_api import _token_cache
 from google.cloud.security.common.gcp_api import errors as api_errors
 
 
@@ -29,7 +31,8 @@ def credential_from_keyfile(keyfile_name, scopes, delegated_account):
             use.
 
     Returns:
-        OAuth2Credentials: Credentials as built by oauth2client.
+        OAuth2Credentials: Credentials as built by oauth2client, shared with
+            all the clients using the same delegated credentials.
 
     Raises:
         api_errors.ApiExecutionError: If fails to build credentials.
@@ -41,7 +44,8 @@ def credential_from_keyfile(keyfile_name, scopes, delegated_account):
     except (ValueError, KeyError, TypeError, IOError) as e:
         raise api_errors.ApiInitializationError(
             'Error building admin api credential: ', e)
-    return credentials.create_delegated(delegated_account)
+    return _token_cache.TOKEN_CACHE.share(
+        credentials.create_delegated(delegated_account))
 
 
 def flatten_list_results(paged_results, item_key):
@@ -115,3 +119,12 @@ def flatten_aggregated_list_results(paged_results, item_key):
             for item in items_for_grouping.get(item_key, []):
                 items.append(item)
     return items
+
+
+def get_http_pool_stats():
+    """Get the usage statistics of the shared http connection pool.
+
+    Returns:
+        dict: The statistics of the pool, see HttpConnectionPool.get_stats().
+    """
+    return _http_pool.HTTP_POOL.get_stats()
@@ -288,6 +288,32 @@ class CloudResourceManagerClient(object):
         except (errors.HttpError, HttpLib2Error) as e:
             raise api_errors.ApiExecutionError(resource_name, e)
 
+    def get_projects_iam_policies(self, resource_name, project_ids):
+        """Get the iam policies of many projects, using batched requests.
+
+        Args:
+            resource_name (str): The resource type.
+            project_ids (list): The project numbers or project ids.
+
+        Returns:
+            list: Tuples of (project_id, iam_policy, error) for each project,
+                in the same order as project_ids. error is the
+                ApiExecutionError of a failed project, or None.
+
+        Raises:
+            ApiExecutionError: When the whole batch failed.
+        """
+        try:
+            responses = self.repository.projects.get_iam_policies(project_ids)
+        except (errors.HttpError, HttpLib2Error) as e:
+            raise api_errors.ApiExecutionError(resource_name, e)
+        results = []
+        for project_id, (iam_policy, error) in zip(project_ids, responses):
+            if error is not None:
+                error = api_errors.ApiExecutionError(resource_name, error)
+            results.append((project_id, iam_policy, error))
+        return results
+
     def get_organization(self, org_name):
         """Get organization by org_name.
 
@@ -30,11 +30,13 @@ class ApiExecutionError(Error):
 
         Args:
             resource_name (str): The resource name.
-            e (Exception): The exception.
+            e (Exception): The exception. Only the HttpErrors have a
+                content, the transport errors don't.
         """
+        content = getattr(e, 'content', None) or ''
         super(ApiExecutionError, self).__init__(
             self.CUSTOM_ERROR_MESSAGE.format(
-                resource_name, e, e.content.decode('utf-8')))
+                resource_name, e, content.decode('utf-8')))
         self.http_error = e
 
 
@@ -161,6 +161,41 @@ class GetIamPolicyQueryMixin(object):
             verb_arguments=arguments,
         )
 
+    def get_iam_policies(self, resources, fields=None, verb='getIamPolicy',
+                         include_body=True, resource_field='resource',
+                         **kwargs):
+        """Get the IAM Policies of many resources, using batched requests.
+
+        Args:
+            self (GCPRespository): An instance of a GCPRespository class.
+            resources (list): The ids of the resources to fetch.
+            fields (str): Fields to include in the response - partial response.
+            verb (str): The method to call on the API.
+            include_body (bool): If true, include an empty body parameter in the
+                method args.
+            resource_field (str): The parameter name of the resource field to
+                pass to the method.
+            **kwargs (dict): Optional additional arguments to pass to the query.
+
+        Returns:
+            list: Tuples of (response, error) for each resource, in the same
+                order as resources. error is the HttpError raised when
+                fetching the resource, or None.
+        """
+        arguments_list = []
+        for resource in resources:
+            arguments = {resource_field: resource,
+                         'fields': fields}
+            if include_body:
+                arguments['body'] = {}
+            if kwargs:
+                arguments.update(kwargs)
+            arguments_list.append(arguments)
+        return self.execute_batch(
+            verb=verb,
+            verb_arguments_list=arguments_list,
+        )
+
 
 class SearchQueryMixin(object):
     """Mixin that implements a paged Search query."""
@@ -139,6 +139,7 @@ class IamPolicyBinding(object):
         self.members = _get_iam_members(members)
         self.role_pattern = re.compile(_escape_and_globify(role_name),
                                        flags=re.IGNORECASE)
+        self._member_matcher = None
 
     def __eq__(self, other):
         """Tests equality of IamPolicyBinding.
@@ -174,6 +175,18 @@ class IamPolicyBinding(object):
         return 'IamBinding: <role_name={}, members={}>'.format(
             self.role_name, self.members)
 
+    def get_member_matcher(self):
+        """Get the matcher of the members of this binding.
+
+        The matcher is compiled on first use.
+
+        Returns:
+            IamPolicyMemberMatcher: The matcher of the members.
+        """
+        if self._member_matcher is None:
+            self._member_matcher = IamPolicyMemberMatcher(self.members)
+        return self._member_matcher
+
     @classmethod
     def create_from(cls, binding):
         """Create an IamPolicyBinding from a binding dict.
@@ -309,3 +322,121 @@ class IamPolicyMember(object):
         return ((self.type == self.ALL_USERS) or
                 (self.type == other_member.type and
                  self.name_pattern.match(other_member.name)))
+
+
+class IamPolicyMemberMatcher(object):
+    """Matches members against a list of IamPolicyMembers.
+
+    Matching a member against each IamPolicyMember of the list is a regex
+    match per IamPolicyMember. The matcher indexes the list instead: the
+    names without glob in a hash map, the names only globbed at their start,
+    such as "*@company.com", in a map of suffixes, and only the other globs
+    are regex matched. A match is then a few hash lookups, whatever the
+    length of the list.
+    """
+
+    def __init__(self, members):
+        """Initialize.
+
+        Args:
+            members (list): The IamPolicyMembers to match against.
+        """
+        self.members = list(members)
+        self._all_users = []
+        # {(member type, lowercase name): [member index]}
+        self._names = {}
+        # {member type: {lowercase suffix: [member index]}}
+        self._suffixes = {}
+        # {member type: set of suffix lengths}
+        self._suffix_lengths = {}
+        self._globs = []
+
+        for index, member in enumerate(self.members):
+            if member.type == IamPolicyMember.ALL_USERS:
+                self._all_users.append(index)
+            elif not member.name or '*' not in member.name:
+                self._names.setdefault(
+                    (member.type, _lower(member.name)), []).append(index)
+            elif (member.name.startswith('*') and
+                  member.name.count('*') == 1):
+                suffix = member.name[1:].lower()
+                self._suffixes.setdefault(member.type, {}).setdefault(
+                    suffix, []).append(index)
+                self._suffix_lengths.setdefault(member.type, set()).add(
+                    len(suffix))
+            else:
+                self._globs.append(index)
+
+    def _iter_matches(self, member):
+        """Iterate over the members matching a member.
+
+        Args:
+            member (object): The IamPolicyMember, or member string, to
+                match.
+
+        Yields:
+            int: The index of each member matching, as
+                IamPolicyMember.matches() would.
+        """
+        if not isinstance(member, IamPolicyMember):
+            member = IamPolicyMember.create_from(member)
+        name = _lower(member.name)
+
+        for index in self._all_users:
+            yield index
+        for index in self._names.get((member.type, name), []):
+            yield index
+        if not name:
+            return
+
+        suffixes = self._suffixes.get(member.type)
+        if suffixes:
+            # The glob matches one or more characters, so the suffix must
+            # be shorter than the name.
+            for length in self._suffix_lengths[member.type]:
+                if length < len(name):
+                    for index in suffixes.get(name[len(name) - length:], []):
+                        yield index
+        for index in self._globs:
+            glob = self.members[index]
+            if (glob.type == member.type and
+                    glob.name_pattern.match(member.name)):
+                yield index
+
+    def matches(self, member):
+        """Determine if any member matches a member.
+
+        Args:
+            member (object): The IamPolicyMember, or member string, to
+                match.
+
+        Returns:
+            bool: True if a member matches the member, otherwise False.
+        """
+        for _ in self._iter_matches(member):
+            return True
+        return False
+
+    def find_matches(self, member):
+        """Find the members matching a member.
+
+        Args:
+            member (object): The IamPolicyMember, or member string, to
+                match.
+
+        Returns:
+            list: The indexes in members of the members matching the member.
+        """
+        return list(self._iter_matches(member))
+
+
+def _lower(name):
+    """Lowercase a member name, if any.
+
+    Args:
+        name (str): The member name, or None.
+
+    Returns:
+        str: The lowercase member name, or None.
+    """
+    return name.lower() if name else name
@@ -24,6 +24,7 @@ To see all the dependent flags:
 """
 from datetime import datetime
 import sys
+import threading
 
 import gflags as flags
 
@@ -48,12 +49,14 @@ from google.cloud.security.common.data_access import organization_dao
 from google.cloud.security.common.data_access import project_dao
 from google.cloud.security.common.data_access import service_account_dao
 from google.cloud.security.common.data_access.sql_queries import snapshot_cycles_sql
-from google.cloud.security.common.gcp_api import errors as api_errors
+from google.cloud.security.common.gcp_api import _replay
+from google.cloud.security.common.gcp_api import api_helpers
 from google.cloud.security.common.util import file_loader
 from google.cloud.security.common.util import log_util
 from google.cloud.security.inventory import api_map
-from google.cloud.security.inventory import errors as inventory_errors
 from google.cloud.security.inventory import pipeline_builder as builder
+from google.cloud.security.inventory import pipeline_scheduler
+from google.cloud.security.inventory import snapshot_retention
 from google.cloud.security.inventory import util as inventory_util
 from google.cloud.security.notifier import notifier
 # pylint: enable=line-too-long
@@ -64,6 +67,19 @@ FLAGS = flags.FLAGS
 flags.DEFINE_boolean('list_resources', False,
                      'List valid resources for inventory.')
 
+flags.DEFINE_string('record_api_responses', None,
+                    'Record the API responses into this fixture file, '
+                    'to replay them with --replay_api_responses.')
+flags.DEFINE_string('replay_api_responses', None,
+                    'Replay the API responses from this fixture file, '
+                    'instead of calling the APIs. For benchmarking.')
+flags.DEFINE_float('replay_latency_scale', 1.0,
+                   'Factor applied to the recorded latency of the replayed '
+                   'API responses.')
+flags.DEFINE_float('replay_error_rate', 0.0,
+                   'Fraction of the replayed API requests that fail with a '
+                   'rate limit error.')
+
 # Hack to make the test pass due to duplicate flag error here
 # and scanner, enforcer.
 # TODO: Find a way to remove this try/except, possibly dividing the tests
@@ -136,6 +152,13 @@ def _start_snapshot_cycle(inventory_dao):
         LOGGER.info('snapshot_cycles is not created yet.')
         _create_snapshot_cycles_table(inventory_dao)
 
+    if inventory_dao.dedup_raw_json:
+        try:
+            inventory_dao.create_raw_json_blobs_table()
+        except data_access_errors.MySQLError as e:
+            LOGGER.error('Unable to create raw json blobs table: %s', e)
+            sys.exit()
+
     try:
         sql = snapshot_cycles_sql.INSERT_CYCLE
         values = (cycle_timestamp, cycle_time, 'RUNNING', db_schema_version)
@@ -154,38 +177,6 @@ def _start_snapshot_cycle(inventory_dao):
     LOGGER.info('Inventory snapshot cycle started: %s', cycle_timestamp)
     return cycle_time, cycle_timestamp
 
-# pylint: disable=broad-except
-def _run_pipelines(pipelines):
-    """Run the pipelines to load data.
-
-    Args:
-        pipelines (list): List of pipelines to be run.
-
-    Returns:
-        list: a list of booleans whether each pipeline completed
-            successfully or not.
-    """
-    # TODO: Define these status codes programmatically.
-    run_statuses = []
-    for pipeline in pipelines:
-        try:
-            LOGGER.info('Running pipeline %s', pipeline.__class__.__name__)
-            pipeline.run()
-            pipeline.status = 'SUCCESS'
-            LOGGER.info('Finished running %s', pipeline.__class__.__name__)
-
-        except (api_errors.ApiInitializationError,
-                inventory_errors.LoadDataPipelineError) as e:
-            LOGGER.error('Encountered API error loading data.\n%s', e,
-                         exc_info=True)
-            pipeline.status = 'FAILURE'
-        except Exception as e:
-            LOGGER.error('Encountered error loading data.\n%s', e,
-                         exc_info=True)
-            pipeline.status = 'FAILURE'
-        run_statuses.append(pipeline.status == 'SUCCESS')
-    return run_statuses
-
 def _complete_snapshot_cycle(inventory_dao, cycle_timestamp, status):
     """Complete the snapshot cycle.
 
@@ -208,48 +199,152 @@ def _complete_snapshot_cycle(inventory_dao, cycle_timestamp, status):
     LOGGER.info('Inventory load cycle completed with %s: %s',
                 status, cycle_timestamp)
 
+def _start_api_replay(inventory_flags):
+    """Start recording or replaying the API responses, if requested.
+
+    Args:
+        inventory_flags (dict): The flags of the inventory.
+
+    Returns:
+        tuple: The Recording being recorded, and the FakeApiServer
+            replaying a recording, each None when not started.
+    """
+    if inventory_flags.get('replay_api_responses'):
+        return None, _replay.start_replay(
+            _replay.Recording.load(inventory_flags.get('replay_api_responses')),
+            latency_scale=inventory_flags.get('replay_latency_scale'),
+            error_rate=inventory_flags.get('replay_error_rate'))
+    if inventory_flags.get('record_api_responses'):
+        return _replay.start_recording(), None
+    return None, None
+
+def _stop_api_replay(inventory_flags, api_replay):
+    """Save the recorded API responses, or log the replay stats.
+
+    Args:
+        inventory_flags (dict): The flags of the inventory.
+        api_replay (tuple): The recording and the replay server, as
+            returned by _start_api_replay().
+    """
+    recording, replay_server = api_replay
+    if recording is not None:
+        recording.save(inventory_flags.get('record_api_responses'))
+    if replay_server is not None:
+        LOGGER.info('API replay stats: %s', replay_server.get_stats())
+
+def _apply_snapshot_retention(inventory_dao, retention_configs):
+    """Compress, archive and drop the old snapshots, if enabled.
+
+    Args:
+        inventory_dao (dao.Dao): Data access object.
+        retention_configs (dict): Retention configurations, if any.
+    """
+    if not retention_configs or not retention_configs.get('enabled'):
+        return
+    snapshot_retention.SnapshotRetentionManager(
+        inventory_dao,
+        retention_configs.get('keep_cycles',
+                              snapshot_retention.DEFAULT_KEEP_CYCLES),
+        retention_configs.get('compress_cycles',
+                              snapshot_retention.DEFAULT_COMPRESS_CYCLES),
+        retention_configs.get('archive_dir')).apply()
+
+# The DAO class of each name in the DAO map.
+DAO_CLASSES = {
+    'appengine_dao': appengine_dao.AppEngineDao,
+    'backend_service_dao': backend_service_dao.BackendServiceDao,
+    'bucket_dao': bucket_dao.BucketDao,
+    'cloudsql_dao': cloudsql_dao.CloudsqlDao,
+    'dao': dao.Dao,
+    'firewall_rule_dao': firewall_rule_dao.FirewallRuleDao,
+    'folder_dao': folder_dao.FolderDao,
+    'forwarding_rules_dao': forwarding_rules_dao.ForwardingRulesDao,
+    'instance_dao': instance_dao.InstanceDao,
+    'instance_group_dao': instance_group_dao.InstanceGroupDao,
+    'instance_group_manager_dao':
+        instance_group_manager_dao.InstanceGroupManagerDao,
+    'instance_template_dao': instance_template_dao.InstanceTemplateDao,
+    'organization_dao': organization_dao.OrganizationDao,
+    'project_dao': project_dao.ProjectDao,
+    'service_account_dao': service_account_dao.ServiceAccountDao,
+}
+
+
+class LazyDaoMap(object):
+    """Map of DAOs, each created on first use."""
+
+    def __init__(self, dao_classes, global_configs):
+        """Initialize.
+
+        Args:
+            dao_classes (dict): The DAO class of each name.
+            global_configs (dict): Global configurations.
+        """
+        self.dao_classes = dao_classes
+        self.global_configs = global_configs
+        self._daos = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, default=None):
+        """Get a DAO, creating it if needed.
+
+        Args:
+            name (str): The name of the DAO.
+            default (object): Returned if there is no such DAO.
+
+        Returns:
+            Dao: The DAO, shared by all the callers.
+        """
+        dao_class = self.dao_classes.get(name)
+        if dao_class is None:
+            return default
+        with self._lock:
+            if name not in self._daos:
+                self._daos[name] = dao_class(self.global_configs)
+            return self._daos[name]
+
+    def __getitem__(self, name):
+        """Get a DAO, creating it if needed.
+
+        Args:
+            name (str): The name of the DAO.
+
+        Returns:
+            Dao: The DAO, shared by all the callers.
+
+        Raises:
+            KeyError: If there is no such DAO.
+        """
+        if name not in self.dao_classes:
+            raise KeyError(name)
+        return self.get(name)
+
+    def __contains__(self, name):
+        """Whether there is a DAO with this name.
+
+        Args:
+            name (str): The name of the DAO.
+
+        Returns:
+            bool: True if the DAO exists.
+        """
+        return name in self.dao_classes
+
+
 def _create_dao_map(global_configs):
     """Create a map of DAOs.
 
-    These will be reusable so that the db connection can apply across
-    different pipelines.
+    The DAOs are only created when first used, and all share the same
+    database connection pool, so that the connections are reused across
+    the pipelines.
 
     Args:
         global_configs (dict): Global configurations.
 
     Returns:
-        dict: Dictionary of DAOs.
+        LazyDaoMap: Map of DAOs.
     """
-    try:
-        return {
-            'appengine_dao': appengine_dao.AppEngineDao(global_configs),
-            'backend_service_dao':
-                backend_service_dao.BackendServiceDao(global_configs),
-            'bucket_dao': bucket_dao.BucketDao(global_configs),
-            'cloudsql_dao': cloudsql_dao.CloudsqlDao(global_configs),
-            'dao': dao.Dao(global_configs),
-            'firewall_rule_dao':
-                firewall_rule_dao.FirewallRuleDao(global_configs),
-            'folder_dao': folder_dao.FolderDao(global_configs),
-            'forwarding_rules_dao':
-                forwarding_rules_dao.ForwardingRulesDao(global_configs),
-            'instance_dao': instance_dao.InstanceDao(global_configs),
-            'instance_group_dao':
-                instance_group_dao.InstanceGroupDao(global_configs),
-            'instance_group_manager_dao':
-                instance_group_manager_dao.InstanceGroupManagerDao(
-                    global_configs),
-            'instance_template_dao':
-                instance_template_dao.InstanceTemplateDao(global_configs),
-            'organization_dao': organization_dao.OrganizationDao(
-                global_configs),
-            'project_dao': project_dao.ProjectDao(global_configs),
-            'service_account_dao':
-                service_account_dao.ServiceAccountDao(global_configs),
-        }
-    except data_access_errors.MySQLError as e:
-        LOGGER.error('Error to creating DAO map.\n%s', e)
-        sys.exit()
+    return LazyDaoMap(DAO_CLASSES, global_configs)
 
 def main(_):
     """Runs the Inventory Loader.
@@ -280,6 +375,8 @@ def main(_):
 
     log_util.set_logger_level_from_config(inventory_configs.get('loglevel'))
 
+    api_replay = _start_api_replay(inventory_flags)
+
     dao_map = _create_dao_map(global_configs)
 
     cycle_time, cycle_timestamp = _start_snapshot_cycle(dao_map.get('dao'))
@@ -292,7 +389,14 @@ def main(_):
         dao_map)
     pipelines = pipeline_builder.build()
 
-    run_statuses = _run_pipelines(pipelines)
+    run_statuses = pipeline_scheduler.PipelineScheduler(
+        pipelines,
+        pipeline_builder.dependency_map,
+        inventory_configs.get('max_concurrent_pipelines',
+                              pipeline_scheduler.DEFAULT_MAX_WORKERS)).run()
+    LOGGER.info('HTTP connection pool stats: %s',
+                api_helpers.get_http_pool_stats())
+    _stop_api_replay(inventory_flags, api_replay)
 
     if all(run_statuses):
         snapshot_cycle_status = 'SUCCESS'
@@ -304,6 +408,12 @@ def main(_):
     _complete_snapshot_cycle(dao_map.get('dao'), cycle_timestamp,
                              snapshot_cycle_status)
 
+    _apply_snapshot_retention(dao_map.get('dao'),
+                              inventory_configs.get('retention'))
+
+    dao.report_query_stats('inventory',
+                           global_configs.get('db_query_stats_dir'))
+
     if global_configs.get('email_recipient') is not None:
         payload = {
             'email_sender': global_configs.get('email_sender'),
@@ -19,6 +19,7 @@ import sys
 
 import anytree
 
+from google.cloud.security.common.data_access import errors as dao_errors
 from google.cloud.security.common.gcp_api import errors as api_errors
 from google.cloud.security.common.util import log_util
 from google.cloud.security.inventory import pipeline_requirements_map
@@ -49,6 +50,7 @@ class PipelineBuilder(object):
         self.api_map = api_map
         self.dao_map = dao_map
         self.initialized_api_map = {}
+        self.dependency_map = {}
 
     def _get_api(self, api_name):
         """Get the api instance for the pipeline.
@@ -121,6 +123,10 @@ class PipelineBuilder(object):
             list: List of the pipelines that will be run. The
                 order in the list represents the order they need to be run.
                 i.e. going top-down in the dependency tree.
+
+                The nearest runnable ancestor of each pipeline is recorded
+                in self.dependency_map, so that the pipelines can also be
+                scheduled as a dependency graph.
         """
         # If child pipeline is true, then all parents will become true.
         # Even if the parent(s) is(are) false.
@@ -144,6 +150,7 @@ class PipelineBuilder(object):
         # The order matters: must go top-down in the tree, by PreOrder.
         # http://anytree.readthedocs.io/en/latest/apidoc/anytree.iterators.html
         runnable_pipelines = []
+        pipelines_by_resource = {}
         for node in anytree.iterators.PreOrderIter(root):
             if node.enabled:
                 module_path = 'google.cloud.security.inventory.pipelines.{}'
@@ -193,9 +200,64 @@ class PipelineBuilder(object):
                 pipeline = pipeline_class(
                     self.cycle_timestamp, self.global_configs, api, dao)
                 runnable_pipelines.append(pipeline)
+                pipelines_by_resource[node.resource_name] = pipeline
+                self.dependency_map[pipeline] = self._find_parent_pipeline(
+                    node, pipelines_by_resource)
 
+        self._set_previous_cycle_timestamp(runnable_pipelines)
         return runnable_pipelines
 
+    def _set_previous_cycle_timestamp(self, pipelines):
+        """Set the snapshot the pipelines copy unchanged resources from.
+
+        Args:
+            pipelines (list): The pipelines that will be run.
+        """
+        previous_cycle_timestamp = self._get_previous_cycle_timestamp()
+        for pipeline in pipelines:
+            pipeline.previous_cycle_timestamp = previous_cycle_timestamp
+
+    def _get_previous_cycle_timestamp(self):
+        """Get the snapshot to copy unchanged resources from.
+
+        Returns:
+            str: The timestamp of the last successful snapshot, or None if
+                the inventory is not incremental or there is no such
+                snapshot.
+        """
+        if not self.inventory_configs.get('incremental'):
+            return None
+
+        dao = self.dao_map.get('dao')
+        if dao is None:
+            return None
+        try:
+            return dao.get_latest_snapshot_timestamp(('SUCCESS',))
+        except dao_errors.MySQLError:
+            LOGGER.warn('No previous successful snapshot, running a full '
+                        'inventory.')
+            return None
+
+    @staticmethod
+    def _find_parent_pipeline(node, pipelines_by_resource):
+        """Find the pipeline that must complete before this node's pipeline.
+
+        Args:
+            node (PipelineNode): The node of the pipeline.
+            pipelines_by_resource (dict): The pipelines built so far,
+                mapped to their resource names.
+
+        Returns:
+            BasePipeline: The pipeline of the nearest ancestor node that
+                could be built, or None if there is no such ancestor.
+        """
+        parent = node.parent
+        while parent is not None:
+            if parent.resource_name in pipelines_by_resource:
+                return pipelines_by_resource[parent.resource_name]
+            parent = parent.parent
+        return None
+
     def _build_dependency_tree(self):
         """Build the dependency tree with all the pipeline nodes.
 
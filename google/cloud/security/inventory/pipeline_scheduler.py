@@ -0,0 +1,149 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs the inventory pipelines concurrently, as a dependency graph."""
+
+import concurrent.futures
+
+from google.cloud.security.common.gcp_api import errors as api_errors
+from google.cloud.security.common.util import log_util
+from google.cloud.security.inventory import errors as inventory_errors
+
+
+LOGGER = log_util.get_logger(__name__)
+
+DEFAULT_MAX_WORKERS = 1
+
+SUCCESS = 'SUCCESS'
+FAILURE = 'FAILURE'
+
+
+class PipelineScheduler(object):
+    """Schedules each pipeline as soon as its dependency has succeeded."""
+
+    def __init__(self, pipelines, dependency_map,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        """Initialize.
+
+        Args:
+            pipelines (list): The pipelines to run, ordered top-down in the
+                dependency tree.
+            dependency_map (dict): The pipeline that each pipeline depends
+                on, or None if the pipeline has no dependency.
+            max_workers (int): The maximum number of pipelines to run at
+                the same time.
+        """
+        self.pipelines = pipelines
+        self.dependency_map = dependency_map
+        self.max_workers = max(1, max_workers or DEFAULT_MAX_WORKERS)
+
+    # pylint: disable=broad-except
+    @staticmethod
+    def _run_pipeline(pipeline):
+        """Run a single pipeline and record its status.
+
+        Args:
+            pipeline (BasePipeline): The pipeline to run.
+        """
+        try:
+            LOGGER.info('Running pipeline %s', pipeline.__class__.__name__)
+            pipeline.run()
+            # Indexed before the dependent pipelines read the tables.
+            pipeline.add_snapshot_indexes()
+            pipeline.status = SUCCESS
+            LOGGER.info('Finished running %s', pipeline.__class__.__name__)
+
+        except (api_errors.ApiInitializationError,
+                inventory_errors.LoadDataPipelineError) as e:
+            LOGGER.error('Encountered API error loading data.\n%s', e,
+                         exc_info=True)
+            pipeline.status = FAILURE
+        except Exception as e:
+            LOGGER.error('Encountered error loading data.\n%s', e,
+                         exc_info=True)
+            pipeline.status = FAILURE
+    # pylint: enable=broad-except
+
+    def _find_ready_pipelines(self, pending, finished, running):
+        """Find the pending pipelines that can be started now.
+
+        Pipelines whose dependency has failed are marked as failed and
+        removed from pending, without being run.
+
+        Args:
+            pending (list): The pipelines that have not been started.
+            finished (set): The pipelines that have completed.
+            running (dict): The futures of the running pipelines, mapped to
+                their pipeline.
+
+        Returns:
+            list: The pipelines that are ready to run.
+        """
+        ready = []
+        for pipeline in list(pending):
+            if len(running) + len(ready) >= self.max_workers:
+                break
+
+            parent = self.dependency_map.get(pipeline)
+            if parent is not None and parent not in finished:
+                continue
+
+            if parent is not None and parent.status != SUCCESS:
+                LOGGER.error('Skipping %s, because %s did not succeed.',
+                             pipeline.__class__.__name__,
+                             parent.__class__.__name__)
+                pipeline.status = FAILURE
+                pending.remove(pipeline)
+                finished.add(pipeline)
+                continue
+
+            pending.remove(pipeline)
+            ready.append(pipeline)
+        return ready
+
+    def run(self):
+        """Run all the pipelines.
+
+        Returns:
+            list: A list of booleans whether each pipeline completed
+                successfully or not, in the same order as the pipelines.
+        """
+        pending = list(self.pipelines)
+        finished = set()
+        running = {}
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers) as executor:
+            while pending or running:
+                ready = self._find_ready_pipelines(pending, finished, running)
+                for pipeline in ready:
+                    future = executor.submit(self._run_pipeline, pipeline)
+                    running[future] = pipeline
+
+                if not running:
+                    # Only happens when a dependency is not one of the
+                    # pipelines to run, so it will never complete.
+                    for pipeline in pending:
+                        LOGGER.error('Unable to schedule %s, its dependency '
+                                     'is not runnable.',
+                                     pipeline.__class__.__name__)
+                        pipeline.status = FAILURE
+                    break
+
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    finished.add(running.pop(future))
+
+        return [pipeline.status == SUCCESS for pipeline in self.pipelines]
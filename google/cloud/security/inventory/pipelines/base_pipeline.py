@@ -15,6 +15,9 @@
 """Base pipeline to load data into inventory."""
 
 import abc
+import collections
+
+import concurrent.futures
 
 from google.cloud.security.common.data_access import errors as dao_errors
 from google.cloud.security.common.gcp_api import errors as api_errors
@@ -33,6 +36,15 @@ class BasePipeline(object):
 
     MYSQL_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+    # Number of concurrent workers used by _fan_out(). Pipelines can
+    # override this to suit the latency and quota of their API.
+    FAN_OUT_WORKERS = 10
+
+    # Maximum size of a single load done by _load_in_batches(). A batch is
+    # loaded as soon as it reaches either limit.
+    LOAD_BATCH_MAX_ROWS = 50000
+    LOAD_BATCH_MAX_BYTES = 64 * 1024 * 1024
+
     def __init__(self, cycle_timestamp, global_configs, api_client, dao):
         """Constructor for the base pipeline.
 
@@ -47,6 +59,13 @@ class BasePipeline(object):
         self.api_client = api_client
         self.dao = dao
         self.count = None
+        # Timestamp of the last successful snapshot, set by the pipeline
+        # builder when the inventory is incremental. Pipelines that support
+        # it copy their unchanged resources from that snapshot.
+        self.previous_cycle_timestamp = None
+        # Names of the resources loaded into the snapshot by this pipeline,
+        # whose tables are indexed once the pipeline has run.
+        self.loaded_resources = set()
 
     @abc.abstractmethod
     def run(self):
@@ -92,6 +111,99 @@ class BasePipeline(object):
                 'Error calling API, may have incomplete results: %s.', e)
             return None
 
+    def _iter_fan_out(self, fetch_func, items, errors=None):
+        """Call fetch_func for each item, concurrently, yielding the results.
+
+        The calls are spread over a pool of FAN_OUT_WORKERS threads, with
+        only a few calls per worker in flight, so memory use does not grow
+        with the number of items. API calls still go through the API client,
+        so they share its rate limiter.
+
+        ApiNotEnabledError and ApiExecutionError are logged and collected
+        per item, any other error is raised.
+
+        Args:
+            fetch_func (function): Called with a single item, e.g. a project,
+                and returns the resources fetched for it.
+            items (iterable): The items to fetch the resources for.
+            errors (dict): Optional dict to collect the API error raised for
+                each item that could not be fetched, keyed by item.
+
+        Yields:
+            tuple: (item, resources) for the items that were fetched, in the
+                same order as items.
+        """
+        if errors is None:
+            errors = {}
+        workers = max(1, self.FAN_OUT_WORKERS)
+        item_count = 0
+        error_count = len(errors)
+        in_flight = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers) as executor:
+            for item in items:
+                item_count += 1
+                in_flight.append((item, executor.submit(fetch_func, item)))
+                if len(in_flight) >= workers * 2:
+                    item, future = in_flight.popleft()
+                    if self._collect_fan_out_result(item, future, errors):
+                        yield item, future.result()
+            while in_flight:
+                item, future = in_flight.popleft()
+                if self._collect_fan_out_result(item, future, errors):
+                    yield item, future.result()
+
+        if len(errors) > error_count:
+            LOGGER.warn('Unable to retrieve %s for %s of %s items.',
+                        self.RESOURCE_NAME, len(errors) - error_count,
+                        item_count)
+
+    @staticmethod
+    def _collect_fan_out_result(item, future, errors):
+        """Wait for a fan out call, and collect its API error if any.
+
+        Args:
+            item (object): The item the call was made for.
+            future (Future): The future of the call.
+            errors (dict): The API errors collected so far, keyed by item.
+
+        Returns:
+            bool: True if the call succeeded, False if it raised an API error.
+        """
+        try:
+            future.result()
+        except api_errors.ApiNotEnabledError as e:
+            LOGGER.warn('Api not enabled on target project: %s.', e)
+            errors[item] = e
+            return False
+        except api_errors.ApiExecutionError as e:
+            LOGGER.error(
+                'Error calling API, may have incomplete results: %s.', e)
+            errors[item] = e
+            return False
+        return True
+
+    def _fan_out(self, fetch_func, items):
+        """Call fetch_func for each item, concurrently.
+
+        See _iter_fan_out().
+
+        Args:
+            fetch_func (function): Called with a single item, e.g. a project,
+                and returns the resources fetched for it.
+            items (iterable): The items to fetch the resources for.
+
+        Returns:
+            tuple: (results, errors)
+                results (list): Tuples of (item, resources) for the items
+                    that were fetched, in the same order as items.
+                errors (dict): The API error raised for each item that could
+                    not be fetched, keyed by item.
+        """
+        errors = {}
+        results = list(self._iter_fan_out(fetch_func, items, errors))
+        return results, errors
+
     @staticmethod
     def _to_bool(value):
         """Transforms a value into a database boolean (or None).
@@ -149,6 +261,123 @@ class BasePipeline(object):
         except (dao_errors.CSVFileError,
                 dao_errors.MySQLError) as e:
             raise inventory_errors.LoadDataPipelineError(e)
+        self.loaded_resources.add(resource_name)
+
+    @staticmethod
+    def _estimate_size(row):
+        """Estimate the size of a row to be loaded, in bytes.
+
+        Args:
+            row (dict): The row.
+
+        Returns:
+            int: The approximate size of the row.
+        """
+        size = 0
+        for value in row.itervalues():
+            if isinstance(value, basestring):
+                size += len(value)
+            elif value is not None:
+                size += len(repr(value))
+        return size
+
+    def _batch(self, data):
+        """Group rows into batches bounded by rows and bytes.
+
+        Args:
+            data (iterable): The rows, as dicts.
+
+        Yields:
+            list: A batch of rows.
+        """
+        batch = []
+        batch_size = 0
+        for row in data:
+            batch.append(row)
+            batch_size += self._estimate_size(row)
+            if (len(batch) >= self.LOAD_BATCH_MAX_ROWS or
+                    batch_size >= self.LOAD_BATCH_MAX_BYTES):
+                yield batch
+                batch = []
+                batch_size = 0
+        if batch:
+            yield batch
+
+    def _load_in_batches(self, resource_name, data):
+        """Stream data into Forseti storage, one bounded batch at a time.
+
+        Only one batch is held in memory at a time, so data should be a
+        generator for the memory use to stay flat.
+
+        Args:
+            resource_name (str): Resource name.
+            data (iterable): Data to be uploaded.
+
+        Returns:
+            int: The number of rows loaded.
+
+        Raises:
+            LoadDataPipelineError: An error with loading data has occurred.
+        """
+        row_count = 0
+        for batch in self._batch(data):
+            self._load(resource_name, batch)
+            row_count += len(batch)
+            LOGGER.debug('Loaded %s %s rows so far.', row_count,
+                         resource_name)
+
+        if not row_count:
+            LOGGER.warn('No %s data to load into Cloud SQL, continuing...',
+                        resource_name)
+        return row_count
+
+    def _copy_from_previous_snapshot(self, resource_name, key_column, keys):
+        """Copy the rows of unchanged resources from the previous snapshot.
+
+        The rows are copied server-side, without being transformed or
+        loaded again.
+
+        Args:
+            resource_name (str): Resource name.
+            key_column (str): The column identifying the resources.
+            keys (list): The keys of the unchanged resources.
+
+        Returns:
+            int: The number of rows copied.
+
+        Raises:
+            LoadDataPipelineError: An error with copying data has occurred.
+        """
+        if not keys or not self.previous_cycle_timestamp:
+            return 0
+        try:
+            copied = self.dao.copy_snapshot_rows(
+                resource_name, self.previous_cycle_timestamp,
+                self.cycle_timestamp, key_column, keys)
+        except dao_errors.MySQLError as e:
+            raise inventory_errors.LoadDataPipelineError(e)
+        self.loaded_resources.add(resource_name)
+        LOGGER.info('Copied %s unchanged %s rows from snapshot %s.',
+                    copied, resource_name, self.previous_cycle_timestamp)
+        return copied
+
+    def add_snapshot_indexes(self):
+        """Add the secondary indexes of the tables loaded by the pipeline.
+
+        The indexes only speed up the reads of the snapshot, so the snapshot
+        is still usable when they can't be added.
+        """
+        for resource_name in sorted(self.loaded_resources):
+            try:
+                added = self.dao.add_snapshot_indexes(
+                    resource_name, self.cycle_timestamp)
+            except dao_errors.MySQLError as e:
+                LOGGER.warn('Unable to index %s_%s:\n%s', resource_name,
+                            self.cycle_timestamp, e)
+                continue
+            if added:
+                LOGGER.debug('Added %s indexes to %s_%s.', added,
+                             resource_name, self.cycle_timestamp)
 
     def _get_loaded_count(self):
         """Get the count of how many of a resource has been loaded."""
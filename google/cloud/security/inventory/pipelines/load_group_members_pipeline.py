@@ -17,7 +17,6 @@
 import json
 
 from google.cloud.security.common.data_access import errors as dao_errors
-from google.cloud.security.common.gcp_api import errors as api_errors
 from google.cloud.security.common.util import log_util
 from google.cloud.security.inventory import errors as inventory_errors
 from google.cloud.security.inventory.pipelines import base_pipeline
@@ -29,7 +28,30 @@ class LoadGroupMembersPipeline(base_pipeline.BasePipeline):
     """Pipeline to load group members data into Inventory."""
 
     RESOURCE_NAME = 'group_members'
-    GROUP_CHUNK_SIZE = 20
+
+    # The members of this many groups are retrieved concurrently. The calls
+    # are paced by the Admin API quota, shared by all the workers, so the
+    # workers only need to hide the latency of the calls.
+    FAN_OUT_WORKERS = 20
+
+    # Number of times the groups that could not be retrieved are retried,
+    # once all the other groups have been crawled.
+    MAX_RETRY_PASSES = 1
+
+    def __init__(self, cycle_timestamp, global_configs, api_client, dao):
+        """Constructor for the pipeline.
+
+        Args:
+            cycle_timestamp (str): Timestamp, formatted as YYYYMMDDTHHMMSSZ.
+            global_configs (dict): Global configurations.
+            api_client (API): Forseti API client object.
+            dao (dao): Forseti data access object.
+        """
+        super(LoadGroupMembersPipeline, self).__init__(
+            cycle_timestamp, global_configs, api_client, dao)
+        # The ids of the groups whose members could not be retrieved by the
+        # last crawl.
+        self.failed_group_ids = []
 
     def _fetch_groups_from_dao(self):
         """Fetch the latest group ids previously stored in Cloud SQL.
@@ -70,63 +92,83 @@ class LoadGroupMembersPipeline(base_pipeline.BasePipeline):
                        'member_email': member.get('email'),
                        'raw_member': json.dumps(member)}
 
-    def _retrieve(self, group_ids):  # pylint: disable=arguments-differ
+    # pylint: disable=arguments-differ
+    def _retrieve(self, group_ids, errors=None):
         """Retrieve the membership for a list of given GSuite groups.
 
+        The members of the groups are retrieved concurrently, and lazily as
+        the returned iterator is consumed.
+
         Args:
             group_ids (list): Group ids.
+            errors (dict): Optional dict to collect the API error raised for
+                each group that could not be retrieved, keyed by group id.
 
-        Returns:
-            list: (group_id, group_members) from the Admin SDK, e.g.
+        Yields:
+            tuple: (group_id, group_members) from the Admin SDK, e.g.
                 (string, [])
         """
-
-        group_members_map = []
-
-        for group_id in group_ids:
-            try:
-                group_members = self.api_client.get_group_members(group_id)
-            except api_errors.ApiExecutionError as e:
-                raise inventory_errors.LoadDataPipelineError(e)
-
-            group_members_map.append((group_id, group_members))
+        results = self._iter_fan_out(
+            self.api_client.get_group_members, group_ids, errors)
+        for group_id, group_members in results:
             LOGGER.debug('Retrieved members from %s: %d',
                          group_id,
                          len(group_members))
+            yield group_id, group_members
+    # pylint: enable=arguments-differ
+
+    def _crawl(self, group_ids):
+        """Retrieve and load the members of groups.
+
+        The members are loaded in large batches as they are retrieved,
+        independently of the groups they belong to.
 
-        return group_members_map
+        Args:
+            group_ids (list): Group ids.
+
+        Returns:
+            int: The number of members loaded.
+        """
+        errors = {}
+        loaded_count = self._load_in_batches(
+            self.RESOURCE_NAME,
+            self._transform(self._retrieve(group_ids, errors)))
+        self.failed_group_ids = sorted(errors)
+        return loaded_count
+
+    def retry_failed_groups(self):
+        """Retrieve and load the members of the groups that failed.
+
+        Returns:
+            int: The number of members loaded.
+        """
+        if not self.failed_group_ids:
+            return 0
+        LOGGER.info('Retrying the members of %s groups.',
+                    len(self.failed_group_ids))
+        return self._crawl(self.failed_group_ids)
 
     def run(self):
-        """Runs the load GSuite account groups pipeline."""
+        """Runs the load GSuite account groups pipeline.
+
+        Raises:
+            LoadDataPipelineError: When the members of some groups could not
+                be retrieved, even after retrying them. The members of the
+                other groups are loaded.
+        """
 
         group_ids = self._fetch_groups_from_dao()
+        self._crawl(group_ids)
+
+        for _ in xrange(self.MAX_RETRY_PASSES):
+            if not self.failed_group_ids:
+                break
+            self.retry_failed_groups()
+
+        self._get_loaded_count()
 
-        # TODO: Move this to g/c/s/c/gcp_api/common so it can be reused
-        # by other pipelines.
-        def chunker(seq, size):
-            """Helper to chunk a list.
-
-            Args:
-                seq (list): A list.
-                size (int): Integer of the desired chunk size.
-
-            Returns:
-                tuple: A tuple of the chunked seq.
-            """
-            return (seq[pos:pos + size] for pos in xrange(0, len(seq), size))
-
-        # TODO: keep track of group_ids that are not retrieved/committed to db
-        chunk_counter = 0
-        for group_ids_in_chunk in chunker(group_ids, self.GROUP_CHUNK_SIZE):
-            LOGGER.debug('Retrieving a batch of group members in %s chunks.\n'
-                         'Current chunk count is: %s',
-                         self.GROUP_CHUNK_SIZE, chunk_counter)
-            groups_members_map = self._retrieve(group_ids_in_chunk)
-
-            if isinstance(groups_members_map, list):
-                loadable_group_members = self._transform(groups_members_map)
-                self._load(self.RESOURCE_NAME, loadable_group_members)
-                self._get_loaded_count()
-            else:
-                LOGGER.warn('No group members retrieved.')
-            chunk_counter += 1
+        if self.failed_group_ids:
+            raise inventory_errors.LoadDataPipelineError(
+                'Unable to retrieve the members of {} of {} groups: {}'.format(
+                    len(self.failed_group_ids), len(group_ids),
+                    ', '.join(self.failed_group_ids)))
@@ -34,13 +34,13 @@ class LoadInstancesPipeline(base_pipeline.BasePipeline):
         """Create an iterator of instances to load into database.
 
         Args:
-            resource_from_api (dict): A dict of instances, keyed by
-                project id, from GCP API.
+            resource_from_api (iterable): Tuples of (project_id, instances)
+                from GCP API.
 
         Yields:
             dict: Instance properties.
         """
-        for (project_id, instances) in resource_from_api.iteritems():
+        for (project_id, instances) in resource_from_api:
             for instance in instances:
                 yield {'project_id': project_id,
                        'id': instance.get('id'),
@@ -75,24 +75,26 @@ class LoadInstancesPipeline(base_pipeline.BasePipeline):
         Get all the projects in the current snapshot and retrieve the
         compute instances for each.
 
+        The instances are fetched lazily, as the returned iterator is
+        consumed.
+
         Returns:
-            dict: A map of projects with their instances (list):
-            {project_id: [instances]}
+            iterator: Tuples of (project_id, instances) for each project
+                with instances.
         """
         projects = (proj_dao
                     .ProjectDao(self.global_configs)
                     .get_projects(self.cycle_timestamp))
-        instances = {}
-        for project in projects:
-            project_instances = self.safe_api_call('get_instances',
-                                                   project.id)
-            if project_instances:
-                instances[project.id] = project_instances
-        return instances
+        results = self._iter_fan_out(
+            lambda project: self.api_client.get_instances(project.id),
+            projects)
+        return ((project.id, project_instances)
+                for project, project_instances in results
+                if project_instances)
 
     def run(self):
         """Run the pipeline."""
         instances = self._retrieve()
         loadable_instances = self._transform(instances)
-        self._load(self.RESOURCE_NAME, loadable_instances)
+        self._load_in_batches(self.RESOURCE_NAME, loadable_instances)
         self._get_loaded_count()
@@ -39,6 +39,9 @@ class LoadProjectsCloudsqlPipeline(base_pipeline.BasePipeline):
 
     MYSQL_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+    # The Cloud SQL Admin API has a low default quota.
+    FAN_OUT_WORKERS = 5
+
     @staticmethod
     def _transform_data(cloudsql_instances_map):
         """Yield an iterator of loadable instances.
@@ -287,9 +290,13 @@ class LoadProjectsCloudsqlPipeline(base_pipeline.BasePipeline):
         except dao_errors.MySQLError as e:
             raise inventory_errors.LoadDataPipelineError(e)
 
+        results, errors = self._fan_out(self.api_client.get_instances,
+                                        project_numbers)
+        if errors:
+            LOGGER.warn('Cloud SQL instances missing for projects: %s',
+                        ', '.join(sorted(str(number) for number in errors)))
         instances_maps = []
-        for project_number in project_numbers:
-            instances = self.safe_api_call('get_instances', project_number)
+        for project_number, instances in results:
             if instances:
                 instances_map = {'project_number': project_number,
                                  'instances': instances}
@@ -17,6 +17,7 @@
 import json
 
 from google.cloud.security.common.data_access import errors as dao_errors
+from google.cloud.security.common.gcp_api import _base_repository
 from google.cloud.security.common.util import log_util
 from google.cloud.security.common.util import parser
 from google.cloud.security.inventory import errors as inventory_errors
@@ -62,11 +63,38 @@ class LoadProjectsIamPoliciesPipeline(base_pipeline.BasePipeline):
                             'member_name': member_name,
                             'member_domain': member_domain}
 
+    def _retrieve_batches(self, batches):
+        """Retrieve the IAM policies of batches of projects.
+
+        Args:
+            batches (list): Tuples of project numbers, each fetched with a
+                single batched request.
+
+        Yields:
+            dict: IAM policies as per-project dictionary.
+        """
+        results = self._iter_fan_out(
+            lambda batch: self.api_client.get_projects_iam_policies(
+                self.RESOURCE_NAME, batch),
+            batches)
+        for _, batch_results in results:
+            for project_number, iam_policy, error in batch_results:
+                if error is not None:
+                    LOGGER.error('Unable to get the iam policy of project '
+                                 '%s: %s', project_number, error)
+                    continue
+                if iam_policy:
+                    yield {'project_number': project_number,
+                           'iam_policy': iam_policy}
+
     def _retrieve(self):
         """Retrieve the project IAM policies from GCP.
 
+        The policies are fetched lazily in batched requests, as the
+        returned iterator is consumed.
+
         Returns:
-            list: IAM policies as per-org dictionary.
+            iterator: IAM policies as per-org dictionary.
                 Example: [{project_number: project_number,
                           iam_policy: iam_policy}]
                 https://cloud.google.com/resource-manager/reference/rest/Shared.Types/Policy
@@ -81,32 +109,65 @@ class LoadProjectsIamPoliciesPipeline(base_pipeline.BasePipeline):
         except dao_errors.MySQLError as e:
             raise inventory_errors.LoadDataPipelineError(e)
 
-        # Retrieve data from GCP.
-        # Not using iterator since we will use the iam_policy_maps twice.
-        iam_policy_maps = []
-        for project_number in project_numbers:
-            iam_policy = self.safe_api_call('get_project_iam_policies',
-                                            self.RESOURCE_NAME,
-                                            project_number)
-            if iam_policy:
-                iam_policy_map = {'project_number': project_number,
-                                  'iam_policy': iam_policy}
-                iam_policy_maps.append(iam_policy_map)
-        return iam_policy_maps
+        # Retrieve data from GCP, many projects per batched request.
+        batch_size = _base_repository.MAX_BATCH_SIZE
+        return self._retrieve_batches(
+            [tuple(project_numbers[i:i + batch_size])
+             for i in xrange(0, len(project_numbers), batch_size)])
 
-    def run(self):
-        """Runs the load IAM policies data pipeline."""
-        iam_policy_maps = self._retrieve()
+    def _get_previous_etags(self):
+        """Get the etags of the policies in the previous snapshot.
 
-        loadable_iam_policies = self._transform(iam_policy_maps)
+        Returns:
+            dict: The etag of each project iam policy, by project number.
+                Empty if the inventory is not incremental.
+        """
+        if not self.previous_cycle_timestamp:
+            return {}
+        try:
+            return self.dao.get_project_iam_policy_etags(
+                self.RAW_RESOURCE_NAME, self.previous_cycle_timestamp)
+        except dao_errors.MySQLError as e:
+            LOGGER.warn('Unable to get the previous project iam policies, '
+                        'loading all of them: %s', e)
+            return {}
 
-        self._load(self.RESOURCE_NAME, loadable_iam_policies)
+    def run(self):
+        """Runs the load IAM policies data pipeline.
+
+        The policies are loaded in bounded batches, so that only one batch
+        of policies is held in memory at a time.
 
-        # A separate table is used to store the raw iam policies json
-        # because it is much faster than updating these individually
-        # into the projects table.
-        for i in iam_policy_maps:
-            i['iam_policy'] = json.dumps(i['iam_policy'])
-        self._load(self.RAW_RESOURCE_NAME, iam_policy_maps)
+        When the inventory is incremental, the policies whose etag did not
+        change since the previous snapshot are copied from it, instead of
+        being transformed and loaded again.
+        """
+        previous_etags = self._get_previous_etags()
+        unchanged_project_numbers = []
+        for iam_policy_maps in self._batch(self._retrieve()):
+            changed_iam_policy_maps = []
+            for i in iam_policy_maps:
+                etag = i['iam_policy'].get('etag')
+                if etag and previous_etags.get(i['project_number']) == etag:
+                    unchanged_project_numbers.append(i['project_number'])
+                else:
+                    changed_iam_policy_maps.append(i)
+            if not changed_iam_policy_maps:
+                continue
+
+            loadable_iam_policies = self._transform(changed_iam_policy_maps)
+
+            self._load(self.RESOURCE_NAME, loadable_iam_policies)
+
+            # A separate table is used to store the raw iam policies json
+            # because it is much faster than updating these individually
+            # into the projects table.
+            for i in changed_iam_policy_maps:
+                i['iam_policy'] = json.dumps(i['iam_policy'])
+            self._load(self.RAW_RESOURCE_NAME, changed_iam_policy_maps)
+
+        for resource_name in (self.RESOURCE_NAME, self.RAW_RESOURCE_NAME):
+            self._copy_from_previous_snapshot(
+                resource_name, 'project_number', unchanged_project_numbers)
 
         self._get_loaded_count()
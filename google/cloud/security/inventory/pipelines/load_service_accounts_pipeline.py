@@ -39,21 +39,36 @@ class LoadServiceAccountsPipeline(base_pipeline.BasePipeline):
             proj_dao
             .ProjectDao(self.global_configs)
             .get_projects(self.cycle_timestamp))
+        results, errors = self._fan_out(self._retrieve_project_accounts,
+                                        projects)
+        if errors:
+            LOGGER.warn('Service accounts missing for projects: %s',
+                        ', '.join(sorted(project.id for project in errors)))
         service_accounts_per_project = {}
-        for project in projects:
-            service_accounts = self.safe_api_call('get_service_accounts',
-                                                  project.id)
+        for project, service_accounts in results:
             if service_accounts:
-                for service_account in service_accounts:
-                    # TODO: also retrieve associated IAM policies, see:
-                    # https://cloud.google.com/iam/reference/rest/v1/projects.serviceAccounts
-                    keys = self.safe_api_call(
-                        'get_service_account_keys', service_account['name'])
-                    if keys:
-                        service_account['keys'] = keys
                 service_accounts_per_project[project.id] = service_accounts
         return service_accounts_per_project
 
+    def _retrieve_project_accounts(self, project):
+        """Retrieve the Service Accounts, and their keys, of a project.
+
+        Args:
+            project (Project): The project to retrieve the accounts for.
+
+        Returns:
+            list: The Service Accounts of the project.
+        """
+        service_accounts = self.api_client.get_service_accounts(project.id)
+        for service_account in service_accounts or []:
+            # TODO: also retrieve associated IAM policies, see:
+            # https://cloud.google.com/iam/reference/rest/v1/projects.serviceAccounts
+            keys = self.safe_api_call(
+                'get_service_account_keys', service_account['name'])
+            if keys:
+                service_account['keys'] = keys
+        return service_accounts
+
     def _transform(self, resource_from_api):
         """Create an iterator of Service Accounts to load into database.
 
@@ -0,0 +1,282 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Retention of the inventory snapshot tables.
+
+Driven by the snapshot_cycles table, newest cycle first:
+    * The tables of the last keep_cycles successful cycles, and of any
+      unsuccessful cycle in between, are kept as they are.
+    * The tables of the next compress_cycles successful cycles, and of any
+      unsuccessful cycle in between, are converted to ROW_FORMAT=COMPRESSED.
+    * The tables of all the older cycles are dropped, after being exported
+      to gzipped json lines files when an archive directory is configured.
+
+The tables of a RUNNING cycle are never touched, whatever its age. Only the
+inventory snapshot tables are managed: the other tables sharing the cycle
+timestamp, e.g. violations_<timestamp>, are left as they are, see
+UNMANAGED_RESOURCES.
+
+With the partitioned snapshot layout, the snapshot tables are views: the
+partition of a dropped cycle is dropped with its view, and the cycles to
+compress are left as they are, as the partitions share the row format of
+their table.
+"""
+
+import gzip
+import json
+import os
+
+from google.cloud.security.common.data_access import dao
+from google.cloud.security.common.data_access import errors as db_errors
+# pylint: disable=line-too-long
+from google.cloud.security.common.data_access.sql_queries import snapshot_cycles_sql
+# pylint: enable=line-too-long
+from google.cloud.security.common.util import log_util
+
+LOGGER = log_util.get_logger(__name__)
+
+DEFAULT_KEEP_CYCLES = 5
+DEFAULT_COMPRESS_CYCLES = 0
+
+KEEP = 'KEEP'
+COMPRESS = 'COMPRESS'
+DROP = 'DROP'
+
+# Resources whose tables share the cycle timestamp of the inventory, but are
+# not inventory snapshots, and are never compressed or dropped.
+UNMANAGED_RESOURCES = frozenset(['violations'])
+
+
+def plan_retention(cycles, keep_cycles, compress_cycles):
+    """Decide what to do with the tables of each snapshot cycle.
+
+    Args:
+        cycles (list): The (cycle_timestamp, status) of the cycles, newest
+            first.
+        keep_cycles (int): Number of successful cycles to keep as they are.
+        compress_cycles (int): Number of successful cycles to compress,
+            after the kept ones.
+
+    Returns:
+        list: The (cycle_timestamp, action) of the cycles, where action is
+            KEEP, COMPRESS or DROP.
+    """
+    plan = []
+    successful = 0
+    for cycle_timestamp, status in cycles:
+        if status == 'RUNNING':
+            action = KEEP
+        elif successful < keep_cycles:
+            action = KEEP
+        elif successful < keep_cycles + compress_cycles:
+            action = COMPRESS
+        else:
+            action = DROP
+        if status == 'SUCCESS':
+            successful += 1
+        plan.append((cycle_timestamp, action))
+    return plan
+
+
+class SnapshotRetentionManager(object):
+    """Compresses and drops the tables of the old snapshot cycles."""
+
+    def __init__(self, inventory_dao, keep_cycles=DEFAULT_KEEP_CYCLES,
+                 compress_cycles=DEFAULT_COMPRESS_CYCLES, archive_dir=None):
+        """Initialize.
+
+        Args:
+            inventory_dao (dao.Dao): Data access object.
+            keep_cycles (int): Number of successful cycles to keep as they
+                are. At least the latest successful cycle is always kept.
+            compress_cycles (int): Number of successful cycles to compress,
+                after the kept ones.
+            archive_dir (str): Directory to export the tables to before they
+                are dropped, or None to drop them without exporting.
+        """
+        self.dao = inventory_dao
+        self.keep_cycles = max(1, keep_cycles)
+        self.compress_cycles = max(0, compress_cycles)
+        self.archive_dir = archive_dir
+
+    def apply(self):
+        """Apply the retention to all the snapshot cycles.
+
+        Errors are logged, and the tables that failed are left as they are
+        until the next run.
+
+        Returns:
+            dict: The number of tables compressed, archived and dropped.
+        """
+        stats = {'compressed': 0, 'archived': 0, 'dropped': 0}
+        try:
+            rows = self.dao.execute_sql_with_fetch(
+                snapshot_cycles_sql.RESOURCE_NAME,
+                snapshot_cycles_sql.SELECT_CYCLES, None)
+        except db_errors.MySQLError as e:
+            LOGGER.error('Unable to read the snapshot cycles: %s', e)
+            return stats
+
+        cycles = [(row['cycle_timestamp'], row['status']) for row in rows]
+        for cycle_timestamp, action in plan_retention(
+                cycles, self.keep_cycles, self.compress_cycles):
+            if action == KEEP:
+                continue
+            for table_name, is_view, row_format in self._get_tables(
+                    cycle_timestamp):
+                if action == COMPRESS:
+                    if not is_view and (
+                            (row_format or '').lower() != 'compressed'):
+                        stats['compressed'] += self._compress(table_name)
+                else:
+                    if self.archive_dir:
+                        archived = self._archive(table_name)
+                        if not archived:
+                            continue
+                        stats['archived'] += 1
+                    if is_view:
+                        stats['dropped'] += self._drop_partition(
+                            table_name, cycle_timestamp)
+                    else:
+                        stats['dropped'] += self._drop(table_name)
+
+        LOGGER.info('Snapshot retention: %s', stats)
+        return stats
+
+    def _get_tables(self, cycle_timestamp):
+        """Get the tables of a snapshot cycle.
+
+        Args:
+            cycle_timestamp (str): Timestamp, formatted as YYYYMMDDTHHMMSSZ.
+
+        Returns:
+            list: The (table name, whether the table is a view, row format)
+                of the inventory tables of the cycle. The tables of the
+                other resources with the same timestamp suffix, e.g. the
+                violations, are not included.
+        """
+        try:
+            rows = self.dao.execute_sql_with_fetch(
+                snapshot_cycles_sql.RESOURCE_NAME,
+                snapshot_cycles_sql.SELECT_CYCLE_TABLES,
+                ('%\\_' + cycle_timestamp,))
+        except db_errors.MySQLError as e:
+            LOGGER.error('Unable to list the tables of snapshot %s: %s',
+                         cycle_timestamp, e)
+            return []
+        tables = []
+        for row in rows:
+            resource_name = row['TABLE_NAME'][:-len(cycle_timestamp) - 1]
+            if (resource_name in dao.CREATE_TABLE_MAP and
+                    resource_name not in UNMANAGED_RESOURCES):
+                tables.append((row['TABLE_NAME'], row['TABLE_TYPE'] == 'VIEW',
+                               row['ROW_FORMAT']))
+        return tables
+
+    def _compress(self, table_name):
+        """Convert a table to the compressed row format.
+
+        Args:
+            table_name (str): The table to compress.
+
+        Returns:
+            int: 1 if the table was compressed, 0 otherwise.
+        """
+        try:
+            self.dao.execute_sql_with_commit(
+                table_name,
+                snapshot_cycles_sql.COMPRESS_TABLE.format(table_name), None)
+        except db_errors.MySQLError as e:
+            LOGGER.warn('Unable to compress %s: %s', table_name, e)
+            return 0
+        return 1
+
+    def _archive(self, table_name):
+        """Export the rows of a table to a gzipped json lines file.
+
+        The file is written under a temporary name and renamed once
+        complete, so that a partial export is never mistaken for a complete
+        one.
+
+        Args:
+            table_name (str): The table to export.
+
+        Returns:
+            bool: True if the table was exported.
+        """
+        path = os.path.join(self.archive_dir, table_name + '.json.gz')
+        tmp_path = path + '.tmp'
+        try:
+            if not os.path.isdir(self.archive_dir):
+                os.makedirs(self.archive_dir)
+            archive_file = gzip.open(tmp_path, 'wb')
+            try:
+                for row in self.dao.iter_sql_with_fetch(
+                        table_name,
+                        snapshot_cycles_sql.SELECT_TABLE_ROWS.format(
+                            table_name), None):
+                    archive_file.write(json.dumps(row, default=str) + '\n')
+            finally:
+                archive_file.close()
+            os.rename(tmp_path, path)
+        except (IOError, OSError, db_errors.MySQLError) as e:
+            LOGGER.warn('Unable to archive %s, not dropping it: %s',
+                        table_name, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    def _drop(self, table_name):
+        """Drop a table.
+
+        Args:
+            table_name (str): The table to drop.
+
+        Returns:
+            int: 1 if the table was dropped, 0 otherwise.
+        """
+        try:
+            self.dao.execute_sql_with_commit(
+                table_name,
+                snapshot_cycles_sql.DROP_TABLE.format(table_name), None)
+        except db_errors.MySQLError as e:
+            LOGGER.warn('Unable to drop %s: %s', table_name, e)
+            return 0
+        return 1
+
+    def _drop_partition(self, view_name, cycle_timestamp):
+        """Drop a snapshot view, and the partition it selects.
+
+        Args:
+            view_name (str): The snapshot view to drop.
+            cycle_timestamp (str): Timestamp, formatted as YYYYMMDDTHHMMSSZ.
+
+        Returns:
+            int: 1 if the partition was dropped, 0 otherwise.
+        """
+        resource_name = view_name[:-len('_' + cycle_timestamp)]
+        try:
+            self.dao.execute_sql_with_commit(
+                view_name,
+                snapshot_cycles_sql.DROP_VIEW.format(view_name), None)
+            self.dao.execute_sql_with_commit(
+                view_name,
+                snapshot_cycles_sql.DROP_PARTITION.format(
+                    dao.get_partitioned_table_name(resource_name),
+                    dao.get_partition_name(cycle_timestamp)), None)
+        except db_errors.MySQLError as e:
+            LOGGER.warn('Unable to drop %s: %s', view_name, e)
+            return 0
+        return 1
@@ -183,7 +183,7 @@ def main(_):
     violations = {}
     try:
         violations = violation_dao.map_by_resource(
-            v_dao.get_all_violations(timestamp))
+            v_dao.iter_all_violations(timestamp))
     except db_errors.MySQLError, e:
         # even if an error is raised we still want to continue execution
         # this is because if we don't have violations the Mysql table
@@ -221,6 +221,8 @@ def main(_):
     for pipeline in pipelines:
         pipeline.run()
 
+    dao.report_query_stats('notifier', global_configs.get('db_query_stats_dir'))
+
 
 if __name__ == '__main__':
     app.run()
@@ -36,48 +36,44 @@ from google.cloud.security.scanner.audit import errors as audit_errors
 LOGGER = log_util.get_logger(__name__)
 
 
-def _check_whitelist_members(rule_members=None, policy_members=None):
+def _check_whitelist_members(rule_matcher=None, policy_members=None):
     """Whitelist: Check that policy members ARE in rule members.
 
     If a policy member is NOT found in the rule members, add it to
     the violating members.
 
     Args:
-        rule_members (list): IamPolicyMembers allowed in the rule.
+        rule_matcher (IamPolicyMemberMatcher): The matcher of the
+            IamPolicyMembers allowed in the rule.
         policy_members (list): IamPolicyMembers in the policy.
 
     Return:
         list: Policy members NOT found in the whitelist (rule members).
     """
-    violating_members = []
-    for policy_member in policy_members:
-        # check if policy_member is found in rule_members
-        if not any(r.matches(policy_member) for r in rule_members):
-            violating_members.append(policy_member)
-    return violating_members
+    return [policy_member for policy_member in policy_members
+            if not rule_matcher.matches(policy_member)]
 
-def _check_blacklist_members(rule_members=None, policy_members=None):
+def _check_blacklist_members(rule_matcher=None, policy_members=None):
     """Blacklist: Check that policy members ARE NOT in rule members.
 
     If a policy member is found in the rule members, add it to the
-    violating members.
+    violating members, once per rule member it matches.
 
     Args:
-        rule_members (list): IamPolicyMembers allowed in the rule.
+        rule_matcher (IamPolicyMemberMatcher): The matcher of the
+            IamPolicyMembers in the rule.
         policy_members (list): IamPolicyMembers in the policy.
 
     Return:
         list: Policy members found in the blacklist (rule members).
     """
-    violating_members = [
-        policy_member
-        for policy_member in policy_members
-        for rule_member in rule_members
-        if rule_member.matches(policy_member)
-    ]
+    violating_members = []
+    for policy_member in policy_members:
+        violating_members.extend(
+            [policy_member] * len(rule_matcher.find_matches(policy_member)))
     return violating_members
 
-def _check_required_members(rule_members=None, policy_members=None):
+def _check_required_members(rule_matcher=None, policy_members=None):
     """Required: Check that rule members are in policy members.
 
     If a required rule member is NOT found in the policy members, add
@@ -86,18 +82,19 @@ def _check_required_members(rule_members=None, policy_members=None):
     rules vs rules as subset of policy).
 
     Args:
-        rule_members (list): IamPolicyMembers allowed in the rule.
+        rule_matcher (IamPolicyMemberMatcher): The matcher of the
+            IamPolicyMembers required by the rule.
         policy_members (list): IamPolicyMembers in the policy.
 
     Return:
         list: Rule members not found in the policy (required-whitelist).
     """
-    violating_members = []
-    for rule_member in rule_members:
-        # check if rule_member is found in policy_members
-        if not any(rule_member.matches(m) for m in policy_members):
-            violating_members.append(rule_member)
-    return violating_members
+    found_indexes = set()
+    for policy_member in policy_members:
+        found_indexes.update(rule_matcher.find_matches(policy_member))
+    return [rule_member
+            for index, rule_member in enumerate(rule_matcher.members)
+            if index not in found_indexes]
 
 
 class IamRulesEngine(bre.BaseRulesEngine):
@@ -215,7 +212,7 @@ class IamRuleBook(bre.BaseRuleBook):
         if snapshot_timestamp:
             self.snapshot_timestamp = snapshot_timestamp
         self.org_res_rel_dao = org_resource_rel_dao.OrgResourceRelDao(
-            global_configs)
+            global_configs, use_index=True)
 
     def __eq__(self, other):
         """Equals.
@@ -594,7 +591,7 @@ class ResourceRules(object):
                     found_role = True
                     violating_members = (self._dispatch_rule_mode_check(
                         mode=rule.mode,
-                        rule_members=rule_binding.members,
+                        rule_matcher=rule_binding.get_member_matcher(),
                         policy_members=policy_binding.members))
                 if violating_members:
                     violating_bindings[
@@ -637,7 +634,7 @@ class ResourceRules(object):
                 if rule_binding.role_pattern.match(policy_binding.role_name):
                     violating_members = (self._dispatch_rule_mode_check(
                         mode=rule.mode,
-                        rule_members=rule_binding.members,
+                        rule_matcher=rule_binding.get_member_matcher(),
                         policy_members=policy_binding.members))
                 if violating_members:
                     yield scanner_rules.RuleViolation(
@@ -649,18 +646,19 @@ class ResourceRules(object):
                         role=policy_binding.role_name,
                         members=tuple(violating_members))
 
-    def _dispatch_rule_mode_check(self, mode, rule_members=None,
+    def _dispatch_rule_mode_check(self, mode, rule_matcher=None,
                                   policy_members=None):
         """Determine which rule mode method to execute for rule audit.
 
         Args:
             mode (str): The rule mode.
-            rule_members (list): The rule binding members.
+            rule_matcher (IamPolicyMemberMatcher): The matcher of the rule
+                binding members.
             policy_members (list): The policy binding members.
 
         Returns:
             list: The result of calling the dispatched method.
         """
         return self._rule_mode_methods[mode](
-            rule_members=rule_members,
+            rule_matcher=rule_matcher,
             policy_members=policy_members)
@@ -76,6 +76,15 @@ class IapRulesEngine(bre.BaseRulesEngine):
         return self.rule_book.find_violations(iap_resource)
     # pylint: enable=arguments-differ
 
+    def prefetch_projects(self, project_ids):
+        """Fetch the projects of the resources to check in a batch.
+
+        Args:
+            project_ids (iterable): The ids of the projects.
+        """
+        if self.rule_book is not None:
+            self.rule_book.prefetch_projects(project_ids)
+
     def add_rules(self, rules):
         """Add rules to the rule book.
 
@@ -107,8 +116,9 @@ class IapRuleBook(bre.BaseRuleBook):
             self.add_rules(rule_defs)
         self.snapshot_timestamp = snapshot_timestamp
         self.org_res_rel_dao = org_resource_rel_dao.OrgResourceRelDao(
-            global_configs)
+            global_configs, use_index=True)
         self.project_dao = project_dao.ProjectDao(global_configs)
+        self.projects = {}
 
     def add_rules(self, rule_defs):
         """Add rules to the rule book.
@@ -211,6 +221,20 @@ class IapRuleBook(bre.BaseRuleBook):
 
         return resource_rules
 
+    def prefetch_projects(self, project_ids):
+        """Fetch the projects of the resources to check in a batch.
+
+        The projects not prefetched are fetched one at a time when their
+        resources are checked.
+
+        Args:
+            project_ids (iterable): The ids of the projects.
+        """
+        project_ids = set(project_ids) - set(self.projects)
+        if project_ids:
+            self.projects.update(self.project_dao.get_projects_by_ids(
+                project_ids, self.snapshot_timestamp))
+
     def find_violations(self, iap_resource):
         """Find violations in the rule book.
 
@@ -225,8 +249,10 @@ class IapRuleBook(bre.BaseRuleBook):
         resource = iap_resource.backend_service
         resource_ancestors = [resource]
 
-        project = self.project_dao.get_project(resource.project_id,
-                                               self.snapshot_timestamp)
+        project = self.projects.get(resource.project_id)
+        if project is None:
+            project = self.project_dao.get_project(resource.project_id,
+                                                   self.snapshot_timestamp)
         resource_ancestors.append(project)
         resource_ancestors.extend(
             self.org_res_rel_dao.find_ancestors(
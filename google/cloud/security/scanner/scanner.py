@@ -113,6 +113,8 @@ def main(_):
                          scanner.__class__.__name__, exc_info=True)
     # pylint: enable=bare-except
 
+    LOGGER.info('Query cache: %s', dao.get_query_cache_stats())
+    dao.report_query_stats('scanner', global_configs.get('db_query_stats_dir'))
     LOGGER.info('Scan complete!')
 
 
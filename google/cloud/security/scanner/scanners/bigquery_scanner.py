@@ -128,15 +128,15 @@ class BigqueryScanner(base_scanner.BaseScanner):
     def _get_bigquery_acls(self):
         """Get Big Query acls from data source.
 
+        The acls are streamed from the database while they are scanned.
+
         Returns:
-            list: List of Big Query acls.
+            iterator: The Big Query acls, numbered.
         """
-        bq_acls = {}
-        bq_acls = (bigquery_dao
-                   .BigqueryDao(self.global_configs)
-                   .get_bigquery_acls('bigquery_datasets',
-                                      self.snapshot_timestamp))
-        return bq_acls
+        return enumerate(bigquery_dao
+                         .BigqueryDao(self.global_configs)
+                         .iter_bigquery_acls('bigquery_datasets',
+                                             self.snapshot_timestamp))
 
     def _retrieve(self):
         """Retrieves the data for scanner.
@@ -147,7 +147,7 @@ class BigqueryScanner(base_scanner.BaseScanner):
         bigquery_acls_data = []
         project_policies = {}
         bigquery_acls = self._get_bigquery_acls()
-        bigquery_acls_data.append(bigquery_acls.iteritems())
+        bigquery_acls_data.append(bigquery_acls)
         bigquery_acls_data.append(project_policies.iteritems())
 
         return bigquery_acls_data
@@ -124,15 +124,15 @@ class BucketsAclScanner(base_scanner.BaseScanner):
     def _get_bucket_acls(self):
         """Get bucket acls from data source.
 
+        The acls are streamed from the database while they are scanned.
+
         Returns:
-            list: List of bucket acls.
+            iterator: The bucket acls, numbered.
         """
-        buckets_acls = {}
-        buckets_acls = (bucket_dao
-                        .BucketDao(self.global_configs)
-                        .get_buckets_acls('buckets_acl',
-                                          self.snapshot_timestamp))
-        return buckets_acls
+        return enumerate(bucket_dao
+                         .BucketDao(self.global_configs)
+                         .iter_buckets_acls('buckets_acl',
+                                            self.snapshot_timestamp))
 
     def _retrieve(self):
         """Runs the data collection.
@@ -143,7 +143,7 @@ class BucketsAclScanner(base_scanner.BaseScanner):
         buckets_acls_data = []
         project_policies = {}
         buckets_acls = self._get_bucket_acls()
-        buckets_acls_data.append(buckets_acls.iteritems())
+        buckets_acls_data.append(buckets_acls)
         buckets_acls_data.append(project_policies.iteritems())
 
         return buckets_acls_data
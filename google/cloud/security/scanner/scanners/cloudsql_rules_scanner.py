@@ -125,16 +125,15 @@ class CloudSqlAclScanner(base_scanner.BaseScanner):
     def _get_cloudsql_acls(self):
         """Get CloudSQL acls from data source.
 
+        The acls are streamed from the database while they are scanned.
+
         Returns:
-            list: List of CloudSql acls.
+            iterator: The CloudSql acls, numbered.
         """
-        cloudsql_acls = {}
-        cloudsql_acls = (cloudsql_dao
+        return enumerate(cloudsql_dao
                          .CloudsqlDao(self.global_configs)
-                         .get_cloudsql_acls('cloudsql_instances',
-                                            self.snapshot_timestamp))
-
-        return cloudsql_acls
+                         .iter_cloudsql_acls('cloudsql_instances',
+                                             self.snapshot_timestamp))
 
     def _retrieve(self):
         """Retrieves the data for scanner.
@@ -145,7 +144,7 @@ class CloudSqlAclScanner(base_scanner.BaseScanner):
         cloudsql_acls_data = []
         project_policies = {}
         cloudsql_acls = self._get_cloudsql_acls()
-        cloudsql_acls_data.append(cloudsql_acls.iteritems())
+        cloudsql_acls_data.append(cloudsql_acls)
         cloudsql_acls_data.append(project_policies.iteritems())
 
         return cloudsql_acls_data
@@ -14,8 +14,6 @@
 
 """Scanner for Google Groups."""
 
-from Queue import Queue
-
 import anytree
 import yaml
 
@@ -212,35 +210,45 @@ class GroupsScanner(base_scanner.BaseScanner):
 
         return starting_node
 
-    def _get_recursive_members(self, starting_node, timestamp):
-        """Get all the recursive members of a group.
+    def _get_recursive_members(self, starting_nodes, timestamp):
+        """Get all the recursive members of groups.
+
+        The groups are visited a level at a time, so that the members of all
+        the groups of a level are fetched together, and the members of each
+        group are only fetched once.
 
         Args:
-            starting_node (node): Member node from which to start getting
+            starting_nodes (list): Member nodes from which to start getting
                 the recursive members.
             timestamp (str): Snapshot timestamp, formatted as YYYYMMDDTHHMMSSZ.
 
         Returns:
-            node: Member node with all its recursive members.
+            list: Member nodes with all their recursive members.
         """
-        queue = Queue()
-        queue.put(starting_node)
-
-        while not queue.empty():
-            queued_node = queue.get()
-            members = self.dao.get_group_members('group_members',
-                                                 queued_node.member_id,
-                                                 timestamp)
-            for member in members:
-                member_node = MemberNode(member.get('member_id'),
-                                         member.get('member_email'),
-                                         member.get('member_type'),
-                                         member.get('member_status'),
-                                         queued_node)
-                if member_node.member_type == 'GROUP':
-                    queue.put(member_node)
-
-        return starting_node
+        members_by_group = {}
+        queued_nodes = list(starting_nodes)
+
+        while queued_nodes:
+            unfetched_group_ids = set(
+                node.member_id for node in queued_nodes
+                if node.member_id not in members_by_group)
+            if unfetched_group_ids:
+                members_by_group.update(
+                    self.dao.get_group_members_for_groups(
+                        'group_members', unfetched_group_ids, timestamp))
+            nested_group_nodes = []
+            for queued_node in queued_nodes:
+                for member in members_by_group.get(queued_node.member_id, []):
+                    member_node = MemberNode(member.get('member_id'),
+                                             member.get('member_email'),
+                                             member.get('member_type'),
+                                             member.get('member_status'),
+                                             queued_node)
+                    if member_node.member_type == 'GROUP':
+                        nested_group_nodes.append(member_node)
+            queued_nodes = nested_group_nodes
+
+        return starting_nodes
 
     def _build_group_tree(self, timestamp):
         """Build a tree of all the groups in the organization.
@@ -254,13 +262,13 @@ class GroupsScanner(base_scanner.BaseScanner):
         root = MemberNode(MY_CUSTOMER, MY_CUSTOMER)
 
         all_groups = self.dao.get_all_groups('groups', timestamp)
-        for group in all_groups:
-            group_node = MemberNode(group.get('group_id'),
-                                    group.get('group_email'),
-                                    'group',
-                                    'ACTIVE',
-                                    root)
-            group_node = self._get_recursive_members(group_node, timestamp)
+        group_nodes = [MemberNode(group.get('group_id'),
+                                  group.get('group_email'),
+                                  'group',
+                                  'ACTIVE',
+                                  root)
+                       for group in all_groups]
+        self._get_recursive_members(group_nodes, timestamp)
 
         LOGGER.debug(anytree.RenderTree(
             root, style=anytree.AsciiStyle()).by_attr('member_email'))
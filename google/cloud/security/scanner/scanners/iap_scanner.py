@@ -562,6 +562,9 @@ class IapScanner(base_scanner.BaseScanner):
         """
         LOGGER.info('Finding IAP violations with %r...',
                     self.rules_engine)
+        self.rules_engine.prefetch_projects(
+            iap_resource.backend_service.project_id
+            for iap_resource in iap_resources)
         ret = []
         for iap_resource in iap_resources:
             ret.extend(self.rules_engine.find_violations(iap_resource))
@@ -42,7 +42,6 @@ INSTALL_REQUIRES = [
     'netaddr>=0.7.19',
     'protobuf>=3.2.0',
     'PyYAML==3.12',
-    'ratelimiter==1.1.0',
     'retrying==1.3.3',
     'requests[security]==2.18.4',
     'sendgrid==3.6.3',
@@ -77,6 +77,23 @@ class BucketDaoTest(ForsetiTestCase):
         self.fetch_mock.assert_called_once_with(
             self.resource_name, fake_query_acls, None)
 
+    def test_iter_buckets_acls(self):
+        """Test iter_buckets_acls() streams the bucket acls."""
+        self.bucket_dao.iter_sql_with_fetch = mock.MagicMock(
+            return_value=iter([{'bucket': 'bucket-1', 'entity': 'allUsers',
+                                'email': None, 'domain': None,
+                                'role': 'READER', 'project_number': 11111}]))
+
+        bucket_acls = list(self.bucket_dao.iter_buckets_acls(
+            self.resource_name, self.fake_timestamp))
+
+        self.bucket_dao.iter_sql_with_fetch.assert_called_once_with(
+            self.resource_name,
+            select_data.BUCKET_ACLS.format(self.fake_timestamp), None)
+        self.assertEqual(1, len(bucket_acls))
+        self.assertEqual('bucket-1', bucket_acls[0].bucket)
+        self.assertEqual('allUsers', bucket_acls[0].entity)
+
     def test_get_raw_buckets(self):
         """Test get_raw_buckets()."""
         fake_return = [{'bucket_id': 'bucketid', 'acl': {"foo": 1}}]
@@ -14,11 +14,16 @@
 
 """Tests the CSV Writer."""
 
+import os
+
 from tests.unittest_utils import ForsetiTestCase
 import mock
 import unittest
 
 from google.cloud.security.common.data_access import csv_writer
+from google.cloud.security.common.data_access import errors
+
+FAKE_FIELDNAME_MAP = {'foo': ['id', 'name']}
 
 
 class CsvWriterTest(ForsetiTestCase):
@@ -47,5 +52,73 @@ class CsvWriterTest(ForsetiTestCase):
         self.assertEquals(csv_filename, called_args[0])
 
 
+    @mock.patch.object(csv_writer, 'CSV_FIELDNAME_MAP', FAKE_FIELDNAME_MAP)
+    def test_stream_csv_through_named_pipe(self):
+        """Test the rows are written while the pipe is read."""
+        rows = ({'id': i, 'name': 'n%s' % i} for i in range(3))
+
+        with csv_writer.stream_csv('foo', rows) as csv_pipe:
+            self.assertIsInstance(csv_pipe, csv_writer.CsvPipe)
+            with open(csv_pipe.name) as pipe:
+                content = pipe.read()
+            csv_pipe.wait()
+
+        self.assertEquals('0,n0\r\n1,n1\r\n2,n2\r\n', content)
+        self.assertFalse(os.path.exists(os.path.dirname(csv_pipe.name)))
+
+    @mock.patch.object(csv_writer, 'CSV_FIELDNAME_MAP', FAKE_FIELDNAME_MAP)
+    def test_stream_csv_write_error(self):
+        """Test a failed write is reported once the pipe is read."""
+        def rows():
+            yield {'id': 1, 'name': 'n1'}
+            raise IOError('broken')
+
+        with csv_writer.stream_csv('foo', rows()) as csv_pipe:
+            with open(csv_pipe.name) as pipe:
+                pipe.read()
+            with self.assertRaises(errors.CSVFileError):
+                csv_pipe.wait()
+
+    @mock.patch.object(csv_writer, 'CSV_FIELDNAME_MAP', FAKE_FIELDNAME_MAP)
+    def test_stream_csv_data_error(self):
+        """Test a failure of the rows is raised once the pipe is read."""
+        def rows():
+            yield {'id': 1, 'name': 'n1'}
+            raise ValueError('bad row')
+
+        with csv_writer.stream_csv('foo', rows()) as csv_pipe:
+            with open(csv_pipe.name) as pipe:
+                content = pipe.read()
+            with self.assertRaises(ValueError):
+                csv_pipe.wait()
+
+        self.assertEquals('1,n1\r\n', content)
+
+    @mock.patch.object(csv_writer, 'CSV_FIELDNAME_MAP', FAKE_FIELDNAME_MAP)
+    def test_stream_csv_not_read(self):
+        """Test the writer is stopped when the pipe is never read."""
+        rows = ({'id': i, 'name': 'n%s' % i} for i in range(3))
+
+        with csv_writer.stream_csv('foo', rows) as csv_pipe:
+            pass
+
+        self.assertFalse(os.path.exists(csv_pipe.name))
+
+    @mock.patch.object(csv_writer, 'CSV_FIELDNAME_MAP', FAKE_FIELDNAME_MAP)
+    @mock.patch.object(csv_writer.os, 'mkfifo', side_effect=OSError())
+    def test_stream_csv_falls_back_to_file(self, mock_mkfifo):
+        """Test a csv file is written when named pipes are unsupported."""
+        rows = [{'id': 1, 'name': 'n1'}]
+
+        with csv_writer.stream_csv('foo', rows) as csv_file:
+            self.assertIsInstance(csv_file, csv_writer.CsvFile)
+            with open(csv_file.name) as f:
+                content = f.read()
+            csv_file.wait()
+
+        self.assertEquals('1,n1\r\n', content)
+        self.assertFalse(os.path.exists(csv_file.name))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -23,6 +23,12 @@ import unittest
 from google.cloud.security.common.data_access import _db_connector
 from google.cloud.security.common.data_access import errors
 from google.cloud.security.common.data_access import dao
+from google.cloud.security.common.data_access import query_cache
+from google.cloud.security.common.data_access import query_stats
+from google.cloud.security.common.data_access import raw_json_blobs
+from google.cloud.security.common.data_access.sql_queries import create_tables
+from google.cloud.security.common.data_access.sql_queries import load_data
+from google.cloud.security.common.data_access.sql_queries import raw_json_blobs_sql
 from google.cloud.security.common.data_access.sql_queries import select_data
 
 
@@ -170,6 +176,456 @@ class DaoTest(ForsetiTestCase):
         with self.assertRaises(errors.MySQLError):
             self.dao.get_latest_snapshot_timestamp('asdfasdf')
 
+    @mock.patch.object(dao.csv_writer, 'stream_csv')
+    def test_load_data(self, mock_stream_csv):
+        """Test load_data.
+
+        Expect:
+            * The rows are loaded from the stream, and committed once all
+              of them were written.
+        """
+        csv_file = mock_stream_csv.return_value.__enter__.return_value
+        csv_file.name = '/tmp/pipe/projects.csv'
+        conn_mock = mock.MagicMock()
+        self.dao.conn = conn_mock
+        calls = mock.MagicMock()
+        calls.attach_mock(csv_file.wait, 'wait')
+        calls.attach_mock(conn_mock.commit, 'commit')
+
+        self.dao.load_data('projects', self.fake_timestamp, [{'id': 1}])
+
+        mock_stream_csv.assert_called_once_with('projects', [{'id': 1}])
+        load_sql = conn_mock.cursor.return_value.execute.call_args[0][0]
+        self.assertIn('/tmp/pipe/projects.csv', load_sql)
+        self.assertIn('projects_%s' % self.fake_timestamp, load_sql)
+        self.assertEqual([mock.call.wait(), mock.call.commit()],
+                         calls.mock_calls)
+
+    @mock.patch.object(dao.csv_writer, 'stream_csv')
+    def test_load_data_write_error(self, mock_stream_csv):
+        """Test load_data doesn't commit rows that were not all written."""
+        csv_file = mock_stream_csv.return_value.__enter__.return_value
+        csv_file.wait.side_effect = errors.CSVFileError(
+            'projects', IOError('broken'))
+        self.dao.conn = mock.MagicMock()
+
+        with self.assertRaises(errors.CSVFileError):
+            self.dao.load_data('projects', self.fake_timestamp, [{'id': 1}])
+        self.assertFalse(self.dao.conn.commit.called)
+
+    @mock.patch.object(dao, 'COPY_ROWS_CHUNK_SIZE', 2)
+    def test_copy_snapshot_rows(self):
+        """Test copy_snapshot_rows.
+
+        Expect:
+            * The rows are copied in chunks of COPY_ROWS_CHUNK_SIZE keys.
+            * The changes are committed once.
+            * The number of copied rows is returned.
+        """
+        conn_mock = mock.MagicMock()
+        cursor_mock = mock.MagicMock()
+        cursor_mock.execute.side_effect = [2, 1]
+        self.dao.conn = conn_mock
+        self.dao.conn.cursor.return_value = cursor_mock
+
+        copied = self.dao.copy_snapshot_rows(
+            'raw_project_iam_policies', '111', '222', 'project_number',
+            [1, 2, 3])
+
+        columns = 'project_number,iam_policy'
+        self.assertEqual(
+            [mock.call(load_data.COPY_SNAPSHOT_ROWS.format(
+                'raw_project_iam_policies_222', columns,
+                'raw_project_iam_policies_111', 'project_number', '%s,%s'),
+                       [1, 2]),
+             mock.call(load_data.COPY_SNAPSHOT_ROWS.format(
+                 'raw_project_iam_policies_222', columns,
+                 'raw_project_iam_policies_111', 'project_number', '%s'),
+                       [3])],
+            cursor_mock.execute.call_args_list)
+        conn_mock.commit.assert_called_once_with()
+        self.assertEqual(3, copied)
+
+    def test_add_snapshot_indexes(self):
+        """Test add_snapshot_indexes.
+
+        Expect:
+            * All the indexes of the table are added by one statement.
+            * Tables without secondary indexes are left alone.
+        """
+        conn_mock = mock.MagicMock()
+        cursor_mock = mock.MagicMock()
+        self.dao.conn = conn_mock
+        self.dao.conn.cursor.return_value = cursor_mock
+
+        added = self.dao.add_snapshot_indexes('group_members', '111')
+        self.assertEqual(2, added)
+        cursor_mock.execute.assert_called_once_with(
+            create_tables.ADD_INDEXES.format(
+                'group_members_111',
+                'ADD INDEX `idx_group_id` (group_id), '
+                'ADD INDEX `idx_member_email` (member_email)'))
+
+        self.assertEqual(0, self.dao.add_snapshot_indexes('projects', '111'))
+        self.assertEqual(1, cursor_mock.execute.call_count)
+
+    def test_add_snapshot_indexes_error(self):
+        """Test add_snapshot_indexes raises MySQLError on errors."""
+        conn_mock = mock.MagicMock()
+        conn_mock.cursor.return_value.execute.side_effect = (
+            dao.ProgrammingError('error'))
+        self.dao.conn = conn_mock
+
+        with self.assertRaises(errors.MySQLError):
+            self.dao.add_snapshot_indexes('groups', '111')
+
+    def test_create_snapshot_table_partitioned(self):
+        """Test create_snapshot_table with the partitioned layout.
+
+        Expect:
+            * The partitioned table is created with the first snapshot, and
+              a partition is added to it for the next ones.
+            * A view of the snapshot partition is created under the
+              snapshot table name.
+        """
+        conn_mock = mock.MagicMock()
+        cursor_mock = mock.MagicMock()
+        cursor_mock.fetchall.return_value = [('id',), ('group_id',)]
+        cursor_mock.execute.side_effect = [
+            dao.OperationalError(1050, 'Table already exists'),
+            None, None, None]
+        self.dao.conn = conn_mock
+        self.dao.conn.cursor.return_value = cursor_mock
+        self.dao.partitioned = True
+
+        actual_tablename = self.dao.create_snapshot_table(
+            'groups', '20170102T000000Z')
+
+        self.assertEqual('groups_20170102T000000Z', actual_tablename)
+        create_sql = cursor_mock.execute.call_args_list[0][0][0]
+        self.assertIn('CREATE TABLE `groups_snapshots`', create_sql)
+        self.assertIn('PRIMARY KEY (`id`, `snapshot_id`)', create_sql)
+        self.assertIn('KEY `idx_group_email` (group_email)', create_sql)
+        self.assertIn("PARTITION `p20170102T000000Z` VALUES IN "
+                      "('20170102T000000Z')", create_sql)
+        self.assertEqual(
+            [mock.call(create_tables.ADD_SNAPSHOT_PARTITION.format(
+                'groups_snapshots', 'p20170102T000000Z', '20170102T000000Z')),
+             mock.call(create_tables.SELECT_SNAPSHOT_COLUMNS,
+                       ('groups_snapshots',)),
+             mock.call(create_tables.CREATE_SNAPSHOT_VIEW.format(
+                 'groups_20170102T000000Z', '`id`,`group_id`',
+                 'groups_snapshots', '20170102T000000Z'))],
+            cursor_mock.execute.call_args_list[1:])
+
+    def test_create_snapshot_table_partitioned_violations(self):
+        """Test the violations keep a table per snapshot when partitioned."""
+        conn_mock = mock.MagicMock()
+        self.dao.conn = conn_mock
+        self.dao.partitioned = True
+
+        self.dao.create_snapshot_table('violations', '111')
+
+        conn_mock.cursor.return_value.execute.assert_called_once_with(
+            dao.CREATE_TABLE_MAP['violations'].format('violations_111'))
+
+    @mock.patch.object(dao.csv_writer, 'stream_csv')
+    def test_load_data_partitioned(self, mock_stream_csv):
+        """Test load_data loads the partition of the snapshot."""
+        csv_file = mock_stream_csv.return_value.__enter__.return_value
+        csv_file.name = '/tmp/pipe/projects.csv'
+        conn_mock = mock.MagicMock()
+        self.dao.conn = conn_mock
+        self.dao.partitioned = True
+
+        self.dao.load_data('projects', '111', [{'id': 1}])
+
+        load_sql = conn_mock.cursor.return_value.execute.call_args[0][0]
+        self.assertIn('INTO TABLE projects_snapshots', load_sql)
+        self.assertIn("SET snapshot_id = '111'", load_sql)
+
+    def test_copy_snapshot_rows_partitioned(self):
+        """Test copy_snapshot_rows copies into the partition of a snapshot."""
+        cursor_mock = mock.MagicMock()
+        cursor_mock.execute.return_value = 1
+        self.dao.conn = mock.MagicMock()
+        self.dao.conn.cursor.return_value = cursor_mock
+        self.dao.partitioned = True
+
+        self.dao.copy_snapshot_rows(
+            'raw_project_iam_policies', '111', '222', 'project_number', [1])
+
+        cursor_mock.execute.assert_called_once_with(
+            load_data.COPY_SNAPSHOT_ROWS_TO_PARTITION.format(
+                'raw_project_iam_policies_snapshots',
+                'project_number,iam_policy', '222',
+                'raw_project_iam_policies_111', 'project_number', '%s'),
+            [1])
+        self.assertEqual(
+            0, self.dao.add_snapshot_indexes('raw_project_iam_policies', '222'))
+        self.assertEqual(1, cursor_mock.execute.call_count)
+
+    @mock.patch.object(dao.csv_writer, 'stream_csv')
+    def test_load_data_dedup_raw_json(self, mock_stream_csv):
+        """Test load_data stores the raw json values as blobs.
+
+        Expect:
+            * Only the blobs not stored yet are inserted, once each.
+            * The rows loaded reference the blobs.
+        """
+        stored_hash, _ = raw_json_blobs.create_blob({'etag': 'a'})
+        new_hash, new_json = raw_json_blobs.create_blob({'etag': 'b'})
+        cursor_mock = mock.MagicMock()
+        cursor_mock.fetchall.return_value = [(stored_hash,)]
+        self.dao.conn = mock.MagicMock()
+        self.dao.conn.cursor.return_value = cursor_mock
+        self.dao.dedup_raw_json = True
+        rows = [{'project_number': 1, 'iam_policy': {'etag': 'a'}},
+                {'project_number': 2, 'iam_policy': '{"etag": "b"}'},
+                {'project_number': 3, 'iam_policy': {'etag': 'b'}}]
+
+        self.dao.load_data('raw_project_iam_policies', '111', rows)
+
+        # The rows are streamed, and the blobs stored as they are read.
+        loaded_rows = list(mock_stream_csv.call_args[0][1])
+        self.assertEqual(
+            mock.call(raw_json_blobs_sql.INSERT_BLOBS.format(
+                raw_json_blobs_sql.INSERT_BLOB_VALUES), [new_hash, new_json]),
+            cursor_mock.execute.call_args)
+        self.assertEqual(
+            [raw_json_blobs.create_reference(stored_hash),
+             raw_json_blobs.create_reference(new_hash),
+             raw_json_blobs.create_reference(new_hash)],
+            [row['iam_policy'] for row in loaded_rows])
+        self.assertEqual({'etag': 'a'}, rows[0]['iam_policy'])
+
+    @mock.patch.object(dao, 'STREAM_CHUNK_SIZE', 2)
+    def test_store_raw_json_shared_blob_is_streamed(self):
+        """Test rows sharing a blob are yielded before the input ends."""
+        cursor_mock = mock.MagicMock()
+        cursor_mock.fetchall.return_value = []
+        self.dao.conn = mock.MagicMock()
+        self.dao.conn.cursor.return_value = cursor_mock
+        read = []
+
+        def rows():
+            for i in xrange(10):
+                read.append(i)
+                yield {'project_number': i, 'iam_policy': {'etag': 'a'}}
+
+        stored_rows = self.dao._store_raw_json(
+            'raw_project_iam_policies', rows())
+        next(stored_rows)
+
+        self.assertEqual(2, len(read))
+        self.assertEqual(
+            raw_json_blobs_sql.INSERT_BLOBS.format(
+                raw_json_blobs_sql.INSERT_BLOB_VALUES),
+            cursor_mock.execute.call_args[0][0])
+        self.assertEqual(9, len(list(stored_rows)))
+
+    def test_execute_sql_with_fetch_dedup_raw_json(self):
+        """Test execute_sql_with_fetch resolves the blob references."""
+        blob_hash = 'a' * 40
+        cursor_mock = mock.MagicMock()
+        cursor_mock.fetchall.side_effect = [
+            ({'id': 1, 'raw_project': '{"raw_json_blob": "%s"}' % blob_hash},
+             {'id': 2, 'raw_project': '{"projectId": "p2"}'}),
+            [(blob_hash, '{"projectId": "p1"}')]]
+        self.dao.conn = mock.MagicMock()
+        self.dao.conn.cursor.return_value = cursor_mock
+        self.dao.dedup_raw_json = True
+
+        rows = self.dao.execute_sql_with_fetch('projects', 'SELECT 1', ())
+
+        self.assertEqual(
+            ({'id': 1, 'raw_project': '{"projectId": "p1"}'},
+             {'id': 2, 'raw_project': '{"projectId": "p2"}'}),
+            rows)
+        cursor_mock.execute.assert_called_with(
+            raw_json_blobs_sql.SELECT_BLOBS.format('%s'), [blob_hash])
+
+    @mock.patch.dict(dao._SNAPSHOT_COMPLETION, clear=True)
+    def test_execute_cached_sql_with_fetch(self):
+        """Test execute_cached_sql_with_fetch.
+
+        Expect:
+            * The results of the complete snapshots are cached.
+            * The results of the running snapshots are not cached.
+            * Each caller gets its own copy of the rows, as a list.
+        """
+        statuses = {'111': 'SUCCESS', '222': 'RUNNING'}
+
+        def fetch(resource_name, sql, values):
+            if sql == select_data.SNAPSHOT_CYCLE_STATUS:
+                return [{'status': statuses[values[0]]}]
+            return [{'project_id': values[0]}]
+
+        self.dao.query_cache = query_cache.QueryCache(10)
+        self.dao.execute_sql_with_fetch = mock.MagicMock(side_effect=fetch)
+
+        for timestamp in ('111', '111', '222', '222'):
+            rows = self.dao.execute_cached_sql_with_fetch(
+                'projects', 'SELECT %s' % timestamp, ('p1',), timestamp)
+            self.assertEqual([{'project_id': 'p1'}], rows)
+            rows[0]['project_id'] = 'changed'
+
+        queries = [call[0][1] for call in
+                   self.dao.execute_sql_with_fetch.call_args_list]
+        self.assertEqual(1, queries.count('SELECT 111'))
+        self.assertEqual(2, queries.count('SELECT 222'))
+        self.assertEqual(2, queries.count(select_data.SNAPSHOT_CYCLE_STATUS))
+        self.assertEqual(
+            {'hits': 1, 'misses': 1, 'size': 1, 'hit_rate': 0.5},
+            self.dao.query_cache.get_stats())
+
+    @mock.patch.object(dao, 'BATCH_LOOKUP_CHUNK_SIZE', 2)
+    def test_execute_sql_with_fetch_by_ids(self):
+        """Test execute_sql_with_fetch_by_ids.
+
+        Expect:
+            * The ids are deduplicated, and looked up by chunks.
+            * The rows of all the chunks are returned.
+        """
+        self.dao.execute_sql_with_fetch = mock.MagicMock(
+            side_effect=lambda resource_name, sql, values: [
+                {'project_id': value} for value in values])
+
+        rows = self.dao.execute_sql_with_fetch_by_ids(
+            'projects', select_data.PROJECTS_BY_IDS, self.fake_timestamp,
+            ['p1', 'p2', 'p1', 'p3'])
+
+        self.assertEqual(
+            [{'project_id': 'p1'}, {'project_id': 'p2'},
+             {'project_id': 'p3'}],
+            rows)
+        self.assertEqual(
+            [mock.call('projects', select_data.PROJECTS_BY_IDS.format(
+                self.fake_timestamp, '%s,%s'), ('p1', 'p2')),
+             mock.call('projects', select_data.PROJECTS_BY_IDS.format(
+                 self.fake_timestamp, '%s'), ('p3',))],
+            self.dao.execute_sql_with_fetch.call_args_list)
+
+    def test_iter_sql_with_fetch(self):
+        """Test iter_sql_with_fetch.
+
+        Expect:
+            * The rows are fetched chunk_size at a time, with an unbuffered
+              cursor, as they are consumed.
+            * The cursor is closed once the rows are read.
+        """
+        conn_mock = mock.MagicMock()
+        cursor_mock = mock.MagicMock()
+        cursor_mock.fetchmany.side_effect = [[{'id': 1}, {'id': 2}],
+                                             [{'id': 3}], []]
+        self.dao.conn = conn_mock
+        self.dao.conn.cursor.return_value = cursor_mock
+
+        rows = self.dao.iter_sql_with_fetch(
+            'projects', 'SELECT 1', (), chunk_size=2)
+        self.assertEqual({'id': 1}, next(rows))
+        self.assertEqual(1, cursor_mock.fetchmany.call_count)
+        self.assertEqual([{'id': 2}, {'id': 3}], list(rows))
+
+        conn_mock.cursor.assert_called_once_with(
+            cursorclass=dao.cursors.SSDictCursor)
+        cursor_mock.execute.assert_called_once_with('SELECT 1', ())
+        cursor_mock.fetchmany.assert_called_with(2)
+        cursor_mock.close.assert_called_once_with()
+
+    def test_iter_sql_with_fetch_closed_early(self):
+        """Test iter_sql_with_fetch closes the cursor when not read fully."""
+        cursor_mock = mock.MagicMock()
+        cursor_mock.fetchmany.return_value = [{'id': 1}, {'id': 2}]
+        self.dao.conn = mock.MagicMock()
+        self.dao.conn.cursor.return_value = cursor_mock
+
+        rows = self.dao.iter_sql_with_fetch('projects', 'SELECT 1', ())
+        next(rows)
+        rows.close()
+
+        cursor_mock.close.assert_called_once_with()
+
+    def test_iter_sql_with_fetch_error(self):
+        """Test iter_sql_with_fetch raises MySQLError on errors."""
+        self.dao.conn = mock.MagicMock()
+        self.dao.conn.cursor.return_value.execute.side_effect = (
+            dao.ProgrammingError('error'))
+
+        with self.assertRaises(errors.MySQLError):
+            list(self.dao.iter_sql_with_fetch('projects', 'SELECT 1', ()))
+
+    def test_execute_sql_with_commit_many(self):
+        """Test execute_sql_with_commit_many.
+
+        Expect:
+            * All the rows are sent with executemany() and committed once.
+        """
+        conn_mock = mock.MagicMock()
+        cursor_mock = mock.MagicMock()
+        cursor_mock.executemany.return_value = 2
+        self.dao.conn = conn_mock
+        self.dao.conn.cursor.return_value = cursor_mock
+
+        row_count = self.dao.execute_sql_with_commit_many(
+            'violations', 'INSERT INTO t VALUES (%s)', [('a',), ('b',)])
+
+        cursor_mock.executemany.assert_called_once_with(
+            'INSERT INTO t VALUES (%s)', [('a',), ('b',)])
+        conn_mock.commit.assert_called_once_with()
+        self.assertEqual(2, row_count)
+
+
+    @mock.patch.object(dao, 'QUERY_STATS',
+                       query_stats.QueryStats(slow_query_seconds=0))
+    def test_execute_sql_with_fetch_explains_slow_reads(self):
+        """Test execute_sql_with_fetch records and explains the slow reads.
+
+        Expect:
+            * The statement is recorded in the query stats.
+            * The plan of the slow read is captured.
+        """
+        cursor_mock = mock.MagicMock()
+        cursor_mock.fetchall.side_effect = [[{'id': 1}, {'id': 2}],
+                                            [{'type': 'ALL'}]]
+        self.dao.conn = mock.MagicMock()
+        self.dao.conn.cursor.return_value = cursor_mock
+        self.dao.explain_slow_queries = True
+
+        rows = self.dao.execute_sql_with_fetch(
+            'projects', 'SELECT * FROM t WHERE id = %s', (1,))
+
+        self.assertEqual([{'id': 1}, {'id': 2}], rows)
+        self.assertEqual(
+            [mock.call('SELECT * FROM t WHERE id = %s', (1,)),
+             mock.call('EXPLAIN SELECT * FROM t WHERE id = %s', (1,))],
+            cursor_mock.execute.call_args_list)
+        stats = dao.QUERY_STATS.get_stats()
+        self.assertEqual(1, len(stats))
+        self.assertEqual(2, stats[0]['rows'])
+        self.assertEqual(1, stats[0]['slow_calls'])
+        self.assertEqual([{'type': 'ALL'}], stats[0]['explain'])
+
+    @mock.patch.object(dao, 'QUERY_STATS',
+                       query_stats.QueryStats(slow_query_seconds=0))
+    def test_execute_sql_with_commit_slow_write(self):
+        """Test execute_sql_with_commit records, but doesn't explain, writes."""
+        cursor_mock = mock.MagicMock()
+        cursor_mock.execute.return_value = 3
+        self.dao.conn = mock.MagicMock()
+        self.dao.conn.cursor.return_value = cursor_mock
+        self.dao.explain_slow_queries = True
+
+        self.dao.execute_sql_with_commit(
+            'violations', 'DELETE FROM t WHERE id = %s', (1,))
+
+        cursor_mock.execute.assert_called_once_with(
+            'DELETE FROM t WHERE id = %s', (1,))
+        stats = dao.QUERY_STATS.get_stats()
+        self.assertEqual(3, stats[0]['rows'])
+        self.assertIsNone(stats[0]['explain'])
+
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,167 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the database connector and its connection pool."""
+
+import threading
+import unittest
+
+import mock
+from MySQLdb import OperationalError
+
+from tests.unittest_utils import ForsetiTestCase
+from google.cloud.security.common.data_access import _db_connector
+from google.cloud.security.common.data_access import errors
+
+
+class FakeClock(object):
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class ConnectionPoolTest(ForsetiTestCase):
+    """Tests for the ConnectionPool."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.connect = mock.MagicMock(side_effect=lambda **kwargs: mock.Mock())
+        self.pool = _db_connector.ConnectionPool(
+            {'host': 'foo'}, max_connections=2, connect=self.connect,
+            clock=self.clock.time)
+
+    def test_connections_are_reused(self):
+        """A returned connection is reused by the next checkout."""
+        conn = self.pool.checkout()
+        self.pool.checkin(conn)
+
+        self.assertIs(conn, self.pool.checkout())
+        self.connect.assert_called_once_with(host='foo')
+        self.assertFalse(conn.ping.called)
+
+    def test_stale_connection_is_replaced(self):
+        """A long idle connection that fails its ping is reconnected."""
+        conn = self.pool.checkout()
+        self.pool.checkin(conn)
+        conn.ping.side_effect = OperationalError(2006, 'gone away')
+        self.clock.now += _db_connector.HEALTH_CHECK_IDLE_TIME
+
+        new_conn = self.pool.checkout()
+
+        self.assertIsNot(conn, new_conn)
+        conn.close.assert_called_once_with()
+        self.assertEqual(2, self.connect.call_count)
+
+    def test_checkout_waits_when_exhausted(self):
+        """Checkouts block until a connection is returned."""
+        conns = [self.pool.checkout(), self.pool.checkout()]
+        checked_out = []
+        waiter = threading.Thread(
+            target=lambda: checked_out.append(self.pool.checkout()))
+        waiter.start()
+        waiter.join(0.1)
+        self.assertEqual([], checked_out)
+
+        self.pool.checkin(conns[0])
+        waiter.join(5)
+        self.assertEqual([conns[0]], checked_out)
+        self.assertEqual(2, self.connect.call_count)
+
+    def test_connect_error(self):
+        """A failed connection raises MySQLError and frees its slot."""
+        self.connect.side_effect = OperationalError(2003, 'unreachable')
+
+        with self.assertRaises(errors.MySQLError):
+            self.pool.checkout()
+        with self.assertRaises(errors.MySQLError):
+            self.pool.checkout()
+        with self.assertRaises(errors.MySQLError):
+            self.pool.checkout()
+
+
+class DbConnectorTest(ForsetiTestCase):
+    """Tests for the DbConnector."""
+
+    def setUp(self):
+        self.pool = mock.MagicMock()
+        self.conn = mock.MagicMock()
+        self.pool.checkout.return_value = self.conn
+        with mock.patch.object(_db_connector, 'get_pool',
+                               return_value=self.pool):
+            self.connector = _db_connector.DbConnector({})
+
+    def test_connection_is_returned_after_operation(self):
+        """The connection is checked in once the operation is done."""
+        with self.connector.checkout_connection() as conn:
+            self.assertIs(self.conn, conn)
+        self.pool.checkin.assert_called_once_with(self.conn)
+
+    def test_connection_is_discarded_on_connection_error(self):
+        """A connection that was lost is closed."""
+        with self.assertRaises(OperationalError):
+            with self.connector.checkout_connection():
+                raise OperationalError(2013, 'lost connection')
+        self.pool.discard.assert_called_once_with(self.conn)
+        self.assertFalse(self.pool.checkin.called)
+
+    def test_connection_is_kept_on_query_error(self):
+        """A connection that failed with a query level error is reused."""
+        with self.assertRaises(OperationalError):
+            with self.connector.checkout_connection():
+                raise OperationalError(1205, 'lock wait timeout exceeded')
+        self.conn.rollback.assert_called_once_with()
+        self.pool.checkin.assert_called_once_with(self.conn)
+        self.assertFalse(self.pool.discard.called)
+
+    def test_connection_is_rolled_back_on_error(self):
+        """A connection is rolled back before reuse after other errors."""
+        with self.assertRaises(ValueError):
+            with self.connector.checkout_connection():
+                raise ValueError()
+        self.conn.rollback.assert_called_once_with()
+        self.pool.checkin.assert_called_once_with(self.conn)
+
+    def test_dedicated_connection_is_not_pooled(self):
+        """A dedicated connection is opened outside the pool and closed."""
+        dedicated_conn = mock.MagicMock()
+        self.pool.connect.return_value = dedicated_conn
+
+        with self.assertRaises(ValueError):
+            with self.connector.dedicated_connection() as conn:
+                self.assertIs(dedicated_conn, conn)
+                raise ValueError()
+
+        dedicated_conn.close.assert_called_once_with()
+        self.assertFalse(self.pool.checkout.called)
+        self.assertFalse(self.pool.checkin.called)
+
+    def test_pool_is_shared_per_database(self):
+        """All the connectors of the same database share a pool."""
+        configs = {'db_host': 'foo', 'db_user': 'bar', 'db_name': 'forseti'}
+        with mock.patch.object(_db_connector, '_POOLS', {}):
+            first = _db_connector.DbConnector(configs)
+            second = _db_connector.DbConnector(dict(configs))
+            other = _db_connector.DbConnector(
+                dict(configs, db_name='other'))
+
+        self.assertIs(first.pool, second.pool)
+        self.assertIsNot(first.pool, other.pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
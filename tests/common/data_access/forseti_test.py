@@ -0,0 +1,145 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the Forseti importer."""
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from tests.unittest_utils import ForsetiTestCase
+from google.cloud.security.common.data_access import forseti
+from google.cloud.security.common.data_access import raw_json_blobs
+
+TIMESTAMP = '20170101T000000Z'
+
+
+class ImporterTest(ForsetiTestCase):
+    """Tests for the Forseti importer."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_url = 'sqlite:///' + os.path.join(self.temp_dir, 'forseti.db')
+        self.checkpoint_path = os.path.join(self.temp_dir, 'checkpoint')
+        (organization, folders, tables, policies,
+         group_membership) = forseti.create_table_names(TIMESTAMP, '2.0')
+        tables = dict(tables)
+        groups = group_membership[1]
+
+        importer = forseti.Importer(self.db_url)
+        importer.session.add_all(
+            [forseti.Snapshot(id=1, start_time=datetime.date(2017, 1, 1),
+                              status='SUCCESS', schema_version='2.0',
+                              cycle_timestamp=TIMESTAMP),
+             organization(org_id=1, name='organizations/1'),
+             folders(folder_id=2, parent_type='organization', parent_id='1'),
+             groups(id=1, group_id='g1', group_email='g1@example.com'),
+             policies[0](id=1, org_id=1, iam_policy='{}')] +
+            [tables['projects'](id=i, project_id='p%s' % i)
+             for i in xrange(1, 4)] +
+            [tables['buckets'](id=i, bucket_id='b%s' % i)
+             for i in xrange(1, 3)])
+        importer.session.commit()
+        importer.session.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def _describe(items):
+        """Describe the imported items by type and id."""
+        described = []
+        for res_type, item in items:
+            if res_type in ('projects', 'buckets'):
+                item = item.id
+            elif res_type != 'group':
+                item = type(item).__name__
+            described.append((res_type, item))
+        return described
+
+    def test_iter(self):
+        """The tables are imported in order, while read concurrently."""
+        importer = forseti.Importer(self.db_url, max_workers=2)
+
+        self.assertEqual(
+            [('organizations', 'Organization'),
+             ('folders', 'Folders'),
+             ('projects', 1), ('projects', 2), ('projects', 3),
+             ('buckets', 1), ('buckets', 2),
+             ('group', 'g1@example.com'),
+             ('policy', 'OrganizationPolicy')],
+            self._describe(importer))
+
+    @mock.patch.object(forseti, 'PER_YIELD', 1)
+    def test_iter_resume(self):
+        """An interrupted import resumes from the last consumed row."""
+        importer = forseti.Importer(
+            self.db_url, checkpoint_path=self.checkpoint_path)
+        items = iter(importer)
+        for _ in xrange(4):
+            next(items)
+        items.close()
+
+        importer = forseti.Importer(
+            self.db_url, checkpoint_path=self.checkpoint_path)
+        self.assertEqual(
+            [('projects', 2), ('projects', 3),
+             ('buckets', 1), ('buckets', 2),
+             ('group', 'g1@example.com'),
+             ('policy', 'OrganizationPolicy')],
+            self._describe(importer))
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_resolve_raw_json(self):
+        """The blob references are resolved, and the missing blobs kept."""
+        importer = forseti.Importer(self.db_url)
+        importer.session.execute(
+            'CREATE TABLE raw_json_blobs (blob_hash CHAR(40) PRIMARY KEY, '
+            'raw_json TEXT NOT NULL)')
+        importer.session.execute(
+            "INSERT INTO raw_json_blobs VALUES ('%s', '{}')" % ('a' * 40))
+        importer.has_raw_json_blobs = True
+        policy = forseti.create_table_names(TIMESTAMP, '2.0')[3][0]
+        stored = policy(id=2, iam_policy=raw_json_blobs.create_reference(
+            'a' * 40))
+        missing = policy(id=3, iam_policy=raw_json_blobs.create_reference(
+            'b' * 40))
+
+        importer._resolve_raw_json(stored)
+        importer._resolve_raw_json(missing)
+
+        self.assertEqual('{}', stored.iam_policy)
+        self.assertEqual(raw_json_blobs.create_reference('b' * 40),
+                         missing.iam_policy)
+
+    def test_create_table_names_evicts(self):
+        """The tables of the least recently used snapshots are evicted."""
+        forseti.create_table_names('20170102T000000Z', '2.0')
+        forseti.create_table_names(TIMESTAMP, '2.0')
+        forseti.create_table_names('20170103T000000Z', '2.0')
+
+        self.assertEqual(['20170101T000000Z', '20170103T000000Z'],
+                         forseti.TABLE_CACHE.keys())
+        self.assertNotIn('projects_20170102T000000Z',
+                         forseti.BASE.metadata.tables)
+        self.assertIn('projects_20170101T000000Z',
+                      forseti.BASE.metadata.tables)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -55,19 +55,35 @@ class GroupDaoTest(ForsetiTestCase):
             self.dao.get_group_members(
                 self.resource_name, self.fake_group_id, self.fake_timestamp)
 
-    @mock.patch.object(group_dao.GroupDao, 'get_group_members', autospec=True)
+    @mock.patch.object(dao.Dao, 'execute_sql_with_fetch', autospec=True)
+    def test_get_group_members_for_groups(self, mock_fetch):
+        """Test get_group_members_for_groups()."""
+        mock_fetch.return_value = fake_data.GET_GROUP_MEMBERS_SIDE_EFFECT[0]
+
+        members = self.dao.get_group_members_for_groups(
+            'group_members', ['11111', '33333'], self.fake_timestamp)
+
+        self.assertEqual(
+            {'11111': list(fake_data.GET_GROUP_MEMBERS_SIDE_EFFECT[0]),
+             '33333': []},
+            members)
+        self.assertEqual(1, mock_fetch.call_count)
+
+    @mock.patch.object(group_dao.GroupDao, 'get_group_members_for_groups',
+                       autospec=True)
     @mock.patch.object(group_dao.GroupDao, 'get_group_id', autospec=True)
     def test_get_recursive_members_of_group(self, mock_get_group_id,
                                             mock_get_group_members):
         """Test get_recursive_members_of_group()."""
-        mock_get_group_id.return_value = '999999'
-        mock_get_group_members.side_effect = (
-            fake_data.GET_GROUP_MEMBERS_SIDE_EFFECT)
+        mock_get_group_id.return_value = '11111'
+        mock_get_group_members.side_effect = [
+            {'11111': list(fake_data.GET_GROUP_MEMBERS_SIDE_EFFECT[0])},
+            {'22222': list(fake_data.GET_GROUP_MEMBERS_SIDE_EFFECT[1])}]
 
         all_members = self.dao.get_recursive_members_of_group(
             self.fake_group_email, self.fake_timestamp)
 
-        self.assert_(fake_data.EXPECTED_ALL_MEMBERS, all_members)
+        self.assertEqual(fake_data.EXPECTED_ALL_MEMBERS, all_members)
 
 
 if __name__ == '__main__':
@@ -19,6 +19,7 @@ import mock
 import unittest
 
 from google.cloud.security.common.data_access import _db_connector
+from google.cloud.security.common.data_access import errors
 from google.cloud.security.common.data_access import folder_dao
 from google.cloud.security.common.data_access import org_resource_rel_dao
 from google.cloud.security.common.data_access import organization_dao
@@ -117,6 +118,52 @@ class OrgResourceRelDaoTest(ForsetiTestCase):
             [],
             actual3)
 
+    def _create_index(self, orgs, folders, projects):
+        """Create a hierarchy index of fake dao results."""
+        self.mock_daos = dict(
+            (resource_type, mock.MagicMock())
+            for resource_type in ('organization', 'folder', 'project'))
+        self.mock_daos['organization'].get_organizations.return_value = orgs
+        self.mock_daos['folder'].get_folders.side_effect = folders
+        self.mock_daos['project'].get_projects.return_value = projects
+        return org_resource_rel_dao.ResourceHierarchyIndex(
+            dict((resource_type, {'dao': dao})
+                 for resource_type, dao in self.mock_daos.iteritems()),
+            self.fake_timestamp)
+
+    def test_hierarchy_index_finds_ancestors(self):
+        """The index loads each table once and answers in memory."""
+        index = self._create_index(
+            [self.fake_org],
+            [[self.fake_folder1, self.fake_folder2]],
+            [self.fake_project1])
+
+        unloaded_project = project.Project(project_id='project-1')
+        self.assertEqual(
+            [self.fake_folder2, self.fake_folder1, self.fake_org],
+            index.get_ancestors(unloaded_project))
+        self.assertEqual(
+            [self.fake_folder1, self.fake_org],
+            index.get_ancestors(self.fake_folder2))
+        self.assertEqual([], index.get_ancestors(self.fake_org))
+
+        self.mock_daos['project'].get_projects.assert_called_once_with(
+            self.fake_timestamp)
+        self.assertEqual(
+            1, self.mock_daos['folder'].get_folders.call_count)
+        self.assertFalse(self.mock_daos['project'].get_project.called)
+
+    def test_hierarchy_index_without_resource(self):
+        """Resources missing from the snapshot are not answered."""
+        index = self._create_index(
+            [self.fake_org],
+            errors.MySQLError('folders', Exception('table missing')),
+            [self.fake_project1])
+
+        self.assertIsNone(index.get_ancestors(self.fake_project1))
+        self.assertIsNone(index.get_ancestors(
+            project.Project(project_id='unknown')))
+        self.assertEqual([], index.get_ancestors(self.fake_org))
 
 if __name__ == '__main__':
     unittest.main()
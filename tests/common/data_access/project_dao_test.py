@@ -105,6 +105,32 @@ class ProjectDaoTest(ForsetiTestCase):
             self.project_dao.map_row_to_object(fake_project),
             actual)
 
+    def test_get_projects_by_ids(self):
+        """Test that get_projects_by_ids() looks up the projects together.
+
+        Setup:
+            Mock execute_sql_with_fetch() return value.
+
+        Expect:
+            A single query, and the Project of each project id found.
+        """
+        self.fetch_mock.return_value = self.fake_projects_db_rows[:2]
+
+        actual = self.project_dao.get_projects_by_ids(
+            ['project-1', 'project-2', 'project-3'], self.fake_timestamp)
+
+        self.assertEqual(
+            {'project-1': self.project_dao.map_row_to_object(
+                self.fake_projects_db_rows[0]),
+             'project-2': self.project_dao.map_row_to_object(
+                 self.fake_projects_db_rows[1])},
+            actual)
+        self.fetch_mock.assert_called_once_with(
+            resource.ResourceType.PROJECT,
+            select_data.PROJECTS_BY_IDS.format(
+                self.fake_timestamp, '%s,%s,%s'),
+            ('project-1', 'project-2', 'project-3'))
+
     def test_get_project_iam_policies(self):
         """Test that get_project_iam_policies() database methods are called.
 
@@ -0,0 +1,61 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the query cache."""
+
+import unittest
+
+import mock
+
+from tests.unittest_utils import ForsetiTestCase
+from google.cloud.security.common.data_access import query_cache
+
+
+class QueryCacheTest(ForsetiTestCase):
+    """Tests for the query cache."""
+
+    def test_get_put(self):
+        """The least recently used results are evicted first."""
+        cache = query_cache.QueryCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual((True, 1), cache.get('a'))
+        cache.put('c', 3)
+
+        self.assertEqual((False, None), cache.get('b'))
+        self.assertEqual((True, 1), cache.get('a'))
+        self.assertEqual((True, 3), cache.get('c'))
+        self.assertEqual(
+            {'hits': 3, 'misses': 1, 'size': 2, 'hit_rate': 0.75},
+            cache.get_stats())
+
+    def test_disabled(self):
+        """Nothing is cached when the maximum size is 0."""
+        cache = query_cache.QueryCache(0)
+        cache.put('a', 1)
+
+        self.assertEqual((False, None), cache.get('a'))
+        self.assertEqual(0.0, cache.get_stats()['hit_rate'])
+
+    @mock.patch.object(query_cache, '_SHARED_CACHE', None)
+    def test_shared_cache(self):
+        """The shared cache is created, and sized, once."""
+        shared_cache = query_cache.get_shared_cache(2)
+
+        self.assertIs(shared_cache, query_cache.get_shared_cache(5))
+        self.assertEqual(2, shared_cache.max_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the query stats."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tests.unittest_utils import ForsetiTestCase
+from google.cloud.security.common.data_access import query_stats
+
+
+class QueryStatsTest(ForsetiTestCase):
+    """Tests for the query stats."""
+
+    def test_get_template(self):
+        """Snapshots, literals and placeholder lists are normalized."""
+        self.assertEqual(
+            'SELECT * FROM projects_{timestamp} WHERE project_id IN '
+            '(%s,...) AND name = ?',
+            query_stats.get_template(
+                'SELECT *\n    FROM projects_20170101T000000Z\n'
+                '    WHERE project_id IN (%s, %s,%s) AND name = \'a\''))
+        self.assertEqual(
+            'INSERT INTO t VALUES (%s,...),...',
+            query_stats.get_template(
+                'INSERT INTO t VALUES (%s,%s), (%s,%s),(%s,%s)'))
+
+    def test_record(self):
+        """The executions are aggregated by template."""
+        stats = query_stats.QueryStats(slow_query_seconds=1)
+
+        self.assertFalse(stats.record(
+            'SELECT * FROM projects_20170101T000000Z', 0.002, 3))
+        self.assertTrue(stats.record(
+            'SELECT * FROM projects_20170102T000000Z', 2, 5))
+        self.assertFalse(stats.record('DELETE FROM t', 0.5, 1))
+        stats.record_explain('SELECT * FROM projects_20170102T000000Z',
+                             [{'type': 'ALL'}])
+
+        results = stats.get_stats()
+        self.assertEqual(
+            ['SELECT * FROM projects_{timestamp}', 'DELETE FROM t'],
+            [result['template'] for result in results])
+        self.assertEqual(2, results[0]['calls'])
+        self.assertEqual(8, results[0]['rows'])
+        self.assertEqual(1, results[0]['slow_calls'])
+        self.assertAlmostEqual(1.001, results[0]['mean_seconds'])
+        self.assertEqual(2, results[0]['max_seconds'])
+        self.assertEqual([0, 1, 0, 0, 0, 0, 0, 1, 0, 0, 0],
+                         results[0]['histogram'])
+        self.assertEqual([{'type': 'ALL'}], results[0]['explain'])
+        self.assertEqual(3, len(stats.format_table().splitlines()))
+
+    def test_write(self):
+        """The statistics are written as json."""
+        stats = query_stats.QueryStats()
+        stats.record('DELETE FROM t', 0.5, 1)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'stats.json')
+            stats.write(path)
+            with open(path) as stats_file:
+                written = json.load(stats_file)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(['DELETE FROM t'],
+                         [result['template']
+                          for result in written['templates']])
+        self.assertEqual(query_stats.DEFAULT_SLOW_QUERY_SECONDS,
+                         written['slow_query_seconds'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the raw json blobs."""
+
+import unittest
+
+from tests.unittest_utils import ForsetiTestCase
+from google.cloud.security.common.data_access import raw_json_blobs
+
+
+class RawJsonBlobsTest(ForsetiTestCase):
+    """Tests for the raw json blobs."""
+
+    def test_create_blob(self):
+        """Equal json values have the same blob, whatever their format."""
+        blob_hash, canonical_json = raw_json_blobs.create_blob(
+            '{"b": [1, 2], "a": "x"}')
+        self.assertEqual('{"a":"x","b":[1,2]}', canonical_json)
+        self.assertEqual(
+            (blob_hash, canonical_json),
+            raw_json_blobs.create_blob({'a': 'x', 'b': [1, 2]}))
+        self.assertEqual(40, len(blob_hash))
+
+    def test_create_blob_not_json(self):
+        """Empty and non json values are not stored as blobs."""
+        self.assertIsNone(raw_json_blobs.create_blob(None))
+        self.assertIsNone(raw_json_blobs.create_blob(''))
+        self.assertIsNone(raw_json_blobs.create_blob('{not json'))
+
+    def test_get_reference(self):
+        """References are recognized as created, and as returned by MySQL."""
+        blob_hash = 'a' * 40
+        self.assertEqual(
+            blob_hash, raw_json_blobs.get_reference(
+                raw_json_blobs.create_reference(blob_hash)))
+        self.assertEqual(
+            blob_hash, raw_json_blobs.get_reference(
+                '{"raw_json_blob": "%s"}' % blob_hash))
+        self.assertIsNone(raw_json_blobs.get_reference('{"etag": "abc"}'))
+        self.assertIsNone(raw_json_blobs.get_reference(123))
+
+
+if __name__ == '__main__':
+    unittest.main()
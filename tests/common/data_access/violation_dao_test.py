@@ -22,6 +22,7 @@ import unittest
 from google.cloud.security.common.data_access import _db_connector
 from google.cloud.security.common.data_access import errors
 from google.cloud.security.common.data_access import violation_dao
+from google.cloud.security.common.data_access.sql_queries import load_data
 from google.cloud.security.common.data_access.sql_queries import select_data
 from google.cloud.security.common.gcp_type import iam_policy as iam
 from google.cloud.security.scanner.audit import rules
@@ -123,8 +124,8 @@ class ViolationDaoTest(ForsetiTestCase):
         Expect:
             * Assert that get_latest_snapshot_timestamp() gets called.
             * Assert that create_snapshot_table() gets called.
-            * Assert that conn.commit() is called 3x.
-              was called == # of formatted/flattened RuleViolations).
+            * Assert that all the formatted/flattened RuleViolations are
+              inserted with a single commit.
         """
         resource_name = 'policy_violations'
         conn_mock = mock.MagicMock()
@@ -135,8 +136,8 @@ class ViolationDaoTest(ForsetiTestCase):
         self.dao.create_snapshot_table = mock.MagicMock(
             return_value=self.fake_table_name)
         self.dao.conn = conn_mock
-        self.dao.execute_sql_with_commit = commit_mock
-        self.dao.insert_violations(self.fake_flattened_violations)
+        self.dao.execute_sql_with_commit_many = commit_mock
+        actual = self.dao.insert_violations(self.fake_flattened_violations)
 
         # Assert snapshot is retrieved because no snapshot timestamp was
         # provided to the method call.
@@ -147,8 +148,33 @@ class ViolationDaoTest(ForsetiTestCase):
         self.dao.create_snapshot_table.assert_called_once_with(
             self.resource_name, self.fake_snapshot_timestamp)
 
-        # Assert that conn.commit() was called.
-        self.assertEqual(3, commit_mock.call_count)
+        # Assert that all the violations were inserted at once.
+        commit_mock.assert_called_once_with(
+            self.resource_name,
+            load_data.INSERT_VIOLATION.format(self.fake_table_name),
+            self.expected_fake_violations)
+        self.assertEqual((3, []), actual)
+
+    @mock.patch.object(violation_dao, 'INSERT_CHUNK_SIZE', 2)
+    def test_insert_violations_in_chunks(self):
+        """Test that violations are inserted in chunks of INSERT_CHUNK_SIZE.
+
+        Expect:
+            * One multi-row insert per chunk.
+        """
+        self.dao.create_snapshot_table = mock.MagicMock(
+            return_value=self.fake_table_name)
+        self.dao.execute_sql_with_commit_many = mock.MagicMock()
+
+        actual = self.dao.insert_violations(
+            self.fake_flattened_violations, self.fake_snapshot_timestamp)
+
+        self.assertEqual(
+            [self.expected_fake_violations[:2],
+             self.expected_fake_violations[2:]],
+            [args[2] for args, _ in
+             self.dao.execute_sql_with_commit_many.call_args_list])
+        self.assertEqual((3, []), actual)
 
     def test_insert_violations_with_timestamp(self):
         """Test that insert_violations() is properly called with timestamp.
@@ -198,9 +224,11 @@ class ViolationDaoTest(ForsetiTestCase):
                 * self.dao.conn
                 * self.dao.get_latest_snapshot_timestamp
                 * self.dao.create_snapshot_table
+            * Create side effect for the multi-row insert to raise an error.
             * Create side effect for one violation to raise an error.
 
         Expect:
+            * Fall back to inserting the violations one by one.
             * Log MySQLError when table insert error occurs and return list
               of errors.
             * Return a tuple of (num_violations-1, [violation])
@@ -219,6 +247,8 @@ class ViolationDaoTest(ForsetiTestCase):
             else:
                 return mock.DEFAULT
 
+        self.dao.execute_sql_with_commit_many = mock.MagicMock(
+            side_effect=MySQLdb.DataError)
         self.dao.execute_sql_with_commit = mock.MagicMock(
             side_effect=insert_violation_side_effect)
 
@@ -285,6 +315,23 @@ class ViolationDaoTest(ForsetiTestCase):
             (violation_type,))
         self.assertEqual(expected, violations)
 
+    def test_iter_all_violations_by_type(self):
+        """Test iter_all_violations() streams the violations of a type."""
+        expected = [{'violation_type': 'type1', 'violation_data': {}}]
+        violation_type = 'type1'
+        self.dao.iter_sql_with_fetch = mock.MagicMock(
+            return_value=iter(expected))
+
+        violations = self.dao.iter_all_violations(
+            self.fake_snapshot_timestamp, violation_type)
+
+        self.dao.iter_sql_with_fetch.assert_called_once_with(
+            violation_type,
+            select_data.SELECT_VIOLATIONS_BY_TYPE.format(
+                self.fake_snapshot_timestamp),
+            (violation_type,))
+        self.assertEqual(expected, list(violations))
+
     def test_map_by_type(self):
         """Test violation_dao.map_by_resource() util method."""
         actual = violation_dao.map_by_resource(
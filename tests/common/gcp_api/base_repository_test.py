@@ -17,7 +17,9 @@ import datetime
 import threading
 import unittest
 from googleapiclient import discovery
+from googleapiclient import errors
 from googleapiclient import http
+import httplib2
 import mock
 import oauth2client
 from oauth2client import client
@@ -26,9 +28,33 @@ from oauth2client import service_account
 from tests import unittest_utils
 from google.cloud import security as forseti_security
 from google.cloud.security.common.gcp_api import _base_repository as base
+from google.cloud.security.common.gcp_api import _discovery_cache
 from google.cloud.security.common.gcp_api import _supported_apis
 
 
+class FakeBatch(object):
+    """Fake BatchHttpRequest, answering each request from a responses map."""
+
+    def __init__(self, callback, responses, batch_sizes):
+        self.callback = callback
+        self.responses = responses
+        self.batch_sizes = batch_sizes
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        self.batch_sizes.append(len(self.requests))
+        for request_id, request in self.requests:
+            response, error = self.responses[request].pop(0)
+            self.callback(request_id, response, error)
+
+
+def _http_error(status):
+    return errors.HttpError(httplib2.Response({'status': status}), '')
+
+
 class BaseRepositoryTest(unittest_utils.ForsetiTestCase):
     """Test the Base Repository methods."""
 
@@ -210,6 +236,31 @@ class BaseRepositoryTest(unittest_utils.ForsetiTestCase):
         self.assertEqual(repo_client.gcp_services['v1'], repo.gcp_service)
         self.assertNotEqual(repo_client.gcp_services['v2'], repo.gcp_service)
 
+    @mock.patch.object(discovery, 'build', autospec=True)
+    def test_create_service_api_uses_discovery_cache(self,
+                                                     mock_discovery_build):
+        """The discovery document is looked up in the on-disk cache."""
+        base._create_service_api(mock.Mock(), 'compute', 'v1')
+
+        _, kwargs = mock_discovery_build.call_args
+        self.assertIs(_discovery_cache.DISCOVERY_CACHE, kwargs['cache'])
+        self.assertTrue(kwargs['cache_discovery'])
+
+    @mock.patch.object(base, 'LOGGER', autospec=True)
+    @mock.patch.object(discovery, 'build', autospec=True)
+    def test_create_service_api_falls_back_to_stale_document(
+            self, mock_discovery_build, mock_logger):
+        """A stale document is used when the discovery service is down."""
+        service = mock.Mock()
+        mock_discovery_build.side_effect = [
+            httplib2.HttpLib2Error('unreachable'), service]
+
+        self.assertIs(service,
+                      base._create_service_api(mock.Mock(), 'compute', 'v1'))
+        _, kwargs = mock_discovery_build.call_args
+        self.assertTrue(kwargs['cache'].allow_stale)
+        self.assertTrue(mock_logger.warn.called)
+
     def test_multiple_threads_unique_http_objects(self):
         """Validate that each thread gets its unique http object.
 
@@ -285,6 +336,106 @@ class BaseRepositoryTest(unittest_utils.ForsetiTestCase):
 
         self.assertEqual(http_objects[0], http_objects[1])
 
+    def _get_batch_repo(self, responses, batch_sizes):
+        gcp_service_mock = mock.Mock()
+        gcp_service_mock.new_batch_http_request.side_effect = (
+            lambda callback: FakeBatch(callback, responses, batch_sizes))
+        repo = base.GCPRepository(
+            gcp_service=gcp_service_mock,
+            credentials=mock.Mock(spec=client.Credentials),
+            component='fake_component',
+            num_retries=2)
+        repo._build_request = lambda verb, arguments: arguments['resource']
+        return repo
+
+    def test_execute_batch_returns_results_in_order(self):
+        """Each query gets its own response or error, in input order."""
+        not_found = _http_error(404)
+        responses = {'a': [({'id': 'a'}, None)],
+                     'b': [(None, not_found)],
+                     'c': [({'id': 'c'}, None)]}
+        batch_sizes = []
+        repo = self._get_batch_repo(responses, batch_sizes)
+
+        results = repo.execute_batch(
+            'get', [{'resource': r} for r in ['a', 'b', 'c']])
+
+        self.assertEqual(
+            [({'id': 'a'}, None), (None, not_found), ({'id': 'c'}, None)],
+            results)
+        self.assertEqual([3], batch_sizes)
+
+    @mock.patch.object(base.time, 'sleep')
+    def test_execute_batch_retries_failed_queries(self, mock_sleep):
+        """Only the queries with retryable errors are sent again."""
+        unavailable = _http_error(503)
+        responses = {'a': [({'id': 'a'}, None)],
+                     'b': [(None, _http_error(429)), ({'id': 'b'}, None)],
+                     'c': [(None, unavailable), (None, unavailable),
+                           (None, unavailable)]}
+        batch_sizes = []
+        repo = self._get_batch_repo(responses, batch_sizes)
+
+        results = repo.execute_batch(
+            'get', [{'resource': r} for r in ['a', 'b', 'c']])
+
+        self.assertEqual(
+            [({'id': 'a'}, None), ({'id': 'b'}, None), (None, unavailable)],
+            results)
+        self.assertEqual([3, 2, 1], batch_sizes)
+        self.assertEqual(2, mock_sleep.call_count)
+
+    @mock.patch.object(base, 'MAX_BATCH_SIZE', 2)
+    def test_execute_batch_splits_large_batches(self):
+        """No single batch request is larger than MAX_BATCH_SIZE."""
+        resources = ['a', 'b', 'c', 'd', 'e']
+        responses = dict((r, [({'id': r}, None)]) for r in resources)
+        batch_sizes = []
+        repo = self._get_batch_repo(responses, batch_sizes)
+
+        results = repo.execute_batch(
+            'get', [{'resource': r} for r in resources])
+
+        self.assertEqual([({'id': r}, None) for r in resources], results)
+        self.assertEqual([2, 2, 1], batch_sizes)
+
+    @mock.patch.object(base.time, 'sleep')
+    def test_execute_reports_rate_limit_errors(self, mock_sleep):
+        """Rate limit errors slow down the rate limiter and are retried."""
+        mock_rate_limiter = mock.Mock()
+        repo = base.GCPRepository(
+            gcp_service=mock.Mock(),
+            credentials=mock.Mock(spec=client.Credentials),
+            component='fake_component',
+            rate_limiter=mock_rate_limiter)
+        request = mock.Mock()
+        request.execute.side_effect = [
+            errors.HttpError(
+                httplib2.Response({'status': 429, 'retry-after': '3'}), ''),
+            {'id': 'a'}]
+
+        self.assertEqual({'id': 'a'}, repo._execute(request))
+        mock_rate_limiter.on_rate_limited.assert_called_once_with(3.0)
+        mock_rate_limiter.on_success.assert_called_once_with()
+        self.assertEqual(2, mock_rate_limiter.acquire.call_count)
+        self.assertFalse(mock_sleep.called)
+
+    def test_execute_does_not_retry_client_errors(self):
+        """Non retryable errors are raised right away."""
+        mock_rate_limiter = mock.Mock()
+        repo = base.GCPRepository(
+            gcp_service=mock.Mock(),
+            credentials=mock.Mock(spec=client.Credentials),
+            component='fake_component',
+            rate_limiter=mock_rate_limiter)
+        request = mock.Mock()
+        request.execute.side_effect = _http_error(404)
+
+        with self.assertRaises(errors.HttpError):
+            repo._execute(request)
+        self.assertEqual(1, request.execute.call_count)
+        self.assertFalse(mock_rate_limiter.on_rate_limited.called)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -15,6 +15,7 @@
 """Tests the Cloud Resource Manager API client."""
 import json
 import unittest
+import httplib2
 import mock
 from oauth2client import client
 
@@ -123,6 +124,16 @@ class CloudResourceManagerTest(unittest_utils.ForsetiTestCase):
         with self.assertRaises(api_errors.ApiExecutionError):
             self.crm_api_client.get_project_iam_policies('foo', self.project_id)
 
+    def test_get_projects_iam_policies_batch_error(self):
+        """Test a failure of the whole batch is an ApiExecutionError."""
+        projects = self.crm_api_client.repository.projects
+        with mock.patch.object(projects, 'get_iam_policies') as mock_batch:
+            mock_batch.side_effect = httplib2.HttpLib2Error('reset')
+
+            with self.assertRaises(api_errors.ApiExecutionError):
+                self.crm_api_client.get_projects_iam_policies(
+                    'foo', [self.project_id])
+
     def test_get_organization(self):
         """Test get single organization."""
         http_mocks.mock_http_response(fake_crm_responses.GET_ORGANIZATION)
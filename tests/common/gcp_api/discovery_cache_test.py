@@ -0,0 +1,112 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the on-disk discovery document cache."""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from tests import unittest_utils
+from google.cloud.security.common.gcp_api import _discovery_cache
+
+COMPUTE_URL = 'https://www.googleapis.com/discovery/v1/apis/compute/v1/rest'
+COMPUTE_FILE = 'www.googleapis.com_discovery_v1_apis_compute_v1_rest.json'
+
+
+class DiscoveryCacheTest(unittest_utils.ForsetiTestCase):
+    """Test the DiscoveryCache."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.cache = _discovery_cache.DiscoveryCache(
+            self.cache_dir, self.snapshot_dir, ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.snapshot_dir)
+
+    def test_set_then_get(self):
+        """A stored document is returned while fresh."""
+        self.assertIsNone(self.cache.get(COMPUTE_URL))
+
+        self.cache.set(COMPUTE_URL, u'{"name": "compute"}')
+
+        self.assertEqual(u'{"name": "compute"}', self.cache.get(COMPUTE_URL))
+        self.assertEqual(
+            [COMPUTE_FILE],
+            os.listdir(os.path.join(
+                self.cache_dir,
+                'v%s' % _discovery_cache.CACHE_FORMAT_VERSION)))
+
+    def test_expired_document_is_only_returned_when_stale(self):
+        """Expired documents are only used when allowing stale documents."""
+        self.cache.set(COMPUTE_URL, u'{"name": "compute"}')
+        path = os.path.join(self.cache.cache_dir, COMPUTE_FILE)
+        expired = time.time() - 120
+        os.utime(path, (expired, expired))
+
+        self.assertIsNone(self.cache.get(COMPUTE_URL))
+        self.assertEqual(u'{"name": "compute"}',
+                         self.cache.stale().get(COMPUTE_URL))
+
+    def test_snapshot_is_used_when_stale(self):
+        """The bundled snapshot is the last fallback."""
+        with open(os.path.join(self.snapshot_dir, COMPUTE_FILE), 'w') as f:
+            f.write('{"name": "snapshot"}')
+
+        self.assertIsNone(self.cache.get(COMPUTE_URL))
+        self.assertEqual(u'{"name": "snapshot"}',
+                         self.cache.stale().get(COMPUTE_URL))
+
+    def test_unwritable_cache_is_ignored(self):
+        """Failing to store a document does not raise."""
+        cache_file = os.path.join(self.cache_dir, 'file')
+        open(cache_file, 'w').close()
+        cache = _discovery_cache.DiscoveryCache(cache_file)
+
+        cache.set(COMPUTE_URL, u'{}')
+        self.assertIsNone(cache.get(COMPUTE_URL))
+
+
+    def test_cache_dir_is_private(self):
+        """The cache directories are created readable by the user only."""
+        cache_dir = os.path.join(self.cache_dir, 'new')
+        cache = _discovery_cache.DiscoveryCache(cache_dir)
+
+        cache.set(COMPUTE_URL, u'{}')
+
+        self.assertEqual(u'{}', cache.get(COMPUTE_URL))
+        for path in (cache_dir, cache.cache_dir):
+            self.assertEqual(0700, os.stat(path).st_mode & 0777)
+
+    def test_shared_cache_dir_is_not_used(self):
+        """A cache directory writable by others is neither read nor written."""
+        self.cache.set(COMPUTE_URL, u'{"name": "compute"}')
+        os.chmod(self.cache.cache_dir, 0777)
+
+        self.assertIsNone(self.cache.get(COMPUTE_URL))
+        self.assertIsNone(self.cache.stale().get(COMPUTE_URL))
+
+        os.chmod(self.cache.cache_dir, 0700)
+        os.chmod(self.cache_dir, 0757)
+        self.cache.set(COMPUTE_URL, u'{"name": "planted"}')
+        os.chmod(self.cache_dir, 0700)
+        self.assertEqual(u'{"name": "compute"}', self.cache.get(COMPUTE_URL))
+
+
+if __name__ == '__main__':
+    unittest.main()
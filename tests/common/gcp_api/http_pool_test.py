@@ -0,0 +1,139 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the shared http connection pool."""
+import threading
+import unittest
+
+import httplib2
+import mock
+from oauth2client import client
+
+from tests import unittest_utils
+from google.cloud.security.common.gcp_api import _http_pool
+
+
+class FakeHttp(object):
+    """Fake httplib2.Http, recording the requests it made."""
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.connections = {}
+        self.requests = []
+        self.error = None
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                *args, **kwargs):
+        self.requests.append((uri, headers))
+        self.connections[uri] = mock.Mock()
+        if self.error:
+            raise self.error
+        return httplib2.Response({'status': 200}), '{}'
+
+
+@mock.patch.object(_http_pool.httplib2, 'Http', FakeHttp)
+class HttpConnectionPoolTest(unittest_utils.ForsetiTestCase):
+    """Test the HttpConnectionPool."""
+
+    def test_connections_are_reused_per_host(self):
+        """Requests to the same host reuse the same Http object."""
+        pool = _http_pool.HttpConnectionPool()
+
+        pool.request('https://compute.googleapis.com/a')
+        pool.request('https://compute.googleapis.com/b')
+        pool.request('https://storage.googleapis.com/c')
+
+        stats = pool.get_stats()
+        self.assertEqual(2, stats['created'])
+        self.assertEqual(1, stats['reused'])
+        self.assertEqual(2, stats['open'])
+        self.assertEqual({'compute.googleapis.com': 1,
+                          'storage.googleapis.com': 1},
+                         stats['idle_by_host'])
+
+    def test_idle_connection_is_evicted_when_full(self):
+        """The total number of connections is bounded."""
+        pool = _http_pool.HttpConnectionPool(max_connections=1)
+
+        pool.request('https://compute.googleapis.com/a')
+        compute_http = pool.checkout('compute.googleapis.com')
+        pool.checkin('compute.googleapis.com', compute_http)
+        pool.request('https://storage.googleapis.com/b')
+
+        stats = pool.get_stats()
+        self.assertEqual(1, stats['open'])
+        self.assertEqual(1, stats['evicted'])
+        self.assertEqual({}, compute_http.connections)
+
+    def test_least_recently_used_connection_is_evicted(self):
+        """The connection idle for the longest time is evicted first."""
+        pool = _http_pool.HttpConnectionPool(max_connections=2)
+        compute_http = pool.checkout('compute.googleapis.com')
+        storage_http = pool.checkout('storage.googleapis.com')
+        pool.checkin('storage.googleapis.com', storage_http)
+        pool.checkin('compute.googleapis.com', compute_http)
+
+        pool.checkout('iam.googleapis.com')
+
+        self.assertEqual({'compute.googleapis.com': 1},
+                         pool.get_stats()['idle_by_host'])
+
+    def test_failed_request_discards_connection(self):
+        """A connection is not reused after an error."""
+        pool = _http_pool.HttpConnectionPool()
+        http = pool.checkout('compute.googleapis.com')
+        http.error = httplib2.HttpLib2Error('broken')
+        pool.checkin('compute.googleapis.com', http)
+
+        with self.assertRaises(httplib2.HttpLib2Error):
+            pool.request('https://compute.googleapis.com/a')
+
+        stats = pool.get_stats()
+        self.assertEqual(0, stats['open'])
+        self.assertEqual(1, stats['discarded'])
+
+    def test_checkout_waits_when_exhausted(self):
+        """A thread waits for a connection when none can be opened."""
+        pool = _http_pool.HttpConnectionPool(max_connections=1)
+        http = pool.checkout('compute.googleapis.com')
+        results = []
+
+        waiter = threading.Thread(
+            target=lambda: results.append(
+                pool.checkout('compute.googleapis.com')))
+        waiter.start()
+        waiter.join(0.1)
+        self.assertTrue(waiter.is_alive())
+
+        pool.checkin('compute.googleapis.com', http)
+        waiter.join(5)
+        self.assertEqual([http], results)
+        self.assertEqual(1, pool.get_stats()['waited'])
+
+    def test_pooled_http_can_be_authorized(self):
+        """PooledHttp works as an http object authorized by credentials."""
+        pool = _http_pool.HttpConnectionPool()
+        credentials = client.AccessTokenCredentials('fake-token', 'forseti')
+        http = credentials.authorize(_http_pool.PooledHttp(pool))
+
+        response, _ = http.request('https://compute.googleapis.com/a')
+
+        self.assertEqual(200, response.status)
+        pooled = pool.checkout('compute.googleapis.com')
+        uri, headers = pooled.requests[0]
+        self.assertEqual('https://compute.googleapis.com/a', uri)
+        self.assertEqual('Bearer fake-token', headers['Authorization'])
+
+if __name__ == '__main__':
+    unittest.main()
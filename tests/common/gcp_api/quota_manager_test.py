@@ -0,0 +1,145 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the adaptive quota manager."""
+import json
+import unittest
+
+from googleapiclient import errors
+import httplib2
+import mock
+
+from tests import unittest_utils
+from google.cloud.security.common.gcp_api import _quota_manager
+
+
+class FakeClock(object):
+    """A clock that only moves when sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _http_error(status, reason=None, headers=None):
+    response_headers = {'status': status}
+    response_headers.update(headers or {})
+    content = ''
+    if reason:
+        content = json.dumps({'error': {'errors': [{'reason': reason}]}})
+    return errors.HttpError(httplib2.Response(response_headers), content)
+
+
+class TokenBucketTest(unittest_utils.ForsetiTestCase):
+    """Test the TokenBucket."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = _quota_manager.TokenBucket(
+            'compute', 10, 1.0, clock=self.clock.time, sleep=self.clock.sleep)
+
+    def test_burst_up_to_quota_then_wait(self):
+        """The quota of a period can be used at once, then calls are paced."""
+        self.bucket.acquire(10)
+        self.assertEqual([], self.clock.sleeps)
+
+        self.bucket.acquire()
+        self.assertEqual(1, len(self.clock.sleeps))
+        self.assertAlmostEqual(0.1, self.clock.sleeps[0])
+
+    @mock.patch.object(_quota_manager, 'LOGGER')
+    def test_rate_limited_halves_rate_once_per_burst(self, mock_logger):
+        """A burst of rate limit errors only cuts the rate once."""
+        self.bucket.on_rate_limited()
+        self.bucket.on_rate_limited()
+
+        self.assertEqual(5.0, self.bucket.rate)
+        self.assertEqual(2, self.bucket.rate_limited_count)
+        self.assertEqual(1, mock_logger.warn.call_count)
+
+        self.clock.now += _quota_manager.DECREASE_COOLDOWN
+        self.bucket.on_rate_limited()
+        self.assertEqual(2.5, self.bucket.rate)
+
+    @mock.patch.object(_quota_manager, 'LOGGER')
+    def test_rate_never_below_minimum(self, mock_logger):
+        """The rate stops decreasing at the minimum rate."""
+        for _ in range(10):
+            self.clock.now += _quota_manager.DECREASE_COOLDOWN
+            self.bucket.on_rate_limited()
+
+        self.assertEqual(self.bucket.min_rate, self.bucket.rate)
+
+    @mock.patch.object(_quota_manager, 'LOGGER')
+    def test_retry_after_blocks_calls(self, mock_logger):
+        """No call is made before the Retry-After delay has passed."""
+        self.bucket.on_rate_limited(retry_after=30)
+
+        self.bucket.acquire()
+        self.assertEqual([30.0], self.clock.sleeps)
+
+    @mock.patch.object(_quota_manager, 'LOGGER')
+    def test_success_ramps_rate_back_up(self, mock_logger):
+        """Successful calls raise the rate back to the configured quota."""
+        self.bucket.on_rate_limited()
+        self.assertEqual(5.0, self.bucket.rate)
+
+        self.bucket.on_success()
+        self.assertTrue(5.0 < self.bucket.rate < 10.0)
+
+        for _ in range(100):
+            self.bucket.on_success()
+        self.assertEqual(10.0, self.bucket.rate)
+
+
+class QuotaManagerTest(unittest_utils.ForsetiTestCase):
+    """Test the QuotaManager and error helpers."""
+
+    def test_bucket_is_shared_by_api_name(self):
+        """All callers of the same API get the same bucket."""
+        manager = _quota_manager.QuotaManager()
+
+        compute = manager.get_bucket('compute', 20, 1.0)
+        self.assertIs(compute, manager.get_bucket('compute', 5, 1.0))
+        self.assertIsNot(compute, manager.get_bucket('storage', 20, 1.0))
+        self.assertEqual(20.0, compute.max_rate)
+
+    def test_is_rate_limit_error(self):
+        """429s and rate limit 403s are rate limit errors."""
+        self.assertTrue(_quota_manager.is_rate_limit_error(_http_error(429)))
+        self.assertTrue(_quota_manager.is_rate_limit_error(
+            _http_error(403, reason='userRateLimitExceeded')))
+        self.assertFalse(_quota_manager.is_rate_limit_error(
+            _http_error(403, reason='forbidden')))
+        self.assertFalse(_quota_manager.is_rate_limit_error(_http_error(403)))
+        self.assertFalse(_quota_manager.is_rate_limit_error(_http_error(500)))
+        self.assertFalse(_quota_manager.is_rate_limit_error(ValueError()))
+
+    def test_get_retry_after(self):
+        """The Retry-After header is returned in seconds, if set."""
+        self.assertEqual(7.0, _quota_manager.get_retry_after(
+            _http_error(429, headers={'retry-after': '7'})))
+        self.assertIsNone(_quota_manager.get_retry_after(_http_error(429)))
+        self.assertIsNone(_quota_manager.get_retry_after(ValueError()))
+
+
+if __name__ == '__main__':
+    unittest.main()
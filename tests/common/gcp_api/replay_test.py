@@ -0,0 +1,180 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the API record and replay."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from googleapiclient import http
+import httplib2
+import mock
+
+from tests import unittest_utils
+from google.cloud.security.common.gcp_api import _discovery_cache
+from google.cloud.security.common.gcp_api import _http_pool
+from google.cloud.security.common.gcp_api import _replay
+
+PROJECTS_URI = ('https://cloudresourcemanager.googleapis.com/v1/projects'
+                '?alt=json&pageToken=abc')
+POLICY_URI = ('https://cloudresourcemanager.googleapis.com/v1/projects/'
+              '%s:getIamPolicy?alt=json')
+
+
+class FakeHttp(object):
+    """An Http object returning canned responses."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.connections = {}
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=None, connection_type=None):
+        status, content = self.responses.pop(0)
+        return httplib2.Response({'status': status,
+                                  'content-type': 'application/json',
+                                  'x-goog-internal': 'dropped'}), content
+
+
+class ReplayTest(unittest_utils.ForsetiTestCase):
+    """Test the recording and replay of API responses."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.recording = _replay.Recording()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_record_save_and_replay(self):
+        """Recorded responses are replayed in order, after a round trip."""
+        recording_http = _replay.RecordingHttp(
+            FakeHttp([('429', '{"error": {}}'), ('200', '{"projects": []}'),
+                      ('200', '{"access_token": "secret"}')]),
+            self.recording)
+        recording_http.request(PROJECTS_URI)
+        recording_http.request(
+            'https://cloudresourcemanager.googleapis.com/v1/projects'
+            '?pageToken=abc&alt=json')
+        recording_http.request('https://oauth2.googleapis.com/token', 'POST')
+
+        path = os.path.join(self.temp_dir, 'fixture.json')
+        self.recording.save(path)
+        with open(path) as fixture_file:
+            self.assertNotIn('secret', fixture_file.read())
+
+        server = _replay.FakeApiServer(_replay.Recording.load(path),
+                                       latency_scale=0)
+        replay_http = _replay.ReplayHttp(server)
+        statuses = [replay_http.request(PROJECTS_URI)[0].status
+                    for _ in range(3)]
+        self.assertEqual([429, 200, 200], statuses)
+
+        response, content = replay_http.request(PROJECTS_URI)
+        self.assertEqual({'projects': []}, json.loads(content))
+        self.assertNotIn('x-goog-internal', response)
+
+        # Authorization requests get a dummy token.
+        _, content = replay_http.request(
+            'https://oauth2.googleapis.com/token', 'POST')
+        self.assertEqual('replay-access-token',
+                         json.loads(content)['access_token'])
+
+    def test_missing_response_is_not_found(self):
+        """Requests that were not recorded get a 404."""
+        server = _replay.FakeApiServer(self.recording)
+        response, _ = _replay.ReplayHttp(server).request(PROJECTS_URI)
+
+        self.assertEqual(404, response.status)
+        self.assertEqual(1, server.get_stats()['misses'])
+
+    def test_latency_and_error_injection(self):
+        """Responses are delayed and errors injected as configured."""
+        self.recording.add('GET', PROJECTS_URI, None, 200, {}, '{}', 0.2)
+        sleep = mock.MagicMock()
+
+        server = _replay.FakeApiServer(self.recording, latency_scale=0.5,
+                                       sleep=sleep)
+        server.request(PROJECTS_URI)
+        sleep.assert_called_once_with(0.1)
+
+        server = _replay.FakeApiServer(self.recording, fixed_latency=0,
+                                       error_rate=1.0, seed=1)
+        response, _ = server.request(PROJECTS_URI)
+        self.assertEqual(429, response.status)
+        self.assertEqual(1, server.get_stats()['injected_errors'])
+
+    def test_batch_requests_are_recorded_and_replayed_per_request(self):
+        """Batched requests are replayed regardless of their batch."""
+        for project_id in ('p1', 'p2'):
+            self.recording.add('POST', POLICY_URI % project_id, '{}', 200, {},
+                               json.dumps({'etag': project_id}), 0.0)
+        live_http = _replay.ReplayHttp(_replay.FakeApiServer(self.recording))
+
+        # Record a batch served by the live server.
+        second_recording = _replay.Recording()
+        recording_http = _replay.RecordingHttp(live_http, second_recording)
+        results = self._execute_batch(recording_http, ['p1', 'p2'])
+        self.assertEqual({'0': {'etag': 'p1'}, '1': {'etag': 'p2'}}, results)
+        self.assertEqual(sorted(self.recording.interactions),
+                         sorted(second_recording.interactions))
+
+        # Replay the requests in a different batch.
+        replay_http = _replay.ReplayHttp(
+            _replay.FakeApiServer(second_recording))
+        results = self._execute_batch(replay_http, ['p2'])
+        self.assertEqual({'0': {'etag': 'p2'}}, results)
+
+    @staticmethod
+    def _execute_batch(http_obj, project_ids):
+        results = {}
+
+        def callback(request_id, response, exception):
+            if exception:
+                raise exception
+            results[request_id] = response
+
+        def postproc(unused_resp, content):
+            return json.loads(content)
+
+        batch = http.BatchHttpRequest(callback=callback)
+        for i, project_id in enumerate(project_ids):
+            request = http.HttpRequest(
+                http_obj, postproc, POLICY_URI % project_id, method='POST',
+                body='{}', headers={'content-type': 'application/json'})
+            batch.add(request, request_id=str(i))
+        batch.execute(http=http_obj)
+        return results
+
+    @mock.patch.object(_discovery_cache, 'DISCOVERY_CACHE')
+    def test_start_replay(self, mock_cache):
+        """Replay serves the pool requests and the discovery documents."""
+        self.recording.add('GET', PROJECTS_URI, None, 200, {}, '{}', 0.0)
+        self.recording.add_discovery_document('https://discovery', 'doc')
+        pool = _http_pool.HttpConnectionPool()
+
+        server = _replay.start_replay(self.recording, pool=pool,
+                                      latency_scale=0)
+        response, _ = pool.request(PROJECTS_URI)
+
+        self.assertEqual(200, response.status)
+        self.assertEqual(1, server.get_stats()['requests'])
+        self.assertEqual(
+            'doc', _discovery_cache.DISCOVERY_CACHE.get('https://discovery'))
+
+
+if __name__ == '__main__':
+    unittest.main()
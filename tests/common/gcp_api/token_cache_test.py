@@ -0,0 +1,128 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the shared OAuth access token cache."""
+import datetime
+import threading
+import unittest
+
+import mock
+import oauth2client
+from oauth2client import client
+
+from tests import unittest_utils
+from google.cloud.security.common.gcp_api import _token_cache
+
+
+class FakeCredentials(client.OAuth2Credentials):
+    """Credentials counting their token refreshes."""
+
+    def __init__(self, client_id='fake_client_id', scopes='foo'):
+        super(FakeCredentials, self).__init__(
+            None, client_id, 'secret', 'refresh_token', None,
+            oauth2client.GOOGLE_TOKEN_URI, 'forseti', scopes=scopes)
+        self.refresh_count = 0
+        self.refresh_started = threading.Event()
+        self.refresh_wait = None
+
+    def _refresh(self, http_request):
+        self.refresh_started.set()
+        if self.refresh_wait:
+            self.refresh_wait.wait(5)
+        self.refresh_count += 1
+        self.access_token = 'token%s' % self.refresh_count
+        self.token_expiry = (datetime.datetime.utcnow() +
+                             datetime.timedelta(hours=1))
+
+
+class TokenCacheTest(unittest_utils.ForsetiTestCase):
+    """Test the TokenCache."""
+
+    def setUp(self):
+        self.cache = _token_cache.TokenCache()
+        # Don't start the background refresher thread.
+        self.cache._start_refresher = mock.Mock()
+
+    def test_equivalent_credentials_are_shared(self):
+        """Credentials for the same account and scopes are shared."""
+        credentials = FakeCredentials()
+
+        self.assertIs(credentials, self.cache.share(credentials))
+        self.assertIs(credentials, self.cache.share(FakeCredentials()))
+        other_scopes = FakeCredentials(scopes='bar')
+        self.assertIs(other_scopes, self.cache.share(other_scopes))
+        other_account = FakeCredentials(client_id='other')
+        self.assertIs(other_account, self.cache.share(other_account))
+
+    def test_non_oauth_credentials_are_not_shared(self):
+        """Credentials not using oauth2client are returned as-is."""
+        credentials = mock.Mock()
+
+        self.assertIs(credentials, self.cache.share(credentials))
+        self.assertFalse(self.cache._start_refresher.called)
+
+    def test_concurrent_refreshes_are_coalesced(self):
+        """Threads failing with the same token only refresh it once."""
+        credentials = self.cache.share(FakeCredentials())
+        credentials.refresh_wait = threading.Event()
+
+        first = threading.Thread(target=credentials._refresh,
+                                 args=(mock.Mock(),))
+        first.start()
+        credentials.refresh_started.wait(5)
+        second = threading.Thread(target=credentials._refresh,
+                                  args=(mock.Mock(),))
+        second.start()
+        credentials.refresh_wait.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(1, credentials.refresh_count)
+        self.assertEqual('token1', credentials.access_token)
+
+    def test_refresh_expiring_tokens(self):
+        """Only fetched tokens close to their expiry are refreshed."""
+        unused = self.cache.share(FakeCredentials(client_id='unused'))
+        unused.token_expiry = datetime.datetime.utcnow()
+        credentials = self.cache.share(FakeCredentials())
+        credentials._refresh(mock.Mock())
+
+        self.cache.refresh_expiring()
+        self.assertEqual(1, credentials.refresh_count)
+        self.assertEqual(0, unused.refresh_count)
+
+        credentials.token_expiry = (
+            datetime.datetime.utcnow() + datetime.timedelta(minutes=1))
+        with mock.patch.object(_token_cache, 'MIN_REFRESH_INTERVAL', 0):
+            self.cache.refresh_expiring()
+        self.assertEqual(2, credentials.refresh_count)
+        self.assertEqual('token2', credentials.access_token)
+
+    @mock.patch.object(_token_cache, 'LOGGER')
+    def test_background_refresh_errors_are_logged(self, mock_logger):
+        """A failed background refresh does not raise."""
+        credentials = self.cache.share(FakeCredentials())
+        credentials._refresh(mock.Mock())
+        credentials.token_expiry = datetime.datetime.utcnow()
+        entry = self.cache._entries.values()[0]
+        entry._refresh_method = mock.Mock(
+            side_effect=client.HttpAccessTokenRefreshError('failed'))
+        entry.last_refresh = 0
+
+        self.cache.refresh_expiring()
+        self.assertTrue(mock_logger.warn.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
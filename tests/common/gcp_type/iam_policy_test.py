@@ -23,6 +23,7 @@ from google.cloud.security.common.gcp_type.errors import InvalidIamPolicyMemberE
 from google.cloud.security.common.gcp_type.iam_policy import IamPolicy
 from google.cloud.security.common.gcp_type.iam_policy import IamPolicyBinding
 from google.cloud.security.common.gcp_type.iam_policy import IamPolicyMember
+from google.cloud.security.common.gcp_type.iam_policy import IamPolicyMemberMatcher
 
 
 def _get_member_list(members):
@@ -99,6 +100,36 @@ class IamPolicyTest(ForsetiTestCase):
             'serviceAccount:someone@.gserviceaccount.com'))
 
 
+    def test_member_matcher_matches_like_members(self):
+        """Test the member matcher finds the members that match a member."""
+        rule_members = [IamPolicyMember.create_from(m) for m in
+                        self.members + ['user:Test-User@Company.com',
+                                        'user:*@company.com',
+                                        'domain:company.com',
+                                        'user:test-*@company.com']]
+        matcher = IamPolicyMemberMatcher(rule_members)
+
+        for test_member in self.test_members + ['domain:company.com',
+                                                'user:@company.com',
+                                                'user:TEST-x@company.com']:
+            policy_member = IamPolicyMember.create_from(test_member)
+            expected = [
+                index for index, rule_member in enumerate(rule_members)
+                if rule_member.type == IamPolicyMember.ALL_USERS or
+                (rule_member.type == policy_member.type and
+                 rule_member.name_pattern and policy_member.name and
+                 rule_member.name_pattern.match(policy_member.name))]
+            self.assertEqual(sorted(expected),
+                             sorted(matcher.find_matches(test_member)),
+                             test_member)
+            self.assertEqual(bool(expected), matcher.matches(policy_member))
+
+    def test_member_matcher_without_members(self):
+        """Test the member matcher without members matches nothing."""
+        matcher = IamPolicyMemberMatcher([])
+        self.assertFalse(matcher.matches(self.test_members[0]))
+        self.assertEqual([], matcher.find_matches(self.test_members[0]))
+
     def test_member_invalid_type_raises(self):
         """Test that invalid member type raises exception."""
         with self.assertRaises(InvalidIamPolicyMemberError):
@@ -38,6 +38,22 @@ class InventoryLoaderTest(ForsetiTestCase):
         self.fake_timestamp = '123456'
         self.mock_logger = mock_logger
 
+    def test_dao_map_creates_daos_on_first_use(self):
+        """DAOs are only created when first used, then shared."""
+        mock_dao_class = mock.MagicMock()
+        dao_map = inventory_loader.LazyDaoMap(
+            {'dao': mock_dao_class}, {'db_host': 'foo'})
+        self.assertFalse(mock_dao_class.called)
+
+        first_dao = dao_map.get('dao')
+        self.assertIs(first_dao, dao_map['dao'])
+        mock_dao_class.assert_called_once_with({'db_host': 'foo'})
+
+        self.assertIsNone(dao_map.get('missing_dao'))
+        self.assertNotIn('missing_dao', dao_map)
+        with self.assertRaises(KeyError):
+            dao_map['missing_dao']
+
 
 if __name__ == '__main__':
     unittest.main()
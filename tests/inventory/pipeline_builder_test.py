@@ -161,6 +161,34 @@ class PipelineBuilderTest(ForsetiTestCase):
             fake_runnable_pipelines.CORE_RESOURCES_ARE_ENABLED,
             actual_runnable_pipelines)
 
+    def testDependencyMapPointsToNearestRunnableAncestor(self):
+        # Enabled: CloudSQL, Firewall Rules, Group Members
+        my_pipeline_builder = self._setup_pipeline_builder(
+            'inventory_three_resources_are_enabled_group_members.yaml')
+
+        actual_runnable_pipelines = my_pipeline_builder.build()
+
+        pipelines_by_name = {pipeline.RESOURCE_NAME: pipeline
+                             for pipeline in actual_runnable_pipelines}
+        expected_parents = {
+            'organizations': None,
+            'folders': 'organizations',
+            'projects': 'folders',
+            'cloudsql': 'projects',
+            'firewall_rules': 'projects',
+            'groups': 'organizations',
+            'group_members': 'groups',
+        }
+        self.assertEquals(len(expected_parents),
+                          len(my_pipeline_builder.dependency_map))
+        for name, parent_name in expected_parents.iteritems():
+            parent = my_pipeline_builder.dependency_map[
+                pipelines_by_name[name]]
+            if parent_name is None:
+                self.assertIsNone(parent)
+            else:
+                self.assertEquals(parent_name, parent.RESOURCE_NAME)
+
     def testCanGetApiThatIsAlreadyInitialized(self):
         my_pipeline_builder = pipeline_builder.PipelineBuilder(
             FAKE_TIMESTAMP, 'foo_path', mock.MagicMock(),
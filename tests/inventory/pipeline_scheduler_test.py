@@ -0,0 +1,165 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the pipeline scheduler."""
+
+import threading
+
+import mock
+import unittest
+
+from tests.unittest_utils import ForsetiTestCase
+from google.cloud.security.inventory import errors as inventory_errors
+from google.cloud.security.inventory import pipeline_scheduler
+
+
+class FakePipeline(object):
+    """A fake pipeline that records the order it was run in."""
+
+    def __init__(self, name, run_log, dao=None, error=None, started=None,
+                 wait_for=None):
+        self.name = name
+        self.run_log = run_log
+        self.dao = dao or mock.MagicMock()
+        self.error = error
+        self.started = started
+        self.wait_for = wait_for
+        self.indexed = False
+
+    def add_snapshot_indexes(self):
+        self.indexed = True
+
+    def run(self):
+        if self.started:
+            self.started.set()
+        if self.wait_for:
+            self.wait_for.wait(5)
+        self.run_log.append(self.name)
+        if self.error:
+            raise self.error
+
+
+class PipelineSchedulerTest(ForsetiTestCase):
+    """Tests for the pipeline scheduler."""
+
+    def setUp(self):
+        self.run_log = []
+
+    def test_parent_runs_before_children(self):
+        """Children only run after their parent completed."""
+        orgs = FakePipeline('organizations', self.run_log)
+        projects = FakePipeline('projects', self.run_log)
+        instances = FakePipeline('instances', self.run_log)
+        buckets = FakePipeline('buckets', self.run_log)
+        pipelines = [orgs, projects, instances, buckets]
+        dependency_map = {orgs: None, projects: orgs,
+                          instances: projects, buckets: projects}
+
+        scheduler = pipeline_scheduler.PipelineScheduler(
+            pipelines, dependency_map, max_workers=4)
+        run_statuses = scheduler.run()
+
+        self.assertEquals([True, True, True, True], run_statuses)
+        self.assertEquals(['organizations', 'projects'], self.run_log[:2])
+        self.assertItemsEqual(['instances', 'buckets'], self.run_log[2:])
+        self.assertTrue(all(pipeline.indexed for pipeline in pipelines))
+
+    def test_siblings_run_concurrently(self):
+        """Independent siblings are run at the same time."""
+        first_started = threading.Event()
+        second_started = threading.Event()
+        projects = FakePipeline('projects', self.run_log)
+        instances = FakePipeline('instances', self.run_log,
+                                 started=first_started,
+                                 wait_for=second_started)
+        buckets = FakePipeline('buckets', self.run_log,
+                               started=second_started,
+                               wait_for=first_started)
+        pipelines = [projects, instances, buckets]
+        dependency_map = {projects: None, instances: projects,
+                          buckets: projects}
+
+        scheduler = pipeline_scheduler.PipelineScheduler(
+            pipelines, dependency_map, max_workers=2)
+        run_statuses = scheduler.run()
+
+        self.assertEquals([True, True, True], run_statuses)
+        self.assertTrue(first_started.is_set())
+        self.assertTrue(second_started.is_set())
+
+    def test_pipelines_sharing_a_dao_are_concurrent(self):
+        """Pipelines with the same dao can run at the same time."""
+        shared_dao = mock.MagicMock()
+        projects = FakePipeline('projects', self.run_log)
+        buckets = FakePipeline('buckets', self.run_log, dao=shared_dao)
+        firewall_rules = FakePipeline('firewall_rules', self.run_log,
+                                      dao=shared_dao)
+        pipelines = [projects, buckets, firewall_rules]
+        dependency_map = {projects: None, buckets: projects,
+                          firewall_rules: projects}
+
+        scheduler = pipeline_scheduler.PipelineScheduler(
+            pipelines, dependency_map, max_workers=3)
+        projects.status = 'SUCCESS'
+        ready = scheduler._find_ready_pipelines(
+            [buckets, firewall_rules], set([projects]), {})
+        self.assertEquals([buckets, firewall_rules], ready)
+
+        self.assertEquals([True, True, True], scheduler.run())
+
+    @mock.patch.object(pipeline_scheduler, 'LOGGER')
+    def test_children_of_failed_pipeline_are_skipped(self, mock_logger):
+        """A failed pipeline fails all its descendants without running them."""
+        orgs = FakePipeline('organizations', self.run_log)
+        groups = FakePipeline('groups', self.run_log)
+        projects = FakePipeline(
+            'projects', self.run_log,
+            error=inventory_errors.LoadDataPipelineError('failed'))
+        buckets = FakePipeline('buckets', self.run_log)
+        buckets_acls = FakePipeline('buckets_acls', self.run_log)
+        pipelines = [orgs, groups, projects, buckets, buckets_acls]
+        dependency_map = {orgs: None, groups: orgs, projects: orgs,
+                          buckets: projects, buckets_acls: buckets}
+
+        scheduler = pipeline_scheduler.PipelineScheduler(
+            pipelines, dependency_map, max_workers=2)
+        run_statuses = scheduler.run()
+
+        self.assertEquals([True, True, False, False, False], run_statuses)
+        self.assertItemsEqual(['organizations', 'groups', 'projects'],
+                              self.run_log)
+        self.assertEquals('FAILURE', buckets_acls.status)
+        self.assertFalse(projects.indexed)
+        self.assertTrue(mock_logger.error.called)
+
+    @mock.patch.object(pipeline_scheduler, 'LOGGER')
+    def test_unexpected_error_fails_pipeline(self, mock_logger):
+        """Any error raised by a pipeline marks it as failed."""
+        orgs = FakePipeline('organizations', self.run_log,
+                            error=ValueError('unexpected'))
+
+        scheduler = pipeline_scheduler.PipelineScheduler([orgs], {orgs: None})
+
+        self.assertEquals([False], scheduler.run())
+        self.assertEquals('FAILURE', orgs.status)
+
+    def test_no_pipelines(self):
+        """Nothing to run returns no statuses."""
+        scheduler = pipeline_scheduler.PipelineScheduler([], {})
+
+        self.assertEquals([], scheduler.run())
+
+
+if __name__ == '__main__':
+    unittest.main()
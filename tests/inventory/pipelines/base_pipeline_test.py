@@ -97,6 +97,124 @@ class BasePipelineTest(ForsetiTestCase):
         self.assertEquals(1, base_pipeline.LOGGER.error.call_count)
         self.assertIsNone(self.pipeline.count)
 
+    @mock.patch.object(base_pipeline, 'LOGGER')
+    def test_fan_out_returns_results_in_order(self, mock_logger):
+        """Test fan out results keep the order of the items."""
+        items = range(50)
+
+        results, errors = self.pipeline._fan_out(lambda i: i * 2, items)
+
+        self.assertEquals([(i, i * 2) for i in items], results)
+        self.assertEquals({}, errors)
+        self.assertFalse(mock_logger.warn.called)
+
+    @mock.patch.object(base_pipeline, 'LOGGER')
+    def test_fan_out_collects_api_errors_per_item(self, mock_logger):
+        """Test fan out collects the api errors of each item."""
+        not_enabled = api_errors.ApiNotEnabledError('url', mock.MagicMock())
+        execution_error = api_errors.ApiExecutionError(
+            'project2', mock.MagicMock())
+
+        def fetch(item):
+            if item == 'project1':
+                raise not_enabled
+            if item == 'project2':
+                raise execution_error
+            return [item]
+
+        results, errors = self.pipeline._fan_out(
+            fetch, ['project1', 'project2', 'project3'])
+
+        self.assertEquals([('project3', ['project3'])], results)
+        self.assertEquals({'project1': not_enabled,
+                           'project2': execution_error}, errors)
+        self.assertEquals(1, mock_logger.error.call_count)
+
+    def test_fan_out_raises_unexpected_errors(self):
+        """Test fan out does not hide unexpected errors."""
+        def fetch(item):
+            raise ValueError(item)
+
+        with self.assertRaises(ValueError):
+            self.pipeline._fan_out(fetch, ['project1'])
+
+    def test_batch_flushes_on_max_rows(self):
+        """Test rows are batched by the maximum number of rows."""
+        self.pipeline.LOAD_BATCH_MAX_ROWS = 2
+        rows = ({'id': i} for i in range(5))
+
+        batches = list(self.pipeline._batch(rows))
+
+        self.assertEquals([[{'id': 0}, {'id': 1}],
+                           [{'id': 2}, {'id': 3}],
+                           [{'id': 4}]], batches)
+
+    def test_batch_flushes_on_max_bytes(self):
+        """Test rows are batched by their estimated size."""
+        self.pipeline.LOAD_BATCH_MAX_BYTES = 10
+        rows = [{'name': 'x' * 6, 'raw': None}, {'name': 'y' * 6},
+                {'name': u'z'}]
+
+        batches = list(self.pipeline._batch(rows))
+
+        self.assertEquals([rows[:2], rows[2:]], batches)
+
+    def test_load_in_batches(self):
+        """Test each batch is loaded separately."""
+        self.pipeline.LOAD_BATCH_MAX_ROWS = 2
+        rows = ({'id': i} for i in range(3))
+
+        row_count = self.pipeline._load_in_batches('foo_resource', rows)
+
+        self.assertEquals(3, row_count)
+        self.assertEquals(
+            [mock.call('foo_resource', self.pipeline.cycle_timestamp,
+                       [{'id': 0}, {'id': 1}]),
+             mock.call('foo_resource', self.pipeline.cycle_timestamp,
+                       [{'id': 2}])],
+            self.pipeline.dao.load_data.call_args_list)
+
+    @mock.patch.object(base_pipeline, 'LOGGER')
+    def test_load_in_batches_without_data(self, mock_logger):
+        """Test nothing is loaded when there is no data."""
+        row_count = self.pipeline._load_in_batches('foo_resource', iter([]))
+
+        self.assertEquals(0, row_count)
+        self.assertFalse(self.pipeline.dao.load_data.called)
+        self.assertTrue(mock_logger.warn.called)
+
+    @mock.patch.object(base_pipeline, 'LOGGER')
+    def test_add_snapshot_indexes(self, mock_logger):
+        """Test the tables loaded by the pipeline are indexed."""
+        self.pipeline._load('foo_resource', [{'id': 1}])
+        self.pipeline._load('bar_resource', [{'id': 1}])
+        self.pipeline._load('empty_resource', [])
+        self.pipeline.dao.add_snapshot_indexes.side_effect = [
+            data_access_errors.MySQLError(
+                'bar_resource', Exception('error')), 1]
+
+        self.pipeline.add_snapshot_indexes()
+
+        self.assertEquals(
+            [mock.call('bar_resource', self.pipeline.cycle_timestamp),
+             mock.call('foo_resource', self.pipeline.cycle_timestamp)],
+            self.pipeline.dao.add_snapshot_indexes.call_args_list)
+        self.assertTrue(mock_logger.warn.called)
+
+    def test_iter_fan_out_is_lazy(self):
+        """Test fan out only fetches ahead of the consumer by a few items."""
+        self.pipeline.FAN_OUT_WORKERS = 1
+        fetched = []
+
+        def fetch(item):
+            fetched.append(item)
+            return item
+
+        results = self.pipeline._iter_fan_out(fetch, iter(range(100)))
+        self.assertEquals((0, 0), next(results))
+        self.assertLessEqual(len(fetched), 3)
+        results.close()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -15,7 +15,6 @@
 """Tests the load_group_members_pipeline."""
 
 import json
-import math
 
 from tests.unittest_utils import ForsetiTestCase
 import mock
@@ -70,9 +69,27 @@ class LoadGroupMembersPipelineTest(ForsetiTestCase):
         """Test that api is called to retrieve projects."""
         mock_dao_fetch.return_value = ['a']
 
-        self.pipeline._retrieve(mock_dao_fetch.return_value)
+        list(self.pipeline._retrieve(mock_dao_fetch.return_value))
         self.pipeline.api_client.get_group_members.assert_called_with('a')
 
+    def test_retrieve_collects_failed_groups(self):
+        """Test that groups which can't be retrieved are collected."""
+        def get_group_members(group_id):
+            if group_id == 'a222':
+                raise api_errors.ApiExecutionError(group_id, mock.MagicMock())
+            return [{'id': group_id}]
+        self.mock_admin_client.get_group_members.side_effect = (
+            get_group_members)
+
+        errors = {}
+        results = list(self.pipeline._retrieve(
+            ['a111', 'a222', 'a333'], errors))
+
+        self.assertEquals(
+            [('a111', [{'id': 'a111'}]), ('a333', [{'id': 'a333'}])],
+            results)
+        self.assertEquals(['a222'], errors.keys())
+
     @mock.patch.object(
         inventory_util, 'can_inventory_groups')
     @mock.patch.object(
@@ -91,7 +108,6 @@ class LoadGroupMembersPipelineTest(ForsetiTestCase):
             mock_load, mock_get_loaded_count, mock_can_inventory_groups):
         """Test that the subroutines are called by run."""
 
-        self.pipeline.GROUP_CHUNK_SIZE = 3
         self.mock_dao.select_group_ids.return_value = (
             fake_group_members.FAKE_GROUP_IDS)
         mock_can_inventory_groups.return_value = True
@@ -99,26 +115,51 @@ class LoadGroupMembersPipelineTest(ForsetiTestCase):
         mock_transform.return_value = fake_group_members.EXPECTED_LOADABLE_GROUP_MEMBERS
         self.pipeline.run()
 
-        expected_call_count = math.ceil(
-            float(len(fake_group_members.FAKE_GROUP_IDS))/
-            float(self.pipeline.GROUP_CHUNK_SIZE))
-        self.assertEquals(expected_call_count, mock_retrieve.call_count)
-        self.assertEquals(expected_call_count, mock_transform.call_count)
-        self.assertEquals(expected_call_count, mock_load.call_count)
+        # All the groups are crawled at once, and loaded in a single batch.
+        self.assertEquals(1, mock_retrieve.call_count)
+        self.assertEquals(
+            fake_group_members.FAKE_GROUP_IDS,
+            mock_retrieve.call_args[0][0])
 
-        for i in range(len(fake_group_members.EXPECTED_CALL_LIST)):
-            args, kwargs = mock_retrieve.call_args_list[i]
-            self.assertEquals(fake_group_members.EXPECTED_CALL_LIST[i], args[0])
-
-        mock_transform.assert_called_with(
+        mock_transform.assert_called_once_with(
             fake_group_members.FAKE_GROUPS_MEMBERS_MAP)
 
-        mock_load.assert_called_with(
+        mock_load.assert_called_once_with(
             self.pipeline.RESOURCE_NAME,
             fake_group_members.EXPECTED_LOADABLE_GROUP_MEMBERS)
 
-        mock_get_loaded_count.assert_called_once
+        mock_get_loaded_count.assert_called_once_with()
 
+    @mock.patch.object(
+        load_group_members_pipeline.LoadGroupMembersPipeline,
+        '_get_loaded_count')
+    @mock.patch.object(
+        load_group_members_pipeline.LoadGroupMembersPipeline,
+        '_load')
+    def test_failed_groups_are_retried(self, mock_load, mock_get_loaded_count):
+        """Test that only the failed groups are retried, then reported."""
+        calls = []
+        def get_group_members(group_id):
+            calls.append(group_id)
+            if group_id == 'a222' or (group_id == 'a333' and
+                                      calls.count(group_id) == 1):
+                raise api_errors.ApiExecutionError(group_id, mock.MagicMock())
+            return [{'id': group_id}]
+        self.mock_admin_client.get_group_members.side_effect = (
+            get_group_members)
+        self.mock_dao.select_group_ids.return_value = ['a111', 'a222', 'a333']
+
+        with self.assertRaises(inventory_errors.LoadDataPipelineError):
+            self.pipeline.run()
+
+        self.assertEquals(['a111', 'a222', 'a222', 'a333', 'a333'],
+                          sorted(calls))
+        self.assertEquals(['a222'], self.pipeline.failed_group_ids)
+        self.assertEquals(2, mock_load.call_count)
+        loaded_group_ids = [row['group_id']
+                            for args, _ in mock_load.call_args_list
+                            for row in args[1]]
+        self.assertEquals(['a111', 'a333'], loaded_group_ids)
 
 if __name__ == '__main__':
     unittest.main()
@@ -65,7 +65,7 @@ class LoadInstancesPipelineTest(ForsetiTestCase):
     def test_can_transform_instances(self):
         """Test transform function works."""
         actual = self.pipeline._transform(
-            fake_instances.FAKE_PROJECT_INSTANCES_MAP)
+            fake_instances.FAKE_PROJECT_INSTANCES_MAP.iteritems())
         self.assertEquals(
             fake_instances.EXPECTED_LOADABLE_INSTANCES,
             list(actual))
@@ -76,7 +76,7 @@ class LoadInstancesPipelineTest(ForsetiTestCase):
             self, mock_get_projects, mock_conn):
         """Test that API is called to retrieve instances."""
         mock_get_projects.return_value = self.projects
-        self.pipeline._retrieve()
+        list(self.pipeline._retrieve())
         self.assertEqual(
             len(self.project_ids),
             self.pipeline.api_client.get_instances.call_count)
@@ -87,12 +87,14 @@ class LoadInstancesPipelineTest(ForsetiTestCase):
             self, mock_get_projects, mock_conn):
         """Test _retrieve() data is correct."""
         mock_get_projects.return_value = self.projects
+        # A single worker keeps the mocked responses in call order.
+        self.pipeline.FAN_OUT_WORKERS = 1
 
         self.pipeline.api_client.get_instances = mock.MagicMock(
             side_effect=[fake_instances.FAKE_API_RESPONSE1,
                          fake_instances.FAKE_API_RESPONSE2])
 
-        actual = self.pipeline._retrieve()
+        actual = dict(self.pipeline._retrieve())
 
         self.assertEquals(
             fake_instances.FAKE_PROJECT_INSTANCES_MAP,
@@ -108,8 +110,8 @@ class LoadInstancesPipelineTest(ForsetiTestCase):
         mock_get_projects.return_value = self.projects
         self.pipeline.api_client.get_instances.side_effect = (
             api_errors.ApiExecutionError(self.resource_name, mock.MagicMock()))
-        results = self.pipeline._retrieve()
-        self.assertEqual({}, results)
+        results = list(self.pipeline._retrieve())
+        self.assertEqual([], results)
         self.assertEqual(
             len(self.project_ids),
             mock_logger.error.call_count)
@@ -16,7 +16,6 @@
 
 import unittest
 import mock
-import ratelimiter
 
 from tests.inventory.pipelines.test_data import fake_configs
 from tests.inventory.pipelines.test_data import fake_iam_policies
@@ -62,24 +61,41 @@ class LoadProjectsIamPoliciesPipelineTest(ForsetiTestCase):
 
         self.pipeline.dao.get_project_numbers.return_value = (
             self.FAKE_PROJECT_NUMBERS)
-        self.pipeline._retrieve()
+        self.pipeline.api_client.get_projects_iam_policies.return_value = [
+            (self.FAKE_PROJECT_NUMBERS[0], {'bindings': []}, None),
+            (self.FAKE_PROJECT_NUMBERS[1], {}, None)]
+        results = list(self.pipeline._retrieve())
 
         self.pipeline.dao.get_project_numbers.assert_called_once_with(
             self.pipeline.RESOURCE_NAME, self.pipeline.cycle_timestamp)
 
+        mock_get_policies = self.pipeline.api_client.get_projects_iam_policies
+        mock_get_policies.assert_called_once_with(
+            self.pipeline.RESOURCE_NAME, tuple(self.FAKE_PROJECT_NUMBERS))
         self.assertEquals(
-            2, self.pipeline.api_client.get_project_iam_policies.call_count)
-        called_args, called_kwargs = (
-            self.pipeline.api_client.get_project_iam_policies.call_args_list[0])
-        expected_args = (self.pipeline.RESOURCE_NAME,
-                         self.FAKE_PROJECT_NUMBERS[0])
-        self.assertEquals(expected_args, called_args)
+            [{'project_number': self.FAKE_PROJECT_NUMBERS[0],
+              'iam_policy': {'bindings': []}}],
+            results)
 
-        called_args, called_kwargs = (
-            self.pipeline.api_client.get_project_iam_policies.call_args_list[1])
-        expected_args = (self.pipeline.RESOURCE_NAME,
-                         self.FAKE_PROJECT_NUMBERS[1])
-        self.assertEquals(expected_args, called_args)
+    @mock.patch.object(
+        load_projects_iam_policies_pipeline._base_repository,
+        'MAX_BATCH_SIZE', 1)
+    def test_projects_are_split_into_batches(self):
+        """Test that each batched request is limited to MAX_BATCH_SIZE."""
+
+        self.pipeline.dao.get_project_numbers.return_value = (
+            self.FAKE_PROJECT_NUMBERS)
+        self.pipeline.api_client.get_projects_iam_policies.return_value = []
+        # A single worker keeps the mocked responses in call order.
+        self.pipeline.FAN_OUT_WORKERS = 1
+        list(self.pipeline._retrieve())
+
+        self.assertEquals(
+            [mock.call(self.pipeline.RESOURCE_NAME,
+                       (self.FAKE_PROJECT_NUMBERS[0],)),
+             mock.call(self.pipeline.RESOURCE_NAME,
+                       (self.FAKE_PROJECT_NUMBERS[1],))],
+            self.pipeline.api_client.get_projects_iam_policies.call_args_list)
 
     def test_dao_error_is_handled_when_retrieving(self):
         """Test that exceptions are handled when retrieving."""
@@ -101,12 +117,29 @@ class LoadProjectsIamPoliciesPipelineTest(ForsetiTestCase):
         """
         self.pipeline.dao.get_project_numbers.return_value = (
             self.FAKE_PROJECT_NUMBERS)
-        self.pipeline.api_client.get_project_iam_policies.side_effect = (
+        self.pipeline.api_client.get_projects_iam_policies.side_effect = (
             api_errors.ApiExecutionError('error error', mock.MagicMock()))
 
-        results = self.pipeline._retrieve()
+        results = list(self.pipeline._retrieve())
         self.assertEqual([], results)
-        self.assertEqual(2, mock_logger.error.call_count)
+        self.assertEqual(1, mock_logger.error.call_count)
+
+    @mock.patch.object(load_projects_iam_policies_pipeline, 'LOGGER')
+    def test_project_error_is_handled_when_retrieving(self, mock_logger):
+        """Test that a single failed project in a batch is skipped."""
+        self.pipeline.dao.get_project_numbers.return_value = (
+            self.FAKE_PROJECT_NUMBERS)
+        self.pipeline.api_client.get_projects_iam_policies.return_value = [
+            (self.FAKE_PROJECT_NUMBERS[0], None,
+             api_errors.ApiExecutionError('error error', mock.MagicMock())),
+            (self.FAKE_PROJECT_NUMBERS[1], {'bindings': []}, None)]
+
+        results = list(self.pipeline._retrieve())
+        self.assertEqual(
+            [{'project_number': self.FAKE_PROJECT_NUMBERS[1],
+              'iam_policy': {'bindings': []}}],
+            results)
+        self.assertEqual(1, mock_logger.error.call_count)
 
     @mock.patch.object(
         load_projects_iam_policies_pipeline.LoadProjectsIamPoliciesPipeline,
@@ -153,6 +186,69 @@ class LoadProjectsIamPoliciesPipelineTest(ForsetiTestCase):
 
         mock_get_loaded_count.assert_called_once
 
+    @mock.patch.object(
+        load_projects_iam_policies_pipeline.LoadProjectsIamPoliciesPipeline,
+        '_get_loaded_count')
+    @mock.patch.object(
+        load_projects_iam_policies_pipeline.LoadProjectsIamPoliciesPipeline,
+        '_load')
+    @mock.patch.object(
+        load_projects_iam_policies_pipeline.LoadProjectsIamPoliciesPipeline,
+        '_retrieve')
+    def test_unchanged_policies_are_copied_when_incremental(
+            self, mock_retrieve, mock_load, mock_get_loaded_count):
+        """Test that only the changed policies are loaded when incremental."""
+        self.pipeline.previous_cycle_timestamp = '20001224T120000Z'
+        self.mock_dao.get_project_iam_policy_etags.return_value = {
+            11111: 'unchanged', 22222: 'old'}
+        mock_retrieve.return_value = [
+            {'project_number': 11111,
+             'iam_policy': {'etag': 'unchanged', 'bindings': []}},
+            {'project_number': 22222,
+             'iam_policy': {'etag': 'new', 'bindings': []}},
+            {'project_number': 33333,
+             'iam_policy': {'etag': 'added', 'bindings': []}}]
+        self.pipeline.run()
+
+        self.mock_dao.get_project_iam_policy_etags.assert_called_once_with(
+            self.pipeline.RAW_RESOURCE_NAME, '20001224T120000Z')
+
+        raw_args = mock_load.call_args_list[1][0]
+        self.assertEquals(self.pipeline.RAW_RESOURCE_NAME, raw_args[0])
+        self.assertEquals([22222, 33333],
+                          [i['project_number'] for i in raw_args[1]])
+
+        self.assertEquals(
+            [mock.call(self.pipeline.RESOURCE_NAME, '20001224T120000Z',
+                       self.cycle_timestamp, 'project_number', [11111]),
+             mock.call(self.pipeline.RAW_RESOURCE_NAME, '20001224T120000Z',
+                       self.cycle_timestamp, 'project_number', [11111])],
+            self.mock_dao.copy_snapshot_rows.call_args_list)
+
+    @mock.patch.object(
+        load_projects_iam_policies_pipeline.LoadProjectsIamPoliciesPipeline,
+        '_get_loaded_count')
+    @mock.patch.object(
+        load_projects_iam_policies_pipeline.LoadProjectsIamPoliciesPipeline,
+        '_load')
+    @mock.patch.object(
+        load_projects_iam_policies_pipeline.LoadProjectsIamPoliciesPipeline,
+        '_retrieve')
+    def test_all_policies_are_loaded_without_previous_etags(
+            self, mock_retrieve, mock_load, mock_get_loaded_count):
+        """Test that all the policies are loaded if etags can't be read."""
+        self.pipeline.previous_cycle_timestamp = '20001224T120000Z'
+        self.mock_dao.get_project_iam_policy_etags.side_effect = (
+            data_access_errors.MySQLError('raw_project_iam_policies',
+                                          mock.MagicMock()))
+        mock_retrieve.return_value = [
+            {'project_number': 11111,
+             'iam_policy': {'etag': 'unchanged', 'bindings': []}}]
+        self.pipeline.run()
+
+        self.assertEquals(2, mock_load.call_count)
+        self.assertFalse(self.mock_dao.copy_snapshot_rows.called)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -20,6 +20,7 @@ import unittest
 
 from google.cloud.security.common.data_access import project_dao
 from google.cloud.security.common.data_access import service_account_dao
+from google.cloud.security.common.gcp_api import errors as api_errors
 from google.cloud.security.common.gcp_api import iam
 from google.cloud.security.inventory.pipelines import \
     load_service_accounts_pipeline
@@ -90,6 +91,8 @@ class LoadServiceAccountsPipelineTest(ForsetiTestCase):
             service_account_keys.append(
                 fake_service_accounts.FAKE_SERVICE_ACCOUNT_KEYS[s[0]['name']])
 
+        # A single worker keeps the mocked responses in call order.
+        self.pipeline.FAN_OUT_WORKERS = 1
         self.pipeline.api_client.get_service_accounts = mock.MagicMock(
             side_effect=service_accounts)
         self.pipeline.api_client.get_service_account_keys = mock.MagicMock(
@@ -101,6 +104,21 @@ class LoadServiceAccountsPipelineTest(ForsetiTestCase):
             fake_service_accounts.FAKE_PROJECT_SERVICE_ACCOUNTS_MAP,
             actual)
 
+    @mock.patch.object(load_service_accounts_pipeline, 'LOGGER')
+    @mock.patch.object(MySQLdb, 'connect')
+    @mock.patch('google.cloud.security.common.data_access.project_dao.ProjectDao.get_projects')
+    def test_retrieve_logs_missing_projects(
+            self, mock_get_projects, mock_conn, mock_logger):
+        """Test _retrieve() logs the projects it could not retrieve."""
+        mock_get_projects.return_value = self.projects
+        self.pipeline.api_client.get_service_accounts = mock.MagicMock(
+            side_effect=api_errors.ApiExecutionError('error', mock.Mock()))
+
+        self.assertEquals({}, self.pipeline._retrieve())
+        mock_logger.warn.assert_called_once_with(
+            'Service accounts missing for projects: %s',
+            ', '.join(sorted(p.id for p in self.projects)))
+
     @mock.patch.object(
         load_service_accounts_pipeline.LoadServiceAccountsPipeline,
         '_get_loaded_count')
@@ -126,10 +126,3 @@ FAKE_GROUP_IDS = [
     'a111', 'a222', 'a333', 'a444', 'a555',
     'a666', 'a777', 'a888', 'a999', 'a000',
 ]
-
-EXPECTED_CALL_LIST = [
-    ['a111', 'a222', 'a333'],
-    ['a444', 'a555', 'a666'],
-    ['a777', 'a888', 'a999'],
-    ['a000'],
-]
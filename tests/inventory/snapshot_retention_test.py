@@ -0,0 +1,160 @@
+# Copyright 2017 The Forseti Security Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the snapshot retention."""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from tests.unittest_utils import ForsetiTestCase
+from google.cloud.security.common.data_access import errors
+from google.cloud.security.common.data_access.sql_queries import snapshot_cycles_sql
+from google.cloud.security.inventory import snapshot_retention
+
+CYCLES = [
+    {'cycle_timestamp': '20170105T000000Z', 'status': 'RUNNING'},
+    {'cycle_timestamp': '20170104T000000Z', 'status': 'SUCCESS'},
+    {'cycle_timestamp': '20170103T000000Z', 'status': 'FAILURE'},
+    {'cycle_timestamp': '20170102T000000Z', 'status': 'SUCCESS'},
+    {'cycle_timestamp': '20170101T000000Z', 'status': 'SUCCESS'},
+]
+
+
+class SnapshotRetentionTest(ForsetiTestCase):
+    """Tests for the snapshot retention."""
+
+    def setUp(self):
+        self.dao = mock.MagicMock()
+        self.tables = {
+            '20170102T000000Z': [
+                {'TABLE_NAME': 'projects_20170102T000000Z',
+                 'TABLE_TYPE': 'BASE TABLE', 'ROW_FORMAT': 'Dynamic'},
+                {'TABLE_NAME': 'groups_20170102T000000Z',
+                 'TABLE_TYPE': 'BASE TABLE', 'ROW_FORMAT': 'Compressed'}],
+            '20170101T000000Z': [
+                {'TABLE_NAME': 'projects_20170101T000000Z',
+                 'TABLE_TYPE': 'BASE TABLE', 'ROW_FORMAT': 'Compressed'},
+                {'TABLE_NAME': 'violations_20170101T000000Z',
+                 'TABLE_TYPE': 'BASE TABLE', 'ROW_FORMAT': 'Dynamic'}],
+        }
+
+        def fetch(resource_name, sql, values):
+            if sql == snapshot_cycles_sql.SELECT_CYCLES:
+                return CYCLES
+            return self.tables.get(values[0][len('%\\_'):], [])
+
+        self.dao.execute_sql_with_fetch.side_effect = fetch
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _executed_sql(self):
+        return [call[0][1] for call in
+                self.dao.execute_sql_with_commit.call_args_list]
+
+    def test_plan_retention(self):
+        """Running cycles are kept, whatever their age."""
+        cycles = [(row['cycle_timestamp'], row['status']) for row in CYCLES]
+        cycles.append(('20161231T000000Z', 'RUNNING'))
+
+        self.assertEqual(
+            [('20170105T000000Z', snapshot_retention.KEEP),
+             ('20170104T000000Z', snapshot_retention.KEEP),
+             ('20170103T000000Z', snapshot_retention.COMPRESS),
+             ('20170102T000000Z', snapshot_retention.COMPRESS),
+             ('20170101T000000Z', snapshot_retention.DROP),
+             ('20161231T000000Z', snapshot_retention.KEEP)],
+            snapshot_retention.plan_retention(cycles, 1, 1))
+
+    def test_apply_compresses_and_drops(self):
+        """Old cycles are compressed once, then dropped, but not violations."""
+        manager = snapshot_retention.SnapshotRetentionManager(
+            self.dao, keep_cycles=1, compress_cycles=1)
+
+        stats = manager.apply()
+
+        self.assertEqual({'compressed': 1, 'archived': 0, 'dropped': 1},
+                         stats)
+        self.assertEqual(
+            [snapshot_cycles_sql.COMPRESS_TABLE.format(
+                'projects_20170102T000000Z'),
+             snapshot_cycles_sql.DROP_TABLE.format(
+                 'projects_20170101T000000Z')],
+            self._executed_sql())
+
+    def test_apply_archives_before_dropping(self):
+        """Dropped tables are exported first, and kept if that fails."""
+        self.tables['20170101T000000Z'].append(
+            {'TABLE_NAME': 'groups_20170101T000000Z',
+             'TABLE_TYPE': 'BASE TABLE', 'ROW_FORMAT': 'Dynamic'})
+
+        def iter_rows(resource_name, sql, values):
+            if resource_name == 'groups_20170101T000000Z':
+                raise errors.MySQLError(resource_name, Exception('error'))
+            return iter([{'id': 1, 'project_id': 'p1'}])
+
+        self.dao.iter_sql_with_fetch.side_effect = iter_rows
+        manager = snapshot_retention.SnapshotRetentionManager(
+            self.dao, keep_cycles=2, archive_dir=self.temp_dir)
+
+        stats = manager.apply()
+
+        self.assertEqual({'compressed': 0, 'archived': 1, 'dropped': 1},
+                         stats)
+        self.assertEqual(
+            [snapshot_cycles_sql.DROP_TABLE.format(
+                'projects_20170101T000000Z')],
+            self._executed_sql())
+        archive = gzip.open(os.path.join(
+            self.temp_dir, 'projects_20170101T000000Z.json.gz'))
+        self.assertEqual([{'id': 1, 'project_id': 'p1'}],
+                         [json.loads(line) for line in archive])
+        archive.close()
+        self.assertEqual(['projects_20170101T000000Z.json.gz'],
+                         os.listdir(self.temp_dir))
+
+    def test_apply_drops_partitions(self):
+        """Snapshot views are dropped with their partition."""
+        self.tables = {
+            '20170102T000000Z': [
+                {'TABLE_NAME': 'projects_20170102T000000Z',
+                 'TABLE_TYPE': 'VIEW', 'ROW_FORMAT': None}],
+            '20170101T000000Z': [
+                {'TABLE_NAME': 'projects_20170101T000000Z',
+                 'TABLE_TYPE': 'VIEW', 'ROW_FORMAT': None}],
+        }
+        manager = snapshot_retention.SnapshotRetentionManager(
+            self.dao, keep_cycles=1, compress_cycles=1)
+
+        stats = manager.apply()
+
+        self.assertEqual({'compressed': 0, 'archived': 0, 'dropped': 1},
+                         stats)
+        self.assertEqual(
+            [snapshot_cycles_sql.DROP_VIEW.format(
+                'projects_20170101T000000Z'),
+             snapshot_cycles_sql.DROP_PARTITION.format(
+                 'projects_snapshots', 'p20170101T000000Z')],
+            self._executed_sql())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -70,8 +70,16 @@ class GroupsScannerTest(ForsetiTestCase):
     @mock.patch('google.cloud.security.scanner.scanners.groups_scanner.group_dao.GroupDao', spec=True)
     def test_build_group_tree(self, mock_dao):
 
+        fetched_group_ids = []
+
+        def get_group_members_for_groups(resource_name, group_ids, timestamp):
+            fetched_group_ids.append(sorted(group_ids))
+            return dict((group_id, fake_data.ALL_GROUP_MEMBERS[group_id])
+                        for group_id in group_ids)
+
         mock_dao.get_all_groups.return_value = fake_data.ALL_GROUPS
-        mock_dao.get_group_members.side_effect = fake_data.ALL_GROUP_MEMBERS
+        mock_dao.get_group_members_for_groups.side_effect = (
+            get_group_members_for_groups)
 
         scanner = groups_scanner.GroupsScanner({}, {}, '', '')
         scanner.dao = mock_dao
@@ -79,6 +87,9 @@ class GroupsScannerTest(ForsetiTestCase):
 
         self.assertEquals(fake_data.EXPECTED_MEMBERS_IN_TREE,
                           self._render_ascii(root, 'member_email'))
+        # The members of each group are only fetched once.
+        self.assertEquals([['aaaaa', 'bbbbb', 'ccccc', 'ddddd']],
+                          fetched_group_ids)
 
     @mock.patch('google.cloud.security.scanner.scanners.groups_scanner.group_dao.GroupDao', spec=True)
     def test_apply_rule(self, mock_dao):
@@ -39,6 +39,10 @@ class FakeProjectDao(object):
     def get_project(self, project_id, snapshot_timestamp=0):
         return project_type.Project(project_id=project_id)
 
+    def get_projects_by_ids(self, project_ids, snapshot_timestamp=0):
+        return dict((project_id, project_type.Project(project_id=project_id))
+                    for project_id in project_ids)
+
 
 class FakeOrgDao(object):
 
@@ -135,17 +135,12 @@ DDDDD_GROUP_MEMBERS = (
      'member_type': 'GROUP'}
 )
 
-# The order of these groups will be determined by the nesting structure
-# and by how the get_recursive_members() will return them.
-ALL_GROUP_MEMBERS = [
-    AAAAA_GROUP_MEMBERS,
-    BBBBB_GROUP_MEMBERS,
-    CCCCC_GROUP_MEMBERS,
-    CCCCC_GROUP_MEMBERS,
-    DDDDD_GROUP_MEMBERS,
-    BBBBB_GROUP_MEMBERS,
-    CCCCC_GROUP_MEMBERS
-]
+ALL_GROUP_MEMBERS = {
+    'aaaaa': AAAAA_GROUP_MEMBERS,
+    'bbbbb': BBBBB_GROUP_MEMBERS,
+    'ccccc': CCCCC_GROUP_MEMBERS,
+    'ddddd': DDDDD_GROUP_MEMBERS,
+}
 
 EXPECTED_MEMBERS_IN_TREE = (
 """my_customer